@@ -8,6 +8,17 @@ from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.audio_processing import (
+    TARGET_SAMPLE_RATE,
+    SAMPLE_WIDTH,
+    is_memory_audio,
+    get_pcm,
+    pcm_duration,
+    trim_silence,
+    split_on_silence,
+)
 
 # ----------------------------------------------------------
 # LOAD ENV VARIABLES
@@ -41,6 +52,13 @@ LANGUAGES = {
     "kok-IN": "Konkani",
 }
 
+# Recordings longer than this are split at pauses and recognized in parallel
+LONG_AUDIO_SECONDS = float(os.getenv("LONG_AUDIO_SECONDS", "25"))
+RECOGNITION_CONCURRENCY = int(os.getenv("RECOGNITION_CONCURRENCY", "4"))
+
+# Per-segment diagnostics of the last segmented run, keyed by audio_path
+_segment_timings = {}
+
 # Dialects fallback
 FALLBACK_MAP = {
     "bho-IN": "hi-IN",
@@ -55,6 +73,113 @@ FALLBACK_MAP = {
     "kok-IN": "mr-IN",
 }
 
+# ----------------------------------------------------------
+# SHARED HELPERS
+# ----------------------------------------------------------
+def resolve_lang_code(lang_code: str) -> str:
+    """Map dialects without recognizer support onto their fallback language"""
+    if lang_code in FALLBACK_MAP:
+        print(f"⚠️ Using fallback {FALLBACK_MAP[lang_code]} for {lang_code}")
+        return FALLBACK_MAP[lang_code]
+    return lang_code
+
+
+def recognize_pcm(pcm: bytes, lang_code: str, recognizer: sr.Recognizer = None) -> str:
+    """
+    Run Google speech recognition on 16 kHz mono PCM.
+    Raises sr.UnknownValueError / sr.RequestError like recognize_google.
+    """
+    recognizer = recognizer or sr.Recognizer()
+    audio = sr.AudioData(pcm, TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
+    return recognizer.recognize_google(audio, language=lang_code)
+
+
+def recognize_segments(pcm: bytes, lang_code: str):
+    """
+    Split long audio at pauses and recognize the pieces concurrently.
+
+    Returns:
+        (detected_text, segment_timings): transcripts stitched in recording
+        order, plus per-segment diagnostics (start/end seconds, recognition
+        time, status)
+    """
+    segments = split_on_silence(pcm)
+
+    def recognize_one(index: int, start: float, end: float, segment_pcm: bytes) -> dict:
+        timing = {"index": index, "start": round(start, 2), "end": round(end, 2)}
+        began = time.perf_counter()
+        text = ""
+        for attempt in range(2):
+            try:
+                text = recognize_pcm(segment_pcm, lang_code)
+                timing["status"] = "success"
+                break
+            except sr.UnknownValueError:
+                timing["status"] = "no_speech"
+                break
+            except sr.RequestError as e:
+                timing["status"] = "error"
+                timing["error"] = str(e)
+        timing["recognize_ms"] = round((time.perf_counter() - began) * 1000)
+        timing["text"] = text
+        return timing
+
+    with ThreadPoolExecutor(max_workers=RECOGNITION_CONCURRENCY) as executor:
+        futures = [
+            executor.submit(recognize_one, index, start, end, segment_pcm)
+            for index, (start, end, segment_pcm) in enumerate(segments)
+        ]
+        timings = [future.result() for future in futures]
+
+    for timing in timings:
+        print(f"   🧩 Segment {timing['index']} [{timing['start']}-{timing['end']}s] "
+              f"{timing['status']} in {timing['recognize_ms']}ms")
+
+    detected_text = " ".join(t.pop("text") for t in timings if t.get("text"))
+    return detected_text, timings
+
+
+def pop_segment_timings(audio_path: str):
+    """Per-segment timings recorded by translator_run for audio_path, if any"""
+    return _segment_timings.pop(audio_path, None)
+
+
+def synthesize_speech(text: str, lang_code: str) -> bytes:
+    """
+    Read text aloud with gTTS and return MP3 bytes.
+    Languages gTTS cannot voice fall back via FALLBACK_MAP, then Hindi.
+    """
+    from gtts.lang import tts_langs
+
+    supported = tts_langs()
+    tts_lang = lang_code.split("-")[0]
+    if tts_lang not in supported:
+        fallback = FALLBACK_MAP.get(lang_code, "hi-IN").split("-")[0]
+        tts_lang = fallback if fallback in supported else "hi"
+        print(f"⚠️ gTTS has no voice for {lang_code}, using {tts_lang}")
+
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=tts_lang).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def translate_to_english(text: str, lang_code: str, context: str = None) -> str:
+    """
+    Translate recognized text into English with Gemini.
+    context: earlier text of the same recording, used only for coherence
+    """
+    model = genai.GenerativeModel("gemini-2.0-flash")
+    prompt = f"Translate the following {LANGUAGES.get(lang_code, lang_code)} text into fluent English:\n\n"
+    if context:
+        prompt += f"(Earlier part of the same speech, for context only - do NOT translate it: {context})\n\n"
+    prompt += (
+        f"{text}\n\n"
+        f"Output ONLY the English translation, nothing else."
+    )
+    response = model.generate_content(prompt)
+    return response.text.strip()
+
+
 # ----------------------------------------------------------
 # FUNCTION TOOL
 # ----------------------------------------------------------
@@ -63,7 +188,8 @@ def translator_run(audio_path: str, lang_code: str) -> str:
     Translates spoken input in the selected Indian language into English text.
     
     Args:
-        audio_path: Path to input WAV audio file
+        audio_path: Path to input WAV audio file, or a memory:// reference
+            to 16 kHz mono PCM decoded by services.audio_processing
         lang_code: Source language code (e.g., 'hi-IN', 'mr-IN')
 
     Returns:
@@ -75,44 +201,80 @@ def translator_run(audio_path: str, lang_code: str) -> str:
         print(f"   Audio path: {audio_path}")
         print(f"   Language: {lang_code}")
         
-        if lang_code in FALLBACK_MAP:
-            print(f"⚠️ Using fallback {FALLBACK_MAP[lang_code]} for {lang_code}")
-            lang_code = FALLBACK_MAP[lang_code]
+        lang_code = resolve_lang_code(lang_code)
 
         recognizer = sr.Recognizer()
-        
-        # Check if file exists
-        if not os.path.exists(audio_path):
-            print(f"❌ Audio file not found: {audio_path}")
-            return json.dumps({
-                "status": "error",
-                "message": f"Audio file not found: {audio_path}"
-            })
-        
-        file_size = os.path.getsize(audio_path)
-        print(f"📊 Audio file size: {file_size} bytes")
-        
-        # Add better audio file handling
-        try:
-            with sr.AudioFile(audio_path) as source:
-                print(f"📂 Opened audio file successfully")
-                # Adjust for ambient noise
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = recognizer.record(source)
-                print(f"✅ Audio recorded from file")
-        except Exception as audio_error:
-            print(f"❌ Audio file error: {audio_error}")
-            import traceback
-            traceback.print_exc()
+
+        # In-memory PCM handed over by the router (no temp files)
+        if is_memory_audio(audio_path):
+            pcm = get_pcm(audio_path)
+            if pcm is None:
+                print(f"❌ Audio buffer not found: {audio_path}")
+                return json.dumps({
+                    "status": "error",
+                    "message": f"Audio buffer not found: {audio_path}"
+                })
+
+            print(f"📊 In-memory audio: {len(pcm)} bytes, {pcm_duration(pcm):.2f}s")
+        else:
+            # Check if file exists
+            if not os.path.exists(audio_path):
+                print(f"❌ Audio file not found: {audio_path}")
+                return json.dumps({
+                    "status": "error",
+                    "message": f"Audio file not found: {audio_path}"
+                })
+
+            file_size = os.path.getsize(audio_path)
+            print(f"📊 Audio file size: {file_size} bytes")
+
+            # Add better audio file handling
+            try:
+                with sr.AudioFile(audio_path) as source:
+                    print(f"📂 Opened audio file successfully")
+                    pcm = recognizer.record(source).get_raw_data(
+                        convert_rate=TARGET_SAMPLE_RATE,
+                        convert_width=SAMPLE_WIDTH
+                    )
+                    print(f"✅ Audio recorded from file")
+            except Exception as audio_error:
+                print(f"❌ Audio file error: {audio_error}")
+                import traceback
+                traceback.print_exc()
+                return json.dumps({
+                    "status": "error",
+                    "message": f"Could not read audio file: {str(audio_error)}"
+                })
+
+        # Trim leading/trailing silence (replaces adjust_for_ambient_noise,
+        # which spent 0.5s of the clip estimating the noise floor)
+        speech_pcm, noise_floor = trim_silence(pcm)
+        print(f"✂️ VAD: {pcm_duration(pcm):.2f}s -> {pcm_duration(speech_pcm):.2f}s speech, noise floor {noise_floor:.0f}")
+
+        if not speech_pcm:
+            print(f"❌ No speech detected")
             return json.dumps({
                 "status": "error",
-                "message": f"Could not read audio file: {str(audio_error)}"
+                "message": "Could not understand audio. Please speak clearly."
             })
 
+        audio = sr.AudioData(speech_pcm, TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
+
         # Step 1: Recognize speech
         try:
-            print(f"🎤 Attempting speech recognition with Google...")
-            detected_text = recognizer.recognize_google(audio, language=lang_code)
+            if pcm_duration(speech_pcm) > LONG_AUDIO_SECONDS:
+                print(f"🎤 Long recording - recognizing segments in parallel...")
+                detected_text, segment_timings = recognize_segments(speech_pcm, lang_code)
+                # Kept out of the tool result so the agent does not echo it back
+                _segment_timings[audio_path] = segment_timings
+                if not detected_text:
+                    errors = [t["error"] for t in segment_timings if t.get("error")]
+                    if errors:
+                        raise sr.RequestError(errors[0])
+                    raise sr.UnknownValueError()
+            else:
+                print(f"🎤 Attempting speech recognition with Google...")
+                detected_text = recognizer.recognize_google(audio, language=lang_code)
             print(f"🗣️ Recognized: {detected_text}")
         except sr.UnknownValueError:
             print(f"❌ Could not understand audio")
@@ -130,14 +292,7 @@ def translator_run(audio_path: str, lang_code: str) -> str:
         # Step 2: Translate with Gemini
         try:
             print(f"🌐 Translating with Gemini...")
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            prompt = (
-                f"Translate the following {LANGUAGES.get(lang_code, lang_code)} text into fluent English:\n\n"
-                f"{detected_text}\n\n"
-                f"Output ONLY the English translation, nothing else."
-            )
-            response = model.generate_content(prompt)
-            english_translation = response.text.strip()
+            english_translation = translate_to_english(detected_text, lang_code)
             print(f"🌍 English Translation: {english_translation}")
         except Exception as gemini_error:
             print(f"❌ Gemini error: {gemini_error}")
@@ -0,0 +1,142 @@
+"""
+Benchmark: in-memory audio decode vs. the pydub/ffmpeg temp-file path
+Run: python benchmark_audio_decode.py [--seconds 10] [--runs 5]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from services.audio_processing import decode_to_pcm, pcm_duration, av
+
+SOURCE_RATE = 48000  # MediaRecorder default on most browsers
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60)
+
+
+def synth_samples(seconds: float) -> np.ndarray:
+    """Speech-like test signal: harmonics with a syllable-rate envelope, stereo"""
+    t = np.arange(int(seconds * SOURCE_RATE)) / SOURCE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate([180, 360, 720, 1440]))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+    mono = 0.3 * voice * envelope
+    return np.stack([mono, mono * 0.9], axis=1).astype(np.float32)
+
+
+def make_wav(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SOURCE_RATE)
+        wav_file.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def make_webm(samples: np.ndarray) -> bytes:
+    """Encode WebM/Opus in-process so the benchmark needs no browser recording"""
+    if av is None:
+        return None
+
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="webm") as container:
+        stream = container.add_stream("libopus", rate=SOURCE_RATE)
+        stream.layout = "stereo"
+        interleaved = (samples * 32767).astype("<i2").reshape(1, -1)
+        frame = av.AudioFrame.from_ndarray(interleaved, format="s16", layout="stereo")
+        frame.sample_rate = SOURCE_RATE
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def legacy_path(data: bytes, suffix: str) -> int:
+    """Mirror of the removed convert_to_wav_pydub + translator_run's sr.AudioFile read"""
+    import speech_recognition as sr
+    from pydub import AudioSegment
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(data)
+        temp_input_path = temp_file.name
+    temp_wav_path = temp_input_path.replace(suffix, "_converted.wav")
+
+    try:
+        audio = AudioSegment.from_file(temp_input_path)
+        audio = audio.set_frame_rate(16000).set_channels(1)
+        audio.export(temp_wav_path, format="wav")
+
+        with sr.AudioFile(temp_wav_path) as source:
+            recorded = sr.Recognizer().record(source)
+        return len(recorded.frame_data)
+    finally:
+        for path in [temp_input_path, temp_wav_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def in_memory_path(data: bytes) -> int:
+    import speech_recognition as sr
+
+    pcm = decode_to_pcm(data)
+    audio = sr.AudioData(pcm, 16000, 2)
+    return len(audio.frame_data)
+
+
+def time_runs(fn, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio decode benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = synth_samples(args.seconds)
+    inputs = {"wav": (make_wav(samples), ".wav")}
+    webm = make_webm(samples)
+    if webm:
+        inputs["webm"] = (webm, ".webm")
+    else:
+        print("⚠️ PyAV not installed - skipping WebM/Opus input")
+
+    print_header(f"Audio decode benchmark ({args.seconds:.0f}s clip, {args.runs} runs)")
+
+    for name, (data, suffix) in inputs.items():
+        pcm = decode_to_pcm(data)
+        print(f"\n📦 {name}: {len(data)} bytes in -> {len(pcm)} bytes PCM ({pcm_duration(pcm):.2f}s)")
+
+        try:
+            legacy_median, legacy_best = time_runs(lambda: legacy_path(data, suffix), args.runs)
+            print(f"   pydub + temp files : median {legacy_median:8.1f} ms | best {legacy_best:8.1f} ms")
+        except Exception as e:
+            legacy_median = None
+            print(f"   pydub + temp files : failed ({e})")
+
+        memory_median, memory_best = time_runs(lambda: in_memory_path(data), args.runs)
+        print(f"   in-memory decode   : median {memory_median:8.1f} ms | best {memory_best:8.1f} ms")
+
+        if legacy_median:
+            print(f"   ⚡ speedup: {legacy_median / memory_median:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
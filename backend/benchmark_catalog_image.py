@@ -0,0 +1,117 @@
+"""
+Benchmark: image catalog encode time and size per output format
+Run: python benchmark_catalog_image.py [--products 10 50 100 200] [--runs 3]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# Isolated image cache so the benchmark never touches the real one
+os.environ["CATALOG_IMAGE_CACHE_DIR"] = tempfile.mkdtemp(prefix="catalog_image_bench_")
+
+from services.catalog_renderer import (  # noqa: E402
+    IMAGE_FORMAT_PRESETS, encode_catalog_image, image_cache, render_image_page
+)
+
+PHOTO_COUNT = 12
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60)
+
+
+def make_photo(seed: int) -> bytes:
+    """Product-photo-like JPEG: textured object on a light background"""
+    rng = np.random.default_rng(seed)
+    size = 800
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    pixels = np.full((size, size, 3), 235, dtype=np.float32)
+    inside = (x - size / 2) ** 2 + (y - size / 2) ** 2 < (size / 3) ** 2
+    color = rng.uniform(60, 200, size=3)
+    texture = 30 * np.sin(x / 7 + seed) * np.cos(y / 11)
+    for c in range(3):
+        pixels[..., c][inside] = color[c] + texture[inside]
+    pixels += rng.normal(0, 4, size=pixels.shape)
+    out = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def legacy_encode(catalog_img: Image.Image) -> bytes:
+    """The previous fixed encoder"""
+    buffer = io.BytesIO()
+    catalog_img.save(buffer, format='PNG', quality=95, optimize=True)
+    return buffer.getvalue()
+
+
+def time_runs(fn, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image catalog encoder benchmark")
+    parser.add_argument("--products", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    images = {}
+    for i in range(PHOTO_COUNT):
+        url = f"https://example.com/product_{i}.jpg"
+        image_cache.store_original(url, make_photo(i), content_type="image/jpeg")
+        images[url] = True
+    urls = list(images)
+
+    print_header(f"Image catalog encoders ({args.runs} runs, median)")
+
+    for count in args.products:
+        products = [
+            {
+                "name": f"Handcrafted item {i + 1}",
+                "price": 450 + i * 25,
+                "category": "Pottery",
+                "image_url": urls[i % PHOTO_COUNT],
+            }
+            for i in range(count)
+        ]
+        catalog_img = render_image_page("Benchmark Artisan", products, images)
+        print(f"\n📦 {count} products: {catalog_img.width}x{catalog_img.height} canvas")
+
+        encoders = {"png (legacy)": legacy_encode}
+        for name in IMAGE_FORMAT_PRESETS:
+            encoders[name] = lambda img, name=name: encode_catalog_image(img, name)
+
+        legacy_kb = None
+        for name, encode in encoders.items():
+            data, encode_ms = time_runs(lambda: encode(catalog_img), args.runs)
+            used_format = None
+            if isinstance(data, tuple):
+                data, used_format = data
+            size_kb = len(data) / 1024
+            line = f"   {name:<13} {encode_ms:>9.0f} ms {size_kb:>9.0f} KB"
+            if legacy_kb:
+                line += f"   {legacy_kb / size_kb:5.1f}x smaller"
+            else:
+                legacy_kb = size_kb
+            if used_format and used_format != name:
+                line += f"   (fell back to {used_format})"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
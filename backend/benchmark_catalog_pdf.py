@@ -0,0 +1,105 @@
+"""
+Benchmark: PDF catalog size and build time per image quality preset
+Run: python benchmark_catalog_pdf.py [--products 20] [--runs 3]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# Isolated image cache so the benchmark never touches the real one
+os.environ["CATALOG_IMAGE_CACHE_DIR"] = tempfile.mkdtemp(prefix="catalog_pdf_bench_")
+
+from services import catalog_renderer  # noqa: E402
+from services.catalog_renderer import PDF_QUALITY_PRESETS, image_cache, render_pdf  # noqa: E402
+
+PHOTO_SIZE = (4032, 3024)  # 12 MP phone camera
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60)
+
+
+def make_photo(seed: int) -> bytes:
+    """Phone-photo-like JPEG: smooth gradients plus sensor noise"""
+    rng = np.random.default_rng(seed)
+    width, height = PHOTO_SIZE
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = rng.uniform(60, 200, size=3)
+    channels = [
+        base[c] + 40 * np.sin(x / (300 + 50 * c) + seed) * np.cos(y / (250 + 40 * c))
+        for c in range(3)
+    ]
+    pixels = np.stack(channels, axis=2) + rng.normal(0, 6, size=(height, width, 3))
+    img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=95)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF catalog benchmark")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print_header(f"PDF catalog benchmark ({args.products} products, {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} photos)")
+
+    # A handful of distinct photos reused across products, like a real shop
+    photo_count = min(args.products, 6)
+    images = {}
+    products = []
+    for i in range(args.products):
+        url = f"https://example.com/photo_{i % photo_count}.jpg"
+        if url not in images:
+            image_cache.store_original(url, make_photo(i % photo_count), content_type="image/jpeg")
+            images[url] = True
+        products.append({
+            "name": f"Handcrafted item {i + 1}",
+            "description": "Hand-painted terracotta with natural pigments.",
+            "price": 450 + i * 25,
+            "category": "Pottery",
+            "image_url": url,
+        })
+    original_kb = sum(len(image_cache.get_original(url)) for url in images) / 1024
+    print(f"\n📦 {photo_count} source photos, {original_kb:.0f} KB total")
+
+    artisan = {"name": "Benchmark Artisan", "email": "artisan@example.com", "phone": "+910000000000"}
+    baseline = None
+
+    print(f"\n   {'preset':<10} {'size':>10} {'cold build':>12} {'warm build':>12}")
+    for preset in ["original"] + [name for name in PDF_QUALITY_PRESETS if name != "original"]:
+        # Cold: derivatives are built from the originals on this run
+        start = time.perf_counter()
+        pdf = render_pdf(artisan, products, images, quality=preset)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        warm = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            render_pdf(artisan, products, images, quality=preset)
+            warm.append((time.perf_counter() - start) * 1000)
+        warm_ms = statistics.median(warm)
+
+        size_kb = len(pdf) / 1024
+        line = f"   {preset:<10} {size_kb:>7.0f} KB {cold_ms:>9.0f} ms {warm_ms:>9.0f} ms"
+        if baseline:
+            line += f"   {baseline / size_kb:5.1f}x smaller"
+        else:
+            baseline = size_kb
+        print(line)
+
+    print(f"\nDefault preset: {catalog_renderer.DEFAULT_PDF_QUALITY}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: product image enhancement throughput in megapixels per second
+Compares the NumPy pipeline with a per-pixel loop like the old in-browser
+version, and measures batch mode against one-by-one processing.
+Run: python benchmark_image_enhance.py [--sizes 640 1200 2048] [--batch 16] [--runs 3]
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+from PIL import Image
+
+from services.image_enhancement import (
+    ENHANCE_WORKERS, decode_image, enhance_array, enhance_batch, enhance_image_bytes
+)
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60)
+
+
+def make_photo(size: int, seed: int = 0) -> bytes:
+    """Product-photo-like JPEG: dim textured object on a grey backdrop"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    pixels = np.full((size, size, 3), 205, dtype=np.float32)
+    inside = (x - size / 2) ** 2 + (y - size / 2) ** 2 < (size / 3) ** 2
+    color = rng.uniform(50, 160, size=3)
+    texture = 25 * np.sin(x / 9 + seed) * np.cos(y / 13)
+    for c in range(3):
+        pixels[..., c][inside] = color[c] + texture[inside]
+    pixels += rng.normal(0, 3, size=pixels.shape)
+    out = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def per_pixel_enhance(arr: np.ndarray, brightness: float = 12, contrast: float = 1.08) -> np.ndarray:
+    """Same loop as the old ImageEnhancement.js, one channel value at a time"""
+    flat = arr.reshape(-1).tolist()
+    for i in range(len(flat)):
+        v = (flat[i] + brightness - 128) * contrast + 128
+        flat[i] = 0 if v < 0 else 255 if v > 255 else int(v)
+    return np.array(flat, dtype=np.uint8).reshape(arr.shape)
+
+
+def median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image enhancement throughput benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 1200, 2048])
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print_header(f"Enhancement throughput ({args.runs} runs, median)")
+    print(f"   {'size':>11} {'numpy':>12} {'+white bg':>12} {'end-to-end':>12} {'per-pixel':>12}")
+
+    for size in args.sizes:
+        data = make_photo(size)
+        arr = decode_image(data)
+        mp = arr.shape[0] * arr.shape[1] / 1e6
+
+        numpy_ms = median_ms(lambda: enhance_array(arr), args.runs)
+        white_ms = median_ms(lambda: enhance_array(arr, white_background=True), args.runs)
+        full_ms = median_ms(lambda: enhance_image_bytes(data), args.runs)
+
+        # The pure-Python loop is only timed on a crop, then scaled
+        crop = arr[:200, :200]
+        loop_ms = median_ms(lambda: per_pixel_enhance(crop), 1) * (arr.shape[0] * arr.shape[1]) / (200 * 200)
+
+        print(f"   {f'{size}x{size}':>11} "
+              f"{mp / numpy_ms * 1000:>8.1f} MP/s {mp / white_ms * 1000:>8.1f} MP/s "
+              f"{mp / full_ms * 1000:>8.1f} MP/s {mp / loop_ms * 1000:>8.2f} MP/s")
+
+    print_header(f"Batch mode: {args.batch} x 1200px photos ({ENHANCE_WORKERS} workers)")
+    photos = [make_photo(1200, seed) for seed in range(args.batch)]
+    total_mp = args.batch * 1.44
+
+    sequential_ms = median_ms(lambda: [enhance_image_bytes(photo) for photo in photos], args.runs)
+    batch_ms = median_ms(lambda: enhance_batch(photos), args.runs)
+    print(f"   one by one : {sequential_ms:>8.0f} ms  {total_mp / sequential_ms * 1000:6.1f} MP/s")
+    print(f"   batch      : {batch_ms:>8.0f} ms  {total_mp / batch_ms * 1000:6.1f} MP/s "
+          f"({sequential_ms / batch_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: dashboard insights latency and BigQuery work per query mode
+Times get_all_insights for one artisan with the five section jobs run one
+after another (old path), submitted concurrently, and as one consolidated
+query, and sums bytes processed / slot time over the jobs each mode ran.
+Needs GOOGLE_APPLICATION_CREDENTIALS and GCLOUD_PROJECT (real BigQuery).
+Run: python benchmark_insights.py --artisan ID [--runs 5] [--query-cache]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import services.bigquery_analytics as analytics
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60)
+
+
+def record_jobs(client) -> list:
+    """Keep every job the client starts, for their statistics"""
+    jobs = []
+    query = client.query
+
+    def recording_query(*args, **kwargs):
+        job = query(*args, **kwargs)
+        jobs.append(job)
+        return job
+
+    client.query = recording_query
+    return jobs
+
+
+def run_mode(artisan_id: str, mode: str, jobs: list) -> dict:
+    jobs.clear()
+    start = time.perf_counter()
+    analytics.get_all_insights(artisan_id, mode=mode)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        'ms': elapsed_ms,
+        'jobs': len(jobs),
+        'mb': sum(job.total_bytes_processed or 0 for job in jobs) / 1e6,
+        'slot_s': sum(job.slot_millis or 0 for job in jobs) / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insights query mode benchmark")
+    parser.add_argument("--artisan", default=os.getenv("TEST_ARTISAN_ID", "test_artisan_123"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query-cache", action="store_true",
+                        help="allow BigQuery cached results (off: every run does the work)")
+    args = parser.parse_args()
+
+    client = analytics.get_bigquery_client()
+    if client is None:
+        print("❌ BigQuery is not configured; this benchmark needs real credentials")
+        return
+    analytics.BIGQUERY_USE_QUERY_CACHE = args.query_cache
+    jobs = record_jobs(client)
+
+    # Warm up the client, connection pool and thread pool
+    analytics.get_all_insights(args.artisan, mode="concurrent")
+
+    print_header(f"get_all_insights for {args.artisan} ({args.runs} runs, median)")
+    print(f"   {'mode':<13} {'latency':>10} {'jobs':>5} {'MB processed':>13} {'slot s':>8}")
+    baseline = None
+    for mode in ("sequential", "concurrent", "consolidated"):
+        samples = [run_mode(args.artisan, mode, jobs) for _ in range(args.runs)]
+        latency = statistics.median(sample['ms'] for sample in samples)
+        baseline = baseline or latency
+        last = samples[-1]
+        print(f"   {mode:<13} {latency:>7.0f} ms {last['jobs']:>5} {last['mb']:>13.2f} "
+              f"{last['slot_s']:>8.2f}  ({baseline / latency:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
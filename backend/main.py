@@ -7,6 +7,10 @@ from routes.catalog_router import router as catalog_router
 from routes.translationAgent_router import router as translation_agent_router
 from routes.analytics_router import router as analytics_router  # NEW
 from routes.best_time_router import router as best_time_router
+from routes.tts_router import router as tts_router
+from routes.image_router import router as image_router
+from services.catalog_jobs import shutdown_render_pool
+from services.share_log import share_log
 from dotenv import load_dotenv
 import os
 
@@ -34,6 +38,13 @@ app.include_router(catalog_router, prefix="/api/catalog", tags=["catalog"])
 app.include_router(translation_agent_router)
 app.include_router(analytics_router)  # NEW: Analytics endpoints
 app.include_router(best_time_router)
+app.include_router(tts_router)
+app.include_router(image_router)
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_render_pool()
+    share_log.close()
 
 @app.get("/")
 async def root():
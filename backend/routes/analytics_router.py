@@ -3,7 +3,7 @@ Analytics Router for FastAPI
 Endpoints for fetching artisan insights from BigQuery
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 import sys
@@ -15,17 +15,30 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from services.bigquery_analytics import (
         get_all_insights,
+        get_mock_data,
         get_target_audience,
         get_best_timing,
         get_price_performance,
         get_key_insights,
         get_recommended_channels
     )
+    from services.interaction_rollup import start_refresher, stop_refresher
 except ImportError:
     # Fallback for development
     print("Warning: Could not import BigQuery analytics. Using mock data.")
     
-    def get_all_insights(artisan_id: str):
+    def start_refresher():
+        pass
+    
+    def stop_refresher():
+        pass
+    
+    def get_all_insights(artisan_id: str, strict: bool = False):
+        if strict:
+            raise RuntimeError("BigQuery analytics is not available")
+        return get_mock_data()
+    
+    def get_mock_data():
         return {
             "target_audience_data": {
                 "target_audience": [
@@ -54,8 +67,25 @@ except ImportError:
             ]
         }
 
+from services.insights_cache import InsightsCache
+
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
+# Only real BigQuery results are cached; mock data is served uncached
+insights_cache = InsightsCache(
+    lambda artisan_id: get_all_insights(artisan_id, strict=True),
+    fallback=lambda artisan_id: get_mock_data()
+)
+
+@router.on_event("startup")
+async def start_rollup_refresh():
+    # Refreshes the hourly interaction rollup when ROLLUP_REFRESH_INTERVAL is set
+    start_refresher()
+
+@router.on_event("shutdown")
+async def stop_rollup_refresh():
+    stop_refresher()
+
 class InsightsResponse(BaseModel):
     target_audience_data: Dict[str, Any]
     timing_data: Dict[str, Any]
@@ -66,6 +96,7 @@ class InsightsResponse(BaseModel):
 @router.get("/insights/{artisan_id}", response_model=InsightsResponse)
 async def get_artisan_insights(
     artisan_id: str,
+    response: Response,
     refresh: Optional[bool] = Query(False, description="Force refresh from BigQuery")
 ):
     """
@@ -73,9 +104,16 @@ async def get_artisan_insights(
     
     - **artisan_id**: Firebase UID of the artisan
     - **refresh**: Set to true to bypass cache and fetch fresh data
+    
+    Cached results are served with an Age header (seconds since they were
+    computed) and X-Insights-Cache: hit, stale (refreshing in the background,
+    or the last good result when BigQuery failed), miss, refresh or fallback
+    (mock data, BigQuery unavailable).
     """
     try:
-        insights = get_all_insights(artisan_id)
+        insights, age, status = await insights_cache.get(artisan_id, refresh=bool(refresh))
+        response.headers["Age"] = str(int(age))
+        response.headers["X-Insights-Cache"] = status
         return insights
     except Exception as e:
         raise HTTPException(
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import tempfile
 from fastapi import APIRouter, UploadFile, Form, HTTPException
@@ -5,6 +6,8 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from agents.caption_generator import caption_generator_agent
+from services.image_enhancement import enhance_image_bytes
+from services.image_hashes import NearDuplicateCache, compute_hashes
 
 router = APIRouter(prefix="/instagram", tags=["Caption Generator"])
 
@@ -12,6 +15,10 @@ APP_NAME = "instagram_pipeline"
 USER_ID = "user123"
 
 session_service = InMemorySessionService()
+
+# Captions of recent uploads; a near-duplicate photo from the same artisan with
+# the same prompt reuses them (never across artisans, whose photos can look alike)
+caption_cache = NearDuplicateCache()
 runner = Runner(
     agent=caption_generator_agent,
     app_name=APP_NAME,
@@ -22,7 +29,9 @@ runner = Runner(
 @router.post("/caption")
 async def generate_caption(
     file: UploadFile,
-    prompt: str = Form(None)  # ✅ receive prompt text from frontend
+    prompt: str = Form(None),  # ✅ receive prompt text from frontend
+    enhance: bool = Form(False),  # run the /api/images/enhance clean-up first
+    artisan_id: str = Form(None)  # scopes caption reuse; no reuse without it
 ):
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
@@ -34,15 +43,30 @@ async def generate_caption(
     try:
         filename = file.filename or "upload.jpg"
         ext = os.path.splitext(filename)[1] or ".jpg"
+        content = await file.read()
+        if enhance:
+            content, _, extension, _ = await asyncio.to_thread(enhance_image_bytes, content)
+            ext = f".{extension}"
+
+        # ✅ Default prompt if user didn't type anything
+        product_text = prompt.strip() if prompt else "Handmade artisan item"
+
+        image_hashes = None
+        cache_context = f"{artisan_id}\n{product_text}"
+        if artisan_id:
+            try:
+                image_hashes = await asyncio.to_thread(compute_hashes, content)
+            except Exception:
+                image_hashes = None
+        cached = caption_cache.get(image_hashes, cache_context) if image_hashes else None
+        if cached:
+            print("♻️ Near-duplicate image, reusing captions")
+            return {**cached, "reused": True}
 
         with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            content = await file.read()
             temp_file.write(content)
             temp_path = temp_file.name
 
-        # ✅ Default prompt if user didn't type anything
-        product_text = prompt.strip() if prompt else "Handmade artisan item"
-
         session_id = f"session_{os.urandom(8).hex()}"
         await session_service.create_session(
             app_name=APP_NAME,
@@ -110,11 +134,14 @@ Generate 3 creative Instagram captions for a handmade/artisan product.
         if not captions:
             raise HTTPException(status_code=500, detail="Failed to generate captions")
 
-        return {
+        result = {
             "captions": captions,
             "status": "success",
             "style": "image+text"
         }
+        if image_hashes:
+            caption_cache.put(image_hashes, result, cache_context)
+        return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing: {str(e)}")
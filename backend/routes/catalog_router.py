@@ -1,18 +1,39 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from firebase_admin import firestore 
 from firebase_config import db
 from pydantic import BaseModel
+import asyncio
+import json
+from urllib.parse import parse_qsl
 from typing import Optional, List
 from services.catalog_service import CatalogService
 from services.whatsapp_service import WhatsAppService
+from services.catalog_jobs import CatalogJobManager, QueueFullError
+from services.catalog_renderer import image_cache
+from services.artisan_cache import artisan_cache, ARTISAN_CATALOG_FIELDS
+from services.share_log import share_log
+from services.whatsapp_campaigns import CampaignManager
+from services import image_hashes
+from services.paged_queries import (
+    CATALOG_LIST_FIELDS, SHARE_LIST_FIELDS, InvalidPageToken, list_artisan_docs
+)
 
 router = APIRouter()
 catalog_service = CatalogService()
 whatsapp_service = WhatsAppService()
+catalog_jobs = CatalogJobManager()
+campaigns = CampaignManager(whatsapp_service)
 
 class GenerateCatalogRequest(BaseModel):
     artisan_id: str
     catalog_type: str = 'pdf'
+    force: bool = False  # regenerate even if products are unchanged
+    pdf_quality: Optional[str] = None  # print / standard / ebook / screen / original
+    paged: bool = False  # image catalogs only: one image per page + manifest
+    products_per_page: int = 10
+    bundle: Optional[str] = None  # 'zip' or 'pdf' combining all pages
+    image_format: Optional[str] = None  # image catalogs: 'jpeg', 'webp' or 'png'
 
 class ShareWhatsAppRequest(BaseModel):
     artisan_id: str
@@ -20,10 +41,17 @@ class ShareWhatsAppRequest(BaseModel):
     catalog_url: str
     custom_message: Optional[str] = None
 
+class CampaignRequest(BaseModel):
+    artisan_id: str
+    phone_numbers: List[str]
+    catalog_url: str
+    custom_message: Optional[str] = None
+
 class BulkShareRequest(BaseModel):
     artisan_id: str
     phone_numbers: List[str]
     catalog_url: str
+    custom_message: Optional[str] = None
 
 @router.get("/")
 async def catalog_root():
@@ -32,30 +60,128 @@ async def catalog_root():
         "message": "Catalog API is running",
         "endpoints": {
             "generate": "POST /generate",
+            "preview": "POST /preview",
+            "jobs": "POST /jobs",
+            "job-status": "GET /jobs/{job_id}",
+            "job-result": "GET /jobs/{job_id}/result",
             "share-whatsapp": "POST /share-whatsapp",
             "share-whatsapp-bulk": "POST /share-whatsapp-bulk",
-            "history": "GET /history/{artisan_id}",
-            "shares": "GET /shares/{artisan_id}"
+            "share-whatsapp-bulk-stream": "POST /share-whatsapp-bulk/stream",
+            "share-whatsapp-bulk-cancel": "POST /share-whatsapp-bulk/{job_id}/cancel",
+            "campaigns": "POST /campaigns",
+            "campaign-progress": "GET /campaigns/{campaign_id}",
+            "campaign-control": "POST /campaigns/{campaign_id}/pause | resume | cancel",
+            "whatsapp-status": "POST /whatsapp/status (Twilio status callback)",
+            "duplicates": "GET /duplicates/{artisan_id}",
+            "history": "GET /history/{artisan_id}?limit=&page_token=",
+            "shares": "GET /shares/{artisan_id}?limit=&page_token="
         }
     }
 
+def run_generation(request: GenerateCatalogRequest, job_id: str = None, preview: bool = False):
+    """Coroutine generating the requested catalog type"""
+    if request.catalog_type == 'pdf':
+        return catalog_service.generate_pdf_catalog(
+            request.artisan_id,
+            force=request.force,
+            job_id=job_id,
+            quality=request.pdf_quality,
+            preview=preview
+        )
+    if request.catalog_type == 'image':
+        return catalog_service.generate_image_catalog(
+            request.artisan_id,
+            force=request.force,
+            paged=request.paged,
+            products_per_page=request.products_per_page,
+            bundle=request.bundle,
+            job_id=job_id,
+            image_format=request.image_format,
+            preview=preview
+        )
+    raise HTTPException(status_code=400, detail="Invalid catalog type. Use 'pdf' or 'image'")
+
 @router.post("/generate")
 async def generate_catalog(request: GenerateCatalogRequest):
     """Generate product catalog (PDF or Image)"""
     try:
-        if request.catalog_type == 'pdf':
-            result = await catalog_service.generate_pdf_catalog(request.artisan_id)
-        elif request.catalog_type == 'image':
-            result = await catalog_service.generate_image_catalog(request.artisan_id)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid catalog type. Use 'pdf' or 'image'")
-        
+        result = await run_generation(request)
         return result
     
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/preview")
+async def preview_catalog(request: GenerateCatalogRequest):
+    """
+    Return the rendered PDF/image directly in the response while it is
+    published to Storage in the background. Unchanged catalogs redirect to
+    the already published file.
+    """
+    if request.paged:
+        raise HTTPException(status_code=400, detail="Preview is not available for paged catalogs")
+    try:
+        result = await run_generation(request, preview=True)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {
+        'X-Catalog-Id': result['catalog_id'],
+        'X-Catalog-Url': result['catalog_url'],
+    }
+    if result.get('reused'):
+        return RedirectResponse(result['catalog_url'], status_code=303, headers=headers)
+    
+    headers['Content-Disposition'] = f'inline; filename="{result["filename"]}"'
+    return Response(content=result['data'], media_type=result['content_type'], headers=headers)
+
+@router.post("/jobs", status_code=202)
+async def submit_catalog_job(request: GenerateCatalogRequest):
+    """Queue catalog generation in the background and return a job ID to poll"""
+    if request.catalog_type not in ('pdf', 'image'):
+        raise HTTPException(status_code=400, detail="Invalid catalog type. Use 'pdf' or 'image'")
+    try:
+        job = catalog_jobs.submit(
+            lambda job_id: run_generation(request, job_id),
+            artisan_id=request.artisan_id,
+            catalog_type=request.catalog_type
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    return {
+        **job,
+        'status_url': f"/api/catalog/jobs/{job['job_id']}",
+        'result_url': f"/api/catalog/jobs/{job['job_id']}/result"
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_catalog_job(job_id: str):
+    """Job status with per-product progress"""
+    job = catalog_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/result")
+async def get_catalog_job_result(job_id: str):
+    """Catalog result once the job completes (202 with status while pending)"""
+    job = catalog_jobs.get_result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=job['error'])
+    if job['status'] != 'completed':
+        return JSONResponse(status_code=202, content={k: v for k, v in job.items() if k != 'result'})
+    return job['result']
 
 @router.post("/share-whatsapp")
 async def share_whatsapp(request: ShareWhatsAppRequest):
@@ -98,28 +224,167 @@ async def share_whatsapp_bulk(request: BulkShareRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/share-whatsapp-bulk/stream")
+async def share_whatsapp_bulk_stream(request: BulkShareRequest):
+    """
+    Send to many numbers concurrently (rate limited) and stream one JSON line
+    per number as it completes. The first line carries the job_id used to
+    cancel; the last line is a summary.
+    """
+    try:
+        body = whatsapp_service.prepare_message(request.artisan_id, request.custom_message)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    job_id, cancel_event = whatsapp_service.start_bulk_job()
+    
+    async def stream():
+        counts = {'sent': 0, 'failed': 0, 'cancelled': 0}
+        try:
+            yield json.dumps({'job_id': job_id, 'total': len(request.phone_numbers)}) + "\n"
+            async for result in whatsapp_service.send_bulk_stream(
+                request.artisan_id, request.phone_numbers, request.catalog_url, body, cancel_event
+            ):
+                if result['success']:
+                    counts['sent'] += 1
+                elif result.get('cancelled'):
+                    counts['cancelled'] += 1
+                else:
+                    counts['failed'] += 1
+                yield json.dumps(result) + "\n"
+            yield json.dumps({'done': True, 'total': len(request.phone_numbers), **counts}) + "\n"
+        finally:
+            whatsapp_service.bulk_jobs.pop(job_id, None)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.post("/share-whatsapp-bulk/{job_id}/cancel")
+async def cancel_whatsapp_bulk(job_id: str):
+    """Stop a streaming bulk send; numbers not yet sent are skipped"""
+    if not whatsapp_service.cancel_bulk_job(job_id):
+        raise HTTPException(status_code=404, detail="Bulk send not found or already finished")
+    return {'success': True, 'job_id': job_id, 'cancelled': True}
+
+
+@router.on_event("startup")
+async def resume_campaigns():
+    campaigns.start_sweeper()
+
+@router.on_event("shutdown")
+async def stop_campaigns():
+    await campaigns.shutdown()
+
+@router.post("/campaigns", status_code=202)
+async def create_campaign(request: CampaignRequest):
+    """
+    Persistent bulk send. Recipients and progress are stored, so the
+    campaign continues after a restart and no number is messaged twice;
+    poll GET /campaigns/{campaign_id} for progress.
+    """
+    try:
+        return await campaigns.create(
+            request.artisan_id, request.phone_numbers, request.catalog_url, request.custom_message
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    campaign = await campaigns.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+@router.post("/campaigns/{campaign_id}/{action}")
+async def control_campaign(campaign_id: str, action: str):
+    statuses = {'pause': 'paused', 'resume': 'running', 'cancel': 'cancelled'}
+    if action not in statuses:
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
+    try:
+        campaign = await campaigns.set_status(campaign_id, statuses[action])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@router.post("/whatsapp/status", status_code=204)
+async def whatsapp_status_callback(request: Request):
+    """
+    Twilio status callback (sent/delivered/read/failed). Events are only
+    collapsed in memory here; services.share_log writes them in batches,
+    so the handler answers immediately even under bursts.
+    """
+    params = dict(parse_qsl((await request.body()).decode('utf-8')))
+    if not whatsapp_service.is_valid_callback(request.headers.get('X-Twilio-Signature'), params):
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    
+    message_sid = params.get('MessageSid')
+    status = params.get('MessageStatus')
+    if message_sid and status:
+        share_log.update_status(message_sid, status, params.get('ErrorCode'))
+    return Response(status_code=204)
+
+
 @router.get("/history/{artisan_id}")
-async def get_catalog_history(artisan_id: str, limit: int = 5):
+async def get_catalog_history(artisan_id: str, limit: int = 5, page_token: Optional[str] = None):
+    """Newest catalogs first; pass next_page_token back as page_token for older ones"""
     try:
-        docs = db.collection('catalogs').where('artisan_id', '==', artisan_id)\
-            .order_by('created_at', direction=firestore.Query.DESCENDING)\
-            .limit(limit).stream()
-        history = [doc.to_dict() for doc in docs]
-        return {"success": True, "data": history}
+        page = await list_artisan_docs('catalogs', artisan_id, CATALOG_LIST_FIELDS, limit, page_token)
+        return {"success": True, **page}
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error fetching catalog history: {e}")
-        return {"success": False, "data": []}
+        return {"success": False, "data": [], "next_page_token": None}
 
 
 @router.get("/shares/{artisan_id}")
-async def get_catalog_shares(artisan_id: str, limit: int = 10):
+async def get_catalog_shares(artisan_id: str, limit: int = 10, page_token: Optional[str] = None):
+    """Newest shares first; pass next_page_token back as page_token for older ones"""
     try:
-        docs = db.collection('whatsapp_shares').where('artisan_id', '==', artisan_id)\
-            .order_by('created_at', direction=firestore.Query.DESCENDING)\
-            .limit(limit).stream()
-        shares = [doc.to_dict() for doc in docs]
-        return {"success": True, "data": shares}
+        page = await list_artisan_docs('whatsapp_shares', artisan_id, SHARE_LIST_FIELDS, limit, page_token)
+        return {"success": True, **page}
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error fetching WhatsApp shares: {e}")
-        return {"success": False, "data": []}
+        return {"success": False, "data": [], "next_page_token": None}
+
+
+@router.get("/duplicates/{artisan_id}")
+async def get_duplicate_images(artisan_id: str, threshold: Optional[int] = None, sync: bool = True):
+    """
+    Groups of product images that look the same (perceptual hash distance
+    <= threshold bits of 64). sync=true first hashes any images not indexed yet.
+    """
+    try:
+        indexed = await image_hashes.sync_artisan(artisan_id) if sync else 0
+        artisan_data = await asyncio.to_thread(artisan_cache.get, artisan_id, ARTISAN_CATALOG_FIELDS)
+        if artisan_data is None:
+            raise ValueError(f"Artisan not found with ID: {artisan_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    # Indexing invalidated the cached entry, so this read has the new hashes
+    stored = artisan_data.get(image_hashes.HASH_FIELD) or {}
+    
+    groups = image_hashes.find_duplicates(artisan_data.get('products', []), stored, threshold)
+    return {
+        "success": True,
+        "threshold": image_hashes.IMAGE_DUPLICATE_THRESHOLD if threshold is None else threshold,
+        "indexed_images": len(stored),
+        "newly_indexed": indexed,
+        "groups": groups
+    }
+
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "artisans": artisan_cache.stats(),
+        "images": image_cache.stats()
+    }
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import io
+import zipfile
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import Response
+from services.catalog_service import CatalogService
+from services.catalog_renderer import image_cache
+from services.image_enhancement import OUTPUT_FORMATS, enhance_batch, enhance_image_bytes
+
+router = APIRouter(prefix="/api/images", tags=["Image Enhancement"])
+
+MAX_BATCH_IMAGES = 50
+
+
+def enhance_options(auto_levels, brightness, contrast, white_background, sharpen) -> dict:
+    return {
+        'auto_levels': auto_levels,
+        'brightness': brightness,
+        'contrast': contrast,
+        'white_background': white_background,
+        'sharpen': sharpen,
+    }
+
+
+def publish_enhanced(data: bytes, content_type: str, extension: str) -> str:
+    """
+    Upload to Storage under a content hash and seed the catalog image cache,
+    so the URL can be used as a product image_url (catalogs then render it
+    without downloading it again) or handed to the caption/posting flows.
+    """
+    filename = f"enhanced/{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+    url = CatalogService.upload_public(filename, io.BytesIO(data), content_type)
+    image_cache.store_original(url, data, content_type=content_type)
+    return url
+
+
+async def read_image(upload: UploadFile) -> bytes:
+    if not upload.content_type or not upload.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail=f"{upload.filename or 'File'} must be an image")
+    return await upload.read()
+
+
+@router.post("/enhance")
+async def enhance_image(
+    file: UploadFile = File(...),
+    auto_levels: bool = Form(True),
+    brightness: float = Form(12.0),
+    contrast: float = Form(1.08),
+    white_background: bool = Form(False),
+    sharpen: float = Form(0.5),
+    output_format: str = Form('jpeg'),
+    upload: bool = Form(False)
+):
+    """
+    Enhance one product photo. Returns the enhanced image, or with upload=true
+    a JSON body with its public URL.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"output_format must be one of {list(OUTPUT_FORMATS)}")
+    content = await read_image(file)
+
+    try:
+        data, content_type, extension, stats = await asyncio.to_thread(
+            enhance_image_bytes, content, output_format,
+            **enhance_options(auto_levels, brightness, contrast, white_background, sharpen)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not process image: {e}")
+
+    if upload:
+        try:
+            url = await asyncio.to_thread(publish_enhanced, data, content_type, extension)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error uploading enhanced image: {e}")
+        return {"success": True, "url": url, **stats}
+
+    return Response(
+        content=data,
+        media_type=content_type,
+        headers={
+            'X-Enhance-Ms': str(stats['ms']),
+            'X-Image-Size': f"{stats['width']}x{stats['height']}",
+        }
+    )
+
+
+@router.post("/enhance/batch")
+async def enhance_images_batch(
+    files: List[UploadFile] = File(...),
+    auto_levels: bool = Form(True),
+    brightness: float = Form(12.0),
+    contrast: float = Form(1.08),
+    white_background: bool = Form(False),
+    sharpen: float = Form(0.5),
+    output_format: str = Form('jpeg'),
+    upload: bool = Form(False)
+):
+    """
+    Enhance many photos in parallel. Returns a ZIP of the results, or with
+    upload=true a JSON list of public URLs (per-file errors are reported
+    without failing the batch).
+    """
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"output_format must be one of {list(OUTPUT_FORMATS)}")
+    contents = [await read_image(upload_file) for upload_file in files]
+
+    results = await asyncio.to_thread(
+        enhance_batch, contents, output_format,
+        **enhance_options(auto_levels, brightness, contrast, white_background, sharpen)
+    )
+
+    if upload:
+        async def publish(result):
+            if isinstance(result, dict):
+                return result
+            data, content_type, extension, stats = result
+            try:
+                url = await asyncio.to_thread(publish_enhanced, data, content_type, extension)
+                return {"url": url, **stats}
+            except Exception as e:
+                return {"error": f"Upload failed: {e}"}
+
+        published = await asyncio.gather(*[publish(result) for result in results])
+        return {
+            "success": True,
+            "results": [
+                {"filename": upload_file.filename, **result}
+                for upload_file, result in zip(files, published)
+            ]
+        }
+
+    buffer = io.BytesIO()
+    failed = []
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for index, (upload_file, result) in enumerate(zip(files, results), start=1):
+            if isinstance(result, dict):
+                print(f"⚠️ Could not enhance {upload_file.filename}: {result['error']}")
+                failed.append(upload_file.filename)
+                continue
+            data, _, extension, _ = result
+            stem = (upload_file.filename or f"image_{index}").rsplit('.', 1)[0]
+            archive.writestr(f"{index:02d}_{stem}_enhanced.{extension}", data)
+
+    headers = {
+        'Content-Disposition': 'attachment; filename="enhanced_images.zip"',
+        'X-Failed-Count': str(len(failed)),
+    }
+    return Response(content=buffer.getvalue(), media_type="application/zip", headers=headers)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import tempfile
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
@@ -5,6 +6,7 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from agents.instagram_poster import instagram_poster_agent
+from services.image_enhancement import enhance_image_bytes
 
 router = APIRouter(prefix="/instagram", tags=["Instagram"])
 
@@ -20,10 +22,11 @@ runner = Runner(
 
 
 @router.post("/post")
-async def post_to_instagram(image: UploadFile = File(...), caption: str = Form("")):
+async def post_to_instagram(image: UploadFile = File(...), caption: str = Form(""), enhance: bool = Form(False)):
     """
     Post an image to Instagram with optional caption.
-    Generates caption if not provided.
+    Generates caption if not provided. enhance=true runs the
+    /api/images/enhance clean-up on the image before posting.
     """
     if not image:
         raise HTTPException(status_code=400, detail="No file uploaded")
@@ -37,9 +40,12 @@ async def post_to_instagram(image: UploadFile = File(...), caption: str = Form("
         # Save uploaded file temporarily
         filename = image.filename or "upload.jpg"
         ext = os.path.splitext(filename)[1] or ".jpg"
+        content = await image.read()
+        if enhance:
+            content, _, extension, _ = await asyncio.to_thread(enhance_image_bytes, content)
+            ext = f".{extension}"
 
         with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            content = await image.read()
             temp_file.write(content)
             temp_path = temp_file.name
 
@@ -1,17 +1,38 @@
 import os
-import tempfile
-from fastapi import APIRouter, UploadFile, Form, HTTPException
+import asyncio
+from fastapi import APIRouter, UploadFile, Form, HTTPException, WebSocket, WebSocketDisconnect
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
-from agents.translator import translator_agent
+from agents.translator import (
+    translator_agent,
+    resolve_lang_code,
+    recognize_pcm,
+    translate_to_english,
+    pop_segment_timings,
+)
 import json
-from pydub import AudioSegment
+import speech_recognition as sr
+from services.audio_processing import (
+    StreamDecoder,
+    decode_to_pcm,
+    pcm_duration,
+    store_pcm,
+    release_pcm,
+    trim_silence,
+    find_silence_cut,
+)
 
 router = APIRouter(prefix="/translator", tags=["Speech Translator"])
 
 APP_NAME = "speech_translator"
 USER_ID = "user123"
+# Streaming: audio is cut at the first good pause after STREAM_SEGMENT_SECONDS
+# (hard cut at STREAM_MAX_SEGMENT_SECONDS) for incremental results
+STREAM_SEGMENT_SECONDS = float(os.getenv("STREAM_SEGMENT_SECONDS", "4"))
+STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", "10"))
+STREAM_MIN_TAIL_SECONDS = 0.3
+
 session_service = InMemorySessionService()
 runner = Runner(
     agent=translator_agent,
@@ -19,95 +40,42 @@ runner = Runner(
     session_service=session_service
 )
 
-def convert_to_wav_pydub(input_path: str, output_path: str):
-    """Convert audio file to WAV format using pydub"""
-    try:
-        print(f"🔄 Loading audio file: {input_path}")
-        
-        # Load audio file (supports webm, mp3, etc.)
-        audio = AudioSegment.from_file(input_path)
-        
-        print(f"📊 Original audio: {len(audio)}ms, {audio.frame_rate}Hz, {audio.channels} channel(s)")
-        
-        # Convert to WAV with proper settings for speech recognition
-        audio = audio.set_frame_rate(16000).set_channels(1)
-        
-        # Export as WAV
-        audio.export(output_path, format="wav")
-        print(f"✅ Converted to WAV: {output_path}")
-        
-        # Verify the output file
-        if os.path.exists(output_path):
-            size = os.path.getsize(output_path)
-            print(f"✅ WAV file created: {size} bytes")
-            return True
-        else:
-            print(f"❌ WAV file not found after conversion")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Pydub conversion error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
-
 @router.post("/translate")
 async def translate_audio(file: UploadFile, lang_code: str = Form(...)):
     """Accepts an uploaded audio file + language code and returns the English translation."""
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
     
-    temp_input_path = None
-    temp_wav_path = None
+    audio_key = None
     
     try:
         print(f"\n{'='*60}")
         print(f"📥 Received file: {file.filename}, Language: {lang_code}")
         print(f"   Content-Type: {file.content_type}")
         
-        # Save uploaded file temporarily
-        suffix = ".webm" if "webm" in str(file.content_type).lower() else ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_input_path = temp_file.name
+        content = await file.read()
+        print(f"   File size: {len(content)} bytes")
         
-        input_size = os.path.getsize(temp_input_path)
-        print(f"💾 Saved temporary file: {temp_input_path}")
-        print(f"   File size: {input_size} bytes")
-        
-        if input_size == 0:
+        if len(content) == 0:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
         
-        # Convert to WAV format
-        temp_wav_path = temp_input_path.replace(suffix, "_converted.wav")
-        
-        # Try to convert if not already WAV
-        if suffix != ".wav":
-            print("🔄 Converting to WAV format using pydub...")
-            conversion_success = convert_to_wav_pydub(temp_input_path, temp_wav_path)
-            if not conversion_success:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="Audio conversion failed. Please check FFmpeg installation."
-                )
-        else:
-            # If already WAV, just copy/rename it
-            import shutil
-            shutil.copy(temp_input_path, temp_wav_path)
-            print(f"📋 Copied WAV file to: {temp_wav_path}")
-        
-        print(f"✅ WAV file ready: {temp_wav_path}")
-        
-        # Verify file exists and has content
-        if not os.path.exists(temp_wav_path):
-            raise HTTPException(status_code=500, detail="WAV file was not created")
+        # Decode WebM/Opus, MP3 or WAV straight to 16 kHz mono PCM in memory
+        try:
+            pcm = await asyncio.to_thread(decode_to_pcm, content)
+        except Exception as decode_error:
+            print(f"❌ Audio decode error: {decode_error}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Could not decode audio: {str(decode_error)}"
+            )
         
-        wav_size = os.path.getsize(temp_wav_path)
-        print(f"📊 Final WAV file size: {wav_size} bytes")
+        if not pcm:
+            raise HTTPException(status_code=400, detail="Decoded audio is empty")
         
-        if wav_size == 0:
-            raise HTTPException(status_code=500, detail="WAV file is empty")
+        print(f"✅ Decoded to PCM: {len(pcm)} bytes, {pcm_duration(pcm):.2f}s")
+        audio_key = store_pcm(pcm)
         
         # Create a new session for this translation request
         session_id = f"session_{os.urandom(8).hex()}"
@@ -121,7 +89,7 @@ async def translate_audio(file: UploadFile, lang_code: str = Form(...)):
             role="user",
             parts=[
                 types.Part(
-                    text=f"Translate this audio into English. Audio path: {temp_wav_path}, Language: {lang_code}"
+                    text=f"Translate this audio into English. Audio path: {audio_key}, Language: {lang_code}"
                 )
             ]
         )
@@ -151,11 +119,15 @@ async def translate_audio(file: UploadFile, lang_code: str = Form(...)):
                 print(f"   Detected: {detected}")
                 print(f"   Translation: {translation}")
                 print(f"{'='*60}\n")
-                return {
+                response = {
                     "status": "success",
                     "translation": translation,
                     "detected_text": detected
                 }
+                segment_timings = pop_segment_timings(audio_key)
+                if segment_timings:
+                    response["segments"] = segment_timings
+                return response
             else:
                 error_msg = result_json.get("message", "Unknown error")
                 print(f"❌ Translation failed: {error_msg}")
@@ -180,11 +152,152 @@ async def translate_audio(file: UploadFile, lang_code: str = Form(...)):
         raise HTTPException(status_code=500, detail=f"Error translating audio: {str(e)}")
     
     finally:
-        # Clean up temporary files
-        for path in [temp_input_path, temp_wav_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                    print(f"🗑️ Cleaned up: {path}")
-                except OSError as e:
-                    print(f"⚠️ Could not delete {path}: {e}")
\ No newline at end of file
+        # Drop the in-memory buffer
+        if audio_key:
+            release_pcm(audio_key)
+            pop_segment_timings(audio_key)
+
+
+@router.websocket("/stream")
+async def stream_translate(websocket: WebSocket, lang_code: str = "hi-IN"):
+    """
+    Streaming speech translation.
+
+    Protocol:
+      - connect to /translator/stream?lang_code=hi-IN
+      - send binary audio chunks as they are recorded (MediaRecorder timeslices,
+        i.e. consecutive pieces of one WebM/Ogg/WAV stream)
+      - send the text message "stop" when recording ends
+    Server messages (JSON):
+      {"type": "partial", "segment", "detected_text", "translation", "full_text", "full_translation"}
+      {"type": "final", "detected_text", "translation", "segments"}
+      {"type": "error", "message"}
+    """
+    await websocket.accept()
+    lang_code = resolve_lang_code(lang_code)
+    print(f"\n🔌 Streaming translation opened ({lang_code})")
+
+    received = 0
+    decoder = StreamDecoder()
+    pending = bytearray()  # decoded PCM not yet queued for recognition
+    segments = asyncio.Queue()
+    detected_parts = []
+    translated_parts = []
+
+    async def send_json(payload: dict):
+        try:
+            await websocket.send_json(payload)
+        except Exception:
+            pass
+
+    async def process_segments():
+        """Recognize and translate segments in arrival order"""
+        index = 0
+        while True:
+            pcm = await segments.get()
+            if pcm is None:
+                break
+            index += 1
+            speech_pcm, _ = trim_silence(pcm)
+            if not speech_pcm:
+                print(f"   🔇 Segment {index}: silence, skipped")
+                continue
+            try:
+                text = await asyncio.to_thread(recognize_pcm, speech_pcm, lang_code)
+            except sr.UnknownValueError:
+                print(f"   🔇 Segment {index}: no speech recognized")
+                continue
+            except sr.RequestError as e:
+                await send_json({"type": "error", "message": f"Speech recognition service error: {str(e)}"})
+                continue
+
+            try:
+                context = " ".join(detected_parts[-2:]) or None
+                translation = await asyncio.to_thread(translate_to_english, text, lang_code, context)
+            except Exception as e:
+                await send_json({"type": "error", "message": f"Translation service error: {str(e)}"})
+                translation = ""
+
+            detected_parts.append(text)
+            translated_parts.append(translation)
+            print(f"   🗣️ Segment {index}: {text} -> {translation}")
+            await send_json({
+                "type": "partial",
+                "segment": index,
+                "detected_text": text,
+                "translation": translation,
+                "full_text": " ".join(detected_parts),
+                "full_translation": " ".join(t for t in translated_parts if t),
+            })
+
+    worker = asyncio.create_task(process_segments())
+
+    async def enqueue_ready(final: bool):
+        """Queue complete segments from the PCM decoded so far"""
+        if final:
+            pending.extend(await asyncio.to_thread(decoder.finish))
+            if decoder.error and not pending:
+                await send_json({"type": "error", "message": f"Could not decode audio: {str(decoder.error)}"})
+                return
+        else:
+            pending.extend(decoder.drain())
+
+        # Only the uncommitted tail (at most one max-length segment) is scanned
+        while True:
+            cut = find_silence_cut(
+                bytes(pending),
+                STREAM_SEGMENT_SECONDS,
+                STREAM_MAX_SEGMENT_SECONDS,
+                final=False
+            )
+            if not cut:
+                break
+            await segments.put(bytes(pending[:cut]))
+            del pending[:cut]
+
+        if final and pcm_duration(pending) >= STREAM_MIN_TAIL_SECONDS:
+            await segments.put(bytes(pending))
+            pending.clear()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect()
+
+            if message.get("bytes"):
+                received += len(message["bytes"])
+                decoder.feed(message["bytes"])
+                await enqueue_ready(final=False)
+            elif message.get("text") is not None:
+                text = message["text"].strip()
+                if text == "stop" or (text.startswith("{") and json.loads(text).get("type") == "stop"):
+                    break
+
+        if received:
+            await enqueue_ready(final=True)
+        await segments.put(None)
+        await worker
+
+        await send_json({
+            "type": "final",
+            "detected_text": " ".join(detected_parts),
+            "translation": " ".join(t for t in translated_parts if t),
+            "segments": len(detected_parts),
+        })
+        print(f"✅ Streaming translation complete ({len(detected_parts)} segments)")
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        print("🔌 Streaming client disconnected")
+    except Exception as e:
+        print(f"❌ Streaming translation error: {str(e)}")
+        await send_json({"type": "error", "message": f"Error translating audio: {str(e)}"})
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+    finally:
+        decoder.close()
+        if not worker.done():
+            worker.cancel()
@@ -0,0 +1,67 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from agents.translator import LANGUAGES, synthesize_speech
+from services.tts_cache import TTSCache
+
+router = APIRouter(prefix="/tts", tags=["Text to Speech"])
+
+MAX_TTS_CHARS = 3000
+SUPPORTED_LANGS = set(LANGUAGES) | {"en-IN"}
+
+# Synthesis backend is injected so it can be swapped (e.g. a stand-in offline)
+tts_cache = TTSCache(synthesizer=synthesize_speech)
+
+
+class SpeakRequest(BaseModel):
+    text: str
+    lang_code: str = "hi-IN"
+
+
+async def _speak(text: str, lang_code: str):
+    text = (text or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="text is required")
+    if len(text) > MAX_TTS_CHARS:
+        raise HTTPException(status_code=400, detail=f"text must be at most {MAX_TTS_CHARS} characters")
+    if lang_code not in SUPPORTED_LANGS:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {lang_code}")
+
+    try:
+        path, cache_hit = await asyncio.to_thread(tts_cache.get_or_synthesize, text, lang_code)
+    except Exception as e:
+        print(f"❌ TTS error: {e}")
+        raise HTTPException(status_code=502, detail=f"Speech synthesis failed: {str(e)}")
+
+    print(f"🔊 TTS {'cache hit' if cache_hit else 'synthesized'} ({lang_code}, {len(text)} chars)")
+
+    # FileResponse answers Range requests, so audio players can seek/resume
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={
+            "Cache-Control": "public, max-age=86400, immutable",
+            "X-TTS-Cache": "HIT" if cache_hit else "MISS",
+        },
+    )
+
+
+@router.get("/speak")
+async def speak(
+    text: str = Query(..., description="Caption or catalog text to read aloud"),
+    lang_code: str = Query("hi-IN", description="Language code from LANGUAGES")
+):
+    """Return MP3 audio of text (usable directly as an <audio> src)"""
+    return await _speak(text, lang_code)
+
+
+@router.post("/speak")
+async def speak_post(request: SpeakRequest):
+    """Same as GET /tts/speak, for texts too long for a query string"""
+    return await _speak(request.text, request.lang_code)
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return tts_cache.stats()
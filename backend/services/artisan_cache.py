@@ -0,0 +1,111 @@
+"""
+Artisan Cache Module
+Shared in-process read-through cache of artisan user documents. Reads use
+Firestore field masks so callers only pull the fields they need (profile vs.
+the embedded products array); entries are bounded by size and TTL, and the
+backend's own writes to a user document invalidate it.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from firebase_config import db
+
+ARTISAN_PROFILE_FIELDS = ('name', 'email', 'phone', 'type')
+ARTISAN_CATALOG_FIELDS = ARTISAN_PROFILE_FIELDS + ('products', 'image_hashes')
+
+ARTISAN_CACHE_MAX_ENTRIES = int(os.getenv("ARTISAN_CACHE_MAX_ENTRIES", "256"))
+ARTISAN_CACHE_TTL = int(os.getenv("ARTISAN_CACHE_TTL", "300"))
+
+
+class _Entry:
+    __slots__ = ("data", "fields", "loaded_at")
+
+    def __init__(self, data: dict, fields: set):
+        self.data = data
+        self.fields = fields
+        self.loaded_at = time.time()
+
+
+class ArtisanCache:
+    """
+    get(artisan_id, fields) returns a dict with the requested fields (plus
+    'id'), or None if the artisan doesn't exist. A cached entry serves any
+    request for a subset of the fields it holds; otherwise the union of
+    fields is fetched with a projection and merged in.
+
+    Entries older than ttl are refetched (products edited from the app show
+    up within ttl); code that writes a user document calls invalidate().
+    Least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        self.max_entries = max_entries or ARTISAN_CACHE_MAX_ENTRIES
+        self.ttl = ttl or ARTISAN_CACHE_TTL
+
+        self._entries = OrderedDict()  # artisan_id -> _Entry, oldest first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, artisan_id: str, fields=ARTISAN_PROFILE_FIELDS):
+        wanted = set(fields)
+        with self._lock:
+            entry = self._entries.get(artisan_id)
+            if entry and wanted <= entry.fields and time.time() - entry.loaded_at < self.ttl:
+                self._entries.move_to_end(artisan_id)
+                self._hits += 1
+                return self._project(artisan_id, entry.data, wanted)
+            self._misses += 1
+            if entry and time.time() - entry.loaded_at < self.ttl:
+                wanted |= entry.fields  # widen the entry rather than replace it
+
+        doc = db.collection('users').document(artisan_id).get(field_paths=sorted(wanted))
+        if not doc.exists:
+            self.invalidate(artisan_id)
+            return None
+
+        data = doc.to_dict() or {}
+        self._store(artisan_id, data, wanted)
+        return self._project(artisan_id, data, set(fields))
+
+    @staticmethod
+    def _project(artisan_id: str, data: dict, fields: set) -> dict:
+        projected = {field: data[field] for field in fields if field in data}
+        projected['id'] = artisan_id
+        return projected
+
+    def _store(self, artisan_id: str, data: dict, fields: set):
+        with self._lock:
+            entry = self._entries.get(artisan_id)
+            if entry:
+                entry.data = data
+                entry.fields = fields
+                entry.loaded_at = time.time()
+                self._entries.move_to_end(artisan_id)
+            else:
+                self._entries[artisan_id] = _Entry(data, fields)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, artisan_id: str):
+        with self._lock:
+            self._entries.pop(artisan_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+artisan_cache = ArtisanCache()
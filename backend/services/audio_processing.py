@@ -0,0 +1,434 @@
+"""
+Audio Processing Module
+In-process decoding of uploaded voice notes into 16 kHz mono PCM
+"""
+
+import io
+import threading
+import uuid
+import wave
+from typing import Optional
+
+import numpy as np
+
+try:
+    import av  # PyAV links libavcodec in-process, no ffmpeg subprocess
+except ImportError:
+    av = None
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    resample_poly = None
+
+TARGET_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+MEMORY_PREFIX = "memory://"
+
+# Voice-activity detection
+VAD_FRAME_MS = 30
+VAD_PADDING_MS = 250        # kept around speech so word onsets are not clipped
+VAD_NOISE_MULTIPLIER = 3.0  # speech must be this much louder than the noise floor
+VAD_MIN_ENERGY = 120.0      # RMS floor (int16 units, ~ -49 dBFS) for near-silent rooms
+# Noise estimates are capped here (~ -30 dBFS): in a recording with no pauses
+# the quietest frames are speech, which must not become the noise floor
+VAD_MAX_NOISE_FLOOR = 1000.0
+
+# Segmentation of long recordings
+SEGMENT_MIN_SECONDS = 5.0
+SEGMENT_MAX_SECONDS = 20.0
+
+# Decoded buffers handed to the translator agent by reference
+_pcm_buffers = {}
+_pcm_lock = threading.Lock()
+
+
+def is_wav(data: bytes) -> bool:
+    """Check RIFF/WAVE magic bytes"""
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _resample(samples: np.ndarray, source_rate: int) -> np.ndarray:
+    """Resample float32 mono samples to TARGET_SAMPLE_RATE"""
+    if source_rate == TARGET_SAMPLE_RATE or samples.size == 0:
+        return samples
+
+    if resample_poly is not None:
+        divisor = np.gcd(source_rate, TARGET_SAMPLE_RATE)
+        return resample_poly(samples, TARGET_SAMPLE_RATE // divisor, source_rate // divisor).astype(np.float32)
+
+    # Linear interpolation fallback when scipy is not installed
+    duration = samples.size / source_rate
+    target_len = int(round(duration * TARGET_SAMPLE_RATE))
+    src_times = np.arange(samples.size, dtype=np.float64) / source_rate
+    dst_times = np.arange(target_len, dtype=np.float64) / TARGET_SAMPLE_RATE
+    return np.interp(dst_times, src_times, samples).astype(np.float32)
+
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    """Convert float32 samples in [-1, 1] to little-endian int16 bytes"""
+    clipped = np.clip(samples, -1.0, 1.0)
+    return (clipped * 32767.0).astype("<i2").tobytes()
+
+
+def _decode_wav(data: bytes) -> bytes:
+    """Decode WAV bytes with the stdlib reader and NumPy"""
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        width = wav_file.getsampwidth()
+        rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return _to_pcm16(_resample(samples, rate))
+
+
+def _decode_with_av(data: bytes, partial: bool = False) -> bytes:
+    """Decode any container/codec libav understands (WebM/Opus, MP3, OGG...)"""
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+    chunks = []
+
+    with av.open(io.BytesIO(data), mode="r") as container:
+        stream = next((s for s in container.streams if s.type == "audio"), None)
+        if stream is None:
+            raise ValueError("No audio stream found in upload")
+
+        try:
+            for frame in container.decode(stream):
+                for out_frame in resampler.resample(frame):
+                    chunks.append(out_frame.to_ndarray().tobytes())
+        except av.error.FFmpegError:
+            # A recording that is still in progress ends mid-cluster;
+            # keep whatever decoded cleanly instead of failing the request.
+            if not partial or not chunks:
+                raise
+
+    for out_frame in resampler.resample(None):
+        chunks.append(out_frame.to_ndarray().tobytes())
+
+    return b"".join(chunks)
+
+
+def _decode_with_pydub(data: bytes) -> bytes:
+    """Last-resort decode through pydub when PyAV is not installed"""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(data))
+    audio = audio.set_frame_rate(TARGET_SAMPLE_RATE).set_channels(1).set_sample_width(SAMPLE_WIDTH)
+    return audio.raw_data
+
+
+def decode_to_pcm(data: bytes, partial: bool = False) -> bytes:
+    """
+    Decode uploaded audio bytes into 16 kHz mono 16-bit PCM, fully in memory.
+
+    Args:
+        data: Raw bytes of a WAV, WebM/Opus, MP3 (or other libav format) upload
+        partial: Tolerate a truncated tail, e.g. a recording still being streamed
+
+    Returns:
+        bytes: Little-endian int16 PCM samples at TARGET_SAMPLE_RATE
+    """
+    if not data:
+        raise ValueError("Audio data is empty")
+
+    if is_wav(data):
+        return _decode_wav(data)
+
+    if av is not None:
+        return _decode_with_av(data, partial=partial)
+
+    return _decode_with_pydub(data)
+
+
+class _StreamReader:
+    """File-like object over a growing byte stream; read() blocks for more data"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def feed(self, data: bytes):
+        with self._cond:
+            if self._closed:
+                return
+            self._buffer.extend(data)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while not self._buffer and not self._closed:
+                self._cond.wait()
+            if size is None or size < 0:
+                size = len(self._buffer)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+
+class StreamDecoder:
+    """
+    Incremental decoder for one audio stream arriving in chunks (MediaRecorder
+    WebM/Ogg timeslices, or WAV). One libav demuxer/decoder runs in a thread
+    for the whole stream, so every byte is decoded once; drain() returns the
+    16 kHz mono PCM decoded since the previous call. Without PyAV the stream
+    is buffered and decoded once by finish().
+    """
+
+    def __init__(self):
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self.error = None
+        self._reader = _StreamReader()
+        self._thread = None
+        self._raw = bytearray() if av is None else None
+        if av is not None:
+            self._thread = threading.Thread(target=self._run, name="stream-decoder", daemon=True)
+            self._thread.start()
+
+    def feed(self, data: bytes):
+        if self._raw is not None:
+            self._raw.extend(data)
+        else:
+            self._reader.feed(data)
+
+    def _append(self, frames):
+        for out_frame in frames:
+            with self._lock:
+                self._pcm.extend(out_frame.to_ndarray().tobytes())
+
+    def _run(self):
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+        try:
+            with av.open(self._reader, mode="r") as container:
+                stream = next((s for s in container.streams if s.type == "audio"), None)
+                if stream is None:
+                    raise ValueError("No audio stream found in upload")
+                try:
+                    for frame in container.decode(stream):
+                        self._append(resampler.resample(frame))
+                except av.error.FFmpegError:
+                    # Recording stopped mid-cluster; keep what decoded cleanly
+                    if not self._pcm:
+                        raise
+            self._append(resampler.resample(None))
+        except Exception as e:
+            self.error = e
+        finally:
+            # Data fed after decoding stopped is dropped, not buffered
+            self._reader.close()
+
+    def drain(self) -> bytes:
+        with self._lock:
+            pcm = bytes(self._pcm)
+            self._pcm.clear()
+        return pcm
+
+    def finish(self, timeout: float = None) -> bytes:
+        """End of stream: wait for the decoder and return the remaining PCM"""
+        self._reader.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        elif self._raw:
+            try:
+                self._pcm.extend(decode_to_pcm(bytes(self._raw), partial=True))
+            except Exception as e:
+                self.error = e
+            self._raw.clear()
+        return self.drain()
+
+    def close(self):
+        self._reader.close()
+
+
+def pcm_duration(pcm: bytes) -> float:
+    """Duration in seconds of a TARGET_SAMPLE_RATE PCM buffer"""
+    return len(pcm) / (SAMPLE_WIDTH * TARGET_SAMPLE_RATE)
+
+
+def pcm_to_wav(pcm: bytes) -> bytes:
+    """Wrap PCM samples in a WAV header (for debugging or legacy consumers)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(TARGET_SAMPLE_RATE)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+# ----------------------------------------------------------
+# VOICE-ACTIVITY DETECTION
+# ----------------------------------------------------------
+def frame_energies(pcm: bytes, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """RMS energy of each frame, in int16 units (same scale as sr energy_threshold)"""
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype="<i2").astype(np.float32)
+    frame_len = TARGET_SAMPLE_RATE * frame_ms // 1000
+    if samples.size == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    pad = (-samples.size) % frame_len
+    if pad:
+        samples = np.concatenate([samples, np.zeros(pad, dtype=np.float32)])
+    frames = samples.reshape(-1, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def detect_speech(pcm: bytes, frame_ms: int = VAD_FRAME_MS):
+    """
+    Energy-based VAD.
+
+    Returns:
+        (speech_mask, noise_floor): boolean mask per frame (padded with a
+        hangover of VAD_PADDING_MS) and the estimated noise RMS
+    """
+    energies = frame_energies(pcm, frame_ms)
+    if energies.size == 0:
+        return np.zeros(0, dtype=bool), 0.0
+
+    # First pass: quietest decile approximates background noise
+    noise_floor = min(float(np.percentile(energies, 10)), VAD_MAX_NOISE_FLOOR)
+    threshold = max(noise_floor * VAD_NOISE_MULTIPLIER, VAD_MIN_ENERGY)
+    raw_mask = energies > threshold
+
+    # Second pass: re-estimate the floor from the non-speech frames only
+    if raw_mask.any() and (~raw_mask).any():
+        noise_floor = min(float(np.mean(energies[~raw_mask])), VAD_MAX_NOISE_FLOOR)
+        threshold = max(noise_floor * VAD_NOISE_MULTIPLIER, VAD_MIN_ENERGY)
+        raw_mask = energies > threshold
+
+    # Hangover: dilate the mask so short pauses and soft consonants survive
+    pad_frames = max(1, VAD_PADDING_MS // frame_ms)
+    kernel = np.ones(2 * pad_frames + 1, dtype=np.int32)
+    mask = np.convolve(raw_mask.astype(np.int32), kernel, mode="same") > 0
+    return mask, noise_floor
+
+
+def trim_silence(pcm: bytes, frame_ms: int = VAD_FRAME_MS):
+    """
+    Drop leading and trailing silence.
+
+    Returns:
+        (trimmed_pcm, noise_floor): trimmed_pcm is b"" when no speech was
+        found; noise_floor is measured on the trimmed-off frames when there
+        are any, so it reflects the room rather than the speaker
+    """
+    mask, noise_floor = detect_speech(pcm, frame_ms)
+    if not mask.any():
+        return b"", noise_floor
+
+    speech_frames = np.flatnonzero(mask)
+    first, last = int(speech_frames[0]), int(speech_frames[-1]) + 1
+
+    energies = frame_energies(pcm, frame_ms)
+    edge_frames = np.concatenate([energies[:first], energies[last:]])
+    if edge_frames.size:
+        noise_floor = float(np.mean(edge_frames))
+
+    frame_bytes = TARGET_SAMPLE_RATE * frame_ms // 1000 * SAMPLE_WIDTH
+    return pcm[first * frame_bytes:last * frame_bytes], noise_floor
+
+
+def find_silence_cut(pcm: bytes, min_seconds: float, max_seconds: float,
+                     final: bool = True, frame_ms: int = VAD_FRAME_MS) -> Optional[int]:
+    """
+    Pick a byte offset to cut pcm at, inside [min_seconds, max_seconds].
+
+    Prefers the middle of the longest pause in that window. Falls back to a
+    hard cut at max_seconds when the speaker never pauses. Returns None when
+    pcm is shorter than max_seconds and has no pause yet (more audio may
+    still arrive), or, with final=True, when no cut is needed at all.
+    """
+    frame_bytes = TARGET_SAMPLE_RATE * frame_ms // 1000 * SAMPLE_WIDTH
+    duration = pcm_duration(pcm)
+    if duration <= min_seconds or (final and duration <= max_seconds):
+        return None
+
+    mask, _ = detect_speech(pcm, frame_ms)
+    frames_per_second = 1000 / frame_ms
+    lo = int(min_seconds * frames_per_second)
+    hi = min(int(max_seconds * frames_per_second), mask.size)
+
+    window = ~mask[lo:hi]
+    if window.any():
+        # Run-length encode the silent stretches of the window
+        edges = np.diff(np.concatenate([[0], window.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        longest = int(np.argmax(ends - starts))
+        cut_frame = lo + (starts[longest] + ends[longest]) // 2
+        return int(cut_frame) * frame_bytes
+
+    if duration >= max_seconds:
+        return int(max_seconds * frames_per_second) * frame_bytes
+    return None
+
+
+def split_on_silence(pcm: bytes, min_seconds: float = SEGMENT_MIN_SECONDS,
+                     max_seconds: float = SEGMENT_MAX_SECONDS):
+    """
+    Split a long recording at pauses into segments of at most max_seconds.
+
+    Returns:
+        list of (start_seconds, end_seconds, segment_pcm), silence-only
+        segments dropped, in recording order
+    """
+    segments = []
+    offset = 0
+    while offset < len(pcm):
+        remaining = pcm[offset:]
+        cut = find_silence_cut(remaining, min_seconds, max_seconds, final=True)
+        end = offset + (cut if cut else len(remaining))
+
+        chunk = pcm[offset:end]
+        if detect_speech(chunk)[0].any():
+            segments.append((pcm_duration(pcm[:offset]), pcm_duration(pcm[:end]), chunk))
+        offset = end
+    return segments
+
+
+# ----------------------------------------------------------
+# IN-MEMORY HANDOFF
+# ----------------------------------------------------------
+def store_pcm(pcm: bytes) -> str:
+    """Keep a decoded buffer in memory and return a reference usable as audio_path"""
+    key = f"{MEMORY_PREFIX}{uuid.uuid4().hex}"
+    with _pcm_lock:
+        _pcm_buffers[key] = pcm
+    return key
+
+
+def is_memory_audio(audio_path: str) -> bool:
+    return isinstance(audio_path, str) and audio_path.startswith(MEMORY_PREFIX)
+
+
+def get_pcm(key: str) -> Optional[bytes]:
+    with _pcm_lock:
+        return _pcm_buffers.get(key)
+
+
+def release_pcm(key: str):
+    with _pcm_lock:
+        _pcm_buffers.pop(key, None)
@@ -5,11 +5,22 @@ Core analytics functions for artisan insights
 
 from google.cloud import bigquery
 from google.oauth2 import service_account
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 import os
 
+# How get_all_insights runs its sections:
+#   concurrent   - the five section queries as parallel jobs (default)
+#   consolidated - one query that reads the artisan's rollup rows once
+#   sequential   - one job after another (the old path; for benchmarks)
+INSIGHTS_QUERY_MODE = os.getenv("INSIGHTS_QUERY_MODE", "concurrent")
+INSIGHTS_QUERY_MODES = ("concurrent", "consolidated", "sequential")
+# BigQuery's own 24h result cache; benchmarks turn it off to time real work
+BIGQUERY_USE_QUERY_CACHE = os.getenv("BIGQUERY_USE_QUERY_CACHE", "true").lower() != "false"
+
 # Global client variable
 _client = None
+_query_pool = None
 
 def get_bigquery_client() -> Optional[bigquery.Client]:
     """
@@ -85,36 +96,64 @@ def get_mock_data() -> Dict[str, Any]:
         ]
     }
 
-def get_target_audience(artisan_id: str) -> Dict[str, Any]:
-    """Get target audience insights for an artisan"""
-    
-    client = get_bigquery_client()
-    
-    if not client:
-        print(f"Using mock data for target_audience (artisan: {artisan_id})")
-        return get_mock_data()["target_audience_data"]
+def _job_config(artisan_id: str) -> bigquery.QueryJobConfig:
+    return bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
+        ],
+        use_query_cache=BIGQUERY_USE_QUERY_CACHE
+    )
+
+def _run_query(client: bigquery.Client, query: str, artisan_id: str) -> list:
+    return list(client.query(query, job_config=_job_config(artisan_id)).result())
+
+class _Row(dict):
+    """STRUCT value from the consolidated query, readable like a result row"""
     
-    try:
-        project_id = os.environ.get("GCLOUD_PROJECT")
-        
-        query = f"""
-        WITH audience_data AS (
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+# Section SQL reads the hourly rollup (services/interaction_rollup.py), not
+# raw user_interactions; distinct users come from merged HLL sketches
+ROLLUP_TABLE = "interaction_rollup_hourly"
+
+_WEEK_AGO = "TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY), HOUR)"
+_TWO_WEEKS_AGO = "TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 14 DAY), HOUR)"
+
+def _rollup_hours(project_id: str, days: int) -> str:
+    """CTE artisan_hours: the artisan's rollup rows for the last `days` days"""
+    return f"""artisan_hours AS (
             SELECT 
-                d.age_group,
-                d.location_state,
-                d.location_city,
-                COUNT(DISTINCT i.user_id) as user_count,
-                COUNTIF(i.action_type = 'click') as clicks,
-                COUNTIF(i.action_type = 'inquiry') as inquiries,
-                COUNTIF(i.action_type = 'purchase') as purchases
-            FROM `{project_id}.artisan_analytics.user_interactions` i
-            LEFT JOIN `{project_id}.artisan_analytics.user_demographics` d
-                ON i.user_id = d.user_id
-            WHERE i.artisan_id = @artisan_id
-                AND i.timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
-            GROUP BY d.age_group, d.location_state, d.location_city
-        )
-        SELECT 
+                *,
+                TIMESTAMP_ADD(TIMESTAMP(date), INTERVAL hour HOUR) as hour_start
+            FROM `{project_id}.artisan_analytics.{ROLLUP_TABLE}`
+            WHERE artisan_id = @artisan_id
+                AND date >= DATE(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {days} DAY))
+                AND TIMESTAMP_ADD(TIMESTAMP(date), INTERVAL hour HOUR)
+                    >= TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {days} DAY), HOUR)
+        )"""
+
+def _select(struct: bool) -> str:
+    return "SELECT AS STRUCT" if struct else "SELECT"
+
+_AUDIENCE_CTE = """audience_data AS (
+            SELECT 
+                age_group,
+                location_state,
+                location_city,
+                HLL_COUNT.MERGE(users_sketch) as user_count,
+                SUM(IF(action_type = 'click', interactions, 0)) as clicks,
+                SUM(IF(action_type = 'inquiry', interactions, 0)) as inquiries,
+                SUM(IF(action_type = 'purchase', interactions, 0)) as purchases
+            FROM artisan_hours
+            GROUP BY age_group, location_state, location_city
+        )"""
+
+def _audience_select(struct: bool = False) -> str:
+    return f"""{_select(struct)} 
             age_group,
             location_state,
             location_city,
@@ -126,177 +165,32 @@ def get_target_audience(artisan_id: str) -> Dict[str, Any]:
             ROUND(inquiries / NULLIF(clicks, 0) * 100, 2) as inquiry_rate
         FROM audience_data
         ORDER BY user_count DESC
-        LIMIT 10
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
-            ]
-        )
-        
-        results = client.query(query, job_config=job_config).result()
-        
-        # Process results
-        top_demographics = []
-        top_locations = set()
-        top_age_groups = {}
-        
-        for row in results:
-            top_demographics.append(dict(row))
-            
-            if row.location_city and row.location_state:
-                top_locations.add(f"{row.location_city}, {row.location_state}")
-            
-            if row.age_group:
-                top_age_groups[row.age_group] = top_age_groups.get(row.age_group, 0) + row.user_count
-        
-        # Format output
-        target_audience = []
-        
-        # Top age group
-        if top_age_groups:
-            top_age = max(top_age_groups.items(), key=lambda x: x[1])
-            target_audience.append(f"Primary age group: {top_age[0]}")
-        
-        # Top locations
-        if top_locations:
-            top_3_locations = list(top_locations)[:3]
-            target_audience.append(f"Key cities: {', '.join(top_3_locations)}")
-        
-        # Behavior pattern
-        total_clicks = sum(d.get('clicks', 0) for d in top_demographics)
-        total_inquiries = sum(d.get('inquiries', 0) for d in top_demographics)
-        
-        if total_clicks > 0:
-            inquiry_rate = (total_inquiries / total_clicks) * 100
-            if inquiry_rate > 15:
-                target_audience.append("High-intent shoppers (strong inquiry rate)")
-            else:
-                target_audience.append("Browsers (exploring options)")
-        
-        return {
-            "target_audience": target_audience if target_audience else get_mock_data()["target_audience_data"]["target_audience"],
-            "detailed_demographics": top_demographics[:5]
-        }
-        
-    except Exception as e:
-        print(f"Error in get_target_audience: {e}")
-        return get_mock_data()["target_audience_data"]
+        LIMIT 10"""
 
-def get_best_timing(artisan_id: str) -> Dict[str, Any]:
-    """Get best posting times based on engagement"""
-    
-    client = get_bigquery_client()
-    
-    if not client:
-        print(f"Using mock data for best_timing (artisan: {artisan_id})")
-        return get_mock_data()["timing_data"]
-    
-    try:
-        project_id = os.environ.get("GCLOUD_PROJECT")
-        
-        query = f"""
-        WITH hourly_engagement AS (
-            SELECT 
-                EXTRACT(DAYOFWEEK FROM timestamp) as day_of_week,
-                EXTRACT(HOUR FROM timestamp) as hour,
-                COUNT(*) as interactions,
-                COUNTIF(action_type = 'click') as clicks,
-                COUNTIF(action_type = 'inquiry') as inquiries
-            FROM `{project_id}.artisan_analytics.user_interactions`
-            WHERE artisan_id = @artisan_id
-                AND timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
-            GROUP BY day_of_week, hour
-        ),
-        ranked_times AS (
+_TIMING_CTE = """hourly_engagement AS (
             SELECT 
-                day_of_week,
+                EXTRACT(DAYOFWEEK FROM date) as day_of_week,
                 hour,
-                interactions,
-                clicks,
-                inquiries,
-                ROW_NUMBER() OVER (ORDER BY clicks DESC) as rank
-            FROM hourly_engagement
-        )
-        SELECT 
+                SUM(interactions) as interactions,
+                SUM(IF(action_type = 'click', interactions, 0)) as clicks,
+                SUM(IF(action_type = 'inquiry', interactions, 0)) as inquiries
+            FROM artisan_hours
+            GROUP BY day_of_week, hour
+        )"""
+
+def _timing_select(struct: bool = False) -> str:
+    return f"""{_select(struct)} 
             day_of_week,
             hour,
             interactions,
             clicks,
             inquiries
-        FROM ranked_times
-        WHERE rank <= 5
+        FROM hourly_engagement
         ORDER BY clicks DESC
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
-            ]
-        )
-        
-        results = client.query(query, job_config=job_config).result()
-        
-        # Map day numbers to names
-        day_names = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 
-                     5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
-        
-        best_hours = []
-        best_days = {}
-        
-        for row in results:
-            day_name = day_names.get(row.day_of_week, 'Unknown')
-            best_days[day_name] = best_days.get(day_name, 0) + row.clicks
-            
-            hour = row.hour
-            time_period = "morning" if 6 <= hour < 12 else "afternoon" if 12 <= hour < 17 else "evening" if 17 <= hour < 21 else "night"
-            best_hours.append({
-                "day": day_name,
-                "hour": hour,
-                "period": time_period,
-                "engagement": row.clicks
-            })
-        
-        # Generate recommendations
-        recommendations = []
-        
-        if best_hours:
-            top_hour = best_hours[0]
-            recommendations.append(
-                f"Post between {top_hour['hour']}:00-{(top_hour['hour']+2)%24}:00 for maximum reach"
-            )
-        
-        if best_days:
-            sorted_days = sorted(best_days.items(), key=lambda x: x[1], reverse=True)[:2]
-            day_str = ' and '.join([d[0] for d in sorted_days])
-            recommendations.append(f"{day_str} show highest engagement")
-        
-        recommendations.append("2 weeks before festivals for promotional content")
-        
-        return {
-            "best_timing": recommendations if recommendations else get_mock_data()["timing_data"]["best_timing"],
-            "detailed_timing": best_hours
-        }
-        
-    except Exception as e:
-        print(f"Error in get_best_timing: {e}")
-        return get_mock_data()["timing_data"]
+        LIMIT 5"""
 
-def get_price_performance(artisan_id: str) -> Dict[str, Any]:
-    """Analyze price band performance"""
-    
-    client = get_bigquery_client()
-    
-    if not client:
-        print(f"Using mock data for price_performance (artisan: {artisan_id})")
-        return get_mock_data()["price_data"]
-    
-    try:
-        project_id = os.environ.get("GCLOUD_PROJECT")
-        
-        query = f"""
-        WITH price_analysis AS (
+def _price_cte(project_id: str) -> str:
+    return f"""price_analysis AS (
             SELECT 
                 CASE 
                     WHEN p.price < 500 THEN '₹0-500'
@@ -305,18 +199,19 @@ def get_price_performance(artisan_id: str) -> Dict[str, Any]:
                     WHEN p.price < 5000 THEN '₹2500-5000'
                     ELSE '₹5000+'
                 END as price_band,
-                COUNT(DISTINCT i.user_id) as unique_viewers,
-                COUNTIF(i.action_type = 'click') as clicks,
-                COUNTIF(i.action_type = 'inquiry') as inquiries,
-                COUNTIF(i.action_type = 'purchase') as purchases
-            FROM `{project_id}.artisan_analytics.products` p
-            LEFT JOIN `{project_id}.artisan_analytics.user_interactions` i
-                ON p.product_id = i.product_id
+                HLL_COUNT.MERGE(h.users_sketch) as unique_viewers,
+                SUM(IF(h.action_type = 'click', h.interactions, 0)) as clicks,
+                SUM(IF(h.action_type = 'inquiry', h.interactions, 0)) as inquiries,
+                SUM(IF(h.action_type = 'purchase', h.interactions, 0)) as purchases
+            FROM artisan_hours h
+            JOIN `{project_id}.artisan_analytics.products` p
+                ON p.product_id = h.product_id
             WHERE p.artisan_id = @artisan_id
-                AND i.timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
             GROUP BY price_band
-        )
-        SELECT 
+        )"""
+
+def _price_select(struct: bool = False) -> str:
+    return f"""{_select(struct)} 
             price_band,
             unique_viewers,
             clicks,
@@ -325,181 +220,348 @@ def get_price_performance(artisan_id: str) -> Dict[str, Any]:
             ROUND(clicks / NULLIF(unique_viewers, 0) * 100, 2) as click_rate,
             ROUND(purchases / NULLIF(clicks, 0) * 100, 2) as conversion_rate
         FROM price_analysis
-        ORDER BY clicks DESC
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
-            ]
-        )
-        
-        results = client.query(query, job_config=job_config).result()
-        
-        price_bands = []
-        total_clicks = 0
-        
-        for row in results:
-            price_bands.append({
-                "range": row.price_band,
-                "clicks": row.clicks,
-                "conversion_rate": row.conversion_rate or 0
-            })
-            total_clicks += row.clicks
-        
-        # Calculate percentages
-        for band in price_bands:
-            band["percentage"] = round((band["clicks"] / total_clicks * 100), 0) if total_clicks > 0 else 0
-        
-        return {
-            "price_bands": price_bands if price_bands else get_mock_data()["price_data"]["price_bands"]
-        }
-        
-    except Exception as e:
-        print(f"Error in get_price_performance: {e}")
-        return get_mock_data()["price_data"]
+        ORDER BY clicks DESC"""
 
-def get_key_insights(artisan_id: str) -> List[Dict[str, str]]:
-    """Generate key actionable insights"""
-    
-    client = get_bigquery_client()
-    
-    if not client:
-        print(f"Using mock data for key_insights (artisan: {artisan_id})")
-        return get_mock_data()["key_insights"]
-    
-    try:
-        project_id = os.environ.get("GCLOUD_PROJECT")
-        
-        query = f"""
-        WITH recent_metrics AS (
+_GROWTH_CTE = f"""recent_metrics AS (
             SELECT 
-                COUNT(DISTINCT CASE WHEN timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY) 
-                    THEN user_id END) as recent_users,
-                COUNT(DISTINCT CASE WHEN timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 14 DAY) 
-                    AND timestamp < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY)
-                    THEN user_id END) as previous_users,
-                COUNTIF(timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY) 
-                    AND action_type = 'inquiry') as recent_inquiries,
-                COUNTIF(timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 14 DAY) 
-                    AND timestamp < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY)
-                    AND action_type = 'inquiry') as previous_inquiries
-            FROM `{project_id}.artisan_analytics.user_interactions`
-            WHERE artisan_id = @artisan_id
-        )
-        SELECT 
+                HLL_COUNT.MERGE(IF(hour_start >= {_WEEK_AGO}, users_sketch, NULL)) as recent_users,
+                HLL_COUNT.MERGE(IF(hour_start >= {_TWO_WEEKS_AGO} AND hour_start < {_WEEK_AGO},
+                    users_sketch, NULL)) as previous_users,
+                SUM(IF(hour_start >= {_WEEK_AGO} AND action_type = 'inquiry', interactions, 0)) as recent_inquiries,
+                SUM(IF(hour_start >= {_TWO_WEEKS_AGO} AND hour_start < {_WEEK_AGO}
+                    AND action_type = 'inquiry', interactions, 0)) as previous_inquiries
+            FROM artisan_hours
+        )"""
+
+def _growth_select(struct: bool = False) -> str:
+    return f"""{_select(struct)} 
             recent_users,
             previous_users,
             recent_inquiries,
             previous_inquiries,
             ROUND((recent_users - previous_users) / NULLIF(previous_users, 0) * 100, 0) as user_growth,
             ROUND((recent_inquiries - previous_inquiries) / NULLIF(previous_inquiries, 0) * 100, 0) as inquiry_growth
-        FROM recent_metrics
+        FROM recent_metrics"""
+
+def _target_audience_query(project_id: str) -> str:
+    return f"""
+        WITH {_rollup_hours(project_id, 30)},
+        {_AUDIENCE_CTE}
+        {_audience_select()}
         """
+
+def _target_audience_result(results: list) -> Dict[str, Any]:
+    # Process results
+    top_demographics = []
+    top_locations = set()
+    top_age_groups = {}
+    
+    for row in results:
+        top_demographics.append(dict(row))
         
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
-            ]
-        )
-        
-        results = list(client.query(query, job_config=job_config).result())
-        
-        insights = []
-        
-        if results:
-            row = results[0]
-            
-            if row.user_growth and row.user_growth > 10:
-                insights.append({
-                    "icon": "📈",
-                    "text": f"Your reach increased by {int(row.user_growth)}% this week",
-                    "trend": "up"
-                })
-            
-            if row.inquiry_growth and row.inquiry_growth > 15:
-                insights.append({
-                    "icon": "🎉",
-                    "text": f"Inquiries up {int(row.inquiry_growth)}% - customers are engaging more",
-                    "trend": "up"
-                })
-        
-        # Add default insights if not enough data
-        if len(insights) < 3:
-            insights.extend([
-                {"icon": "⭐", "text": "Products with detailed descriptions get 35% more clicks", "trend": "neutral"},
-                {"icon": "📸", "text": "Adding 3+ images increases conversion by 25%", "trend": "neutral"}
-            ])
+        if row.location_city and row.location_state:
+            top_locations.add(f"{row.location_city}, {row.location_state}")
         
-        return insights[:3]
+        if row.age_group:
+            top_age_groups[row.age_group] = top_age_groups.get(row.age_group, 0) + row.user_count
+    
+    # Format output
+    target_audience = []
+    
+    # Top age group
+    if top_age_groups:
+        top_age = max(top_age_groups.items(), key=lambda x: x[1])
+        target_audience.append(f"Primary age group: {top_age[0]}")
+    
+    # Top locations
+    if top_locations:
+        top_3_locations = list(top_locations)[:3]
+        target_audience.append(f"Key cities: {', '.join(top_3_locations)}")
+    
+    # Behavior pattern
+    total_clicks = sum(d.get('clicks', 0) for d in top_demographics)
+    total_inquiries = sum(d.get('inquiries', 0) for d in top_demographics)
+    
+    if total_clicks > 0:
+        inquiry_rate = (total_inquiries / total_clicks) * 100
+        if inquiry_rate > 15:
+            target_audience.append("High-intent shoppers (strong inquiry rate)")
+        else:
+            target_audience.append("Browsers (exploring options)")
+    
+    return {
+        "target_audience": target_audience if target_audience else get_mock_data()["target_audience_data"]["target_audience"],
+        "detailed_demographics": top_demographics[:5]
+    }
+
+def get_target_audience(artisan_id: str) -> Dict[str, Any]:
+    """Get target audience insights for an artisan"""
+    return _get_section("target_audience_data", artisan_id)
+
+def _best_timing_query(project_id: str) -> str:
+    return f"""
+        WITH {_rollup_hours(project_id, 30)},
+        {_TIMING_CTE}
+        {_timing_select()}
+        """
+
+def _best_timing_result(results: list) -> Dict[str, Any]:
+    # Map day numbers to names
+    day_names = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 
+                 5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
+    
+    best_hours = []
+    best_days = {}
+    
+    for row in results:
+        day_name = day_names.get(row.day_of_week, 'Unknown')
+        best_days[day_name] = best_days.get(day_name, 0) + row.clicks
+        
+        hour = row.hour
+        time_period = "morning" if 6 <= hour < 12 else "afternoon" if 12 <= hour < 17 else "evening" if 17 <= hour < 21 else "night"
+        best_hours.append({
+            "day": day_name,
+            "hour": hour,
+            "period": time_period,
+            "engagement": row.clicks
+        })
+    
+    # Generate recommendations
+    recommendations = []
+    
+    if best_hours:
+        top_hour = best_hours[0]
+        recommendations.append(
+            f"Post between {top_hour['hour']}:00-{(top_hour['hour']+2)%24}:00 for maximum reach"
+        )
+    
+    if best_days:
+        sorted_days = sorted(best_days.items(), key=lambda x: x[1], reverse=True)[:2]
+        day_str = ' and '.join([d[0] for d in sorted_days])
+        recommendations.append(f"{day_str} show highest engagement")
+    
+    recommendations.append("2 weeks before festivals for promotional content")
+    
+    return {
+        "best_timing": recommendations if recommendations else get_mock_data()["timing_data"]["best_timing"],
+        "detailed_timing": best_hours
+    }
+
+def get_best_timing(artisan_id: str) -> Dict[str, Any]:
+    """Get best posting times based on engagement"""
+    return _get_section("timing_data", artisan_id)
+
+def _price_performance_query(project_id: str) -> str:
+    return f"""
+        WITH {_rollup_hours(project_id, 30)},
+        {_price_cte(project_id)}
+        {_price_select()}
+        """
+
+def _price_performance_result(results: list) -> Dict[str, Any]:
+    price_bands = []
+    total_clicks = 0
+    
+    for row in results:
+        price_bands.append({
+            "range": row.price_band,
+            "clicks": row.clicks,
+            "conversion_rate": row.conversion_rate or 0
+        })
+        total_clicks += row.clicks
+    
+    # Calculate percentages
+    for band in price_bands:
+        band["percentage"] = round((band["clicks"] / total_clicks * 100), 0) if total_clicks > 0 else 0
+    
+    return {
+        "price_bands": price_bands if price_bands else get_mock_data()["price_data"]["price_bands"]
+    }
+
+def get_price_performance(artisan_id: str) -> Dict[str, Any]:
+    """Analyze price band performance"""
+    return _get_section("price_data", artisan_id)
+
+def _key_insights_query(project_id: str) -> str:
+    return f"""
+        WITH {_rollup_hours(project_id, 14)},
+        {_GROWTH_CTE}
+        {_growth_select()}
+        """
+
+def _key_insights_result(results: list) -> List[Dict[str, str]]:
+    insights = []
+    
+    if results:
+        row = results[0]
+        
+        if row.user_growth and row.user_growth > 10:
+            insights.append({
+                "icon": "📈",
+                "text": f"Your reach increased by {int(row.user_growth)}% this week",
+                "trend": "up"
+            })
         
-    except Exception as e:
-        print(f"Error in get_key_insights: {e}")
-        return get_mock_data()["key_insights"]
+        if row.inquiry_growth and row.inquiry_growth > 15:
+            insights.append({
+                "icon": "🎉",
+                "text": f"Inquiries up {int(row.inquiry_growth)}% - customers are engaging more",
+                "trend": "up"
+            })
+    
+    # Add default insights if not enough data
+    if len(insights) < 3:
+        insights.extend([
+            {"icon": "⭐", "text": "Products with detailed descriptions get 35% more clicks", "trend": "neutral"},
+            {"icon": "📸", "text": "Adding 3+ images increases conversion by 25%", "trend": "neutral"}
+        ])
+    
+    return insights[:3]
+
+def get_key_insights(artisan_id: str) -> List[Dict[str, str]]:
+    """Generate key actionable insights"""
+    return _get_section("key_insights", artisan_id)
+
+def _recommended_channels_query(project_id: str) -> str:
+    # Only the craft type is used; joining interactions here scanned the
+    # whole table for columns nobody read
+    return f"""
+        SELECT craft_type
+        FROM `{project_id}.artisan_analytics.products`
+        WHERE artisan_id = @artisan_id
+        GROUP BY craft_type
+        LIMIT 1
+        """
+
+def _recommended_channels_result(results: list) -> List[Dict[str, str]]:
+    # Default recommendations
+    channels = get_mock_data()["recommended_channels"]
+    
+    # Customize based on data
+    if results and results[0].craft_type:
+        craft = results[0].craft_type
+        if craft in ['handloom', 'embroidery']:
+            channels[0]["reason"] = f"Perfect for showcasing {craft} craftsmanship"
+    
+    return channels
 
 def get_recommended_channels(artisan_id: str) -> List[Dict[str, str]]:
     """Recommend marketing channels based on craft type and audience"""
-    
+    return _get_section("recommended_channels", artisan_id)
+
+# Response key -> (name used in logs, query builder, result formatter)
+INSIGHT_SECTIONS = {
+    "target_audience_data": ("target_audience", _target_audience_query, _target_audience_result),
+    "timing_data": ("best_timing", _best_timing_query, _best_timing_result),
+    "price_data": ("price_performance", _price_performance_query, _price_performance_result),
+    "key_insights": ("key_insights", _key_insights_query, _key_insights_result),
+    "recommended_channels": ("recommended_channels", _recommended_channels_query, _recommended_channels_result),
+}
+
+def _get_section(section: str, artisan_id: str, rows: Optional[list] = None, strict: bool = False):
+    """
+    One insights section: runs its query (unless rows are given) and formats
+    the result. Falls back to mock data without a client or on any error;
+    strict raises instead, so callers can tell real results from mock ones.
+    """
+    name, build_query, format_result = INSIGHT_SECTIONS[section]
     client = get_bigquery_client()
     
     if not client:
-        print(f"Using mock data for recommended_channels (artisan: {artisan_id})")
-        return get_mock_data()["recommended_channels"]
+        if strict:
+            raise RuntimeError("BigQuery is not configured")
+        print(f"Using mock data for {name} (artisan: {artisan_id})")
+        return get_mock_data()[section]
     
     try:
-        project_id = os.environ.get("GCLOUD_PROJECT")
-        
-        query = f"""
+        if rows is None:
+            rows = _run_query(client, build_query(os.environ.get("GCLOUD_PROJECT")), artisan_id)
+        return format_result(rows)
+    except Exception as e:
+        print(f"Error in get_{name}: {e}")
+        if strict:
+            raise
+        return get_mock_data()[section]
+
+def _consolidated_query(project_id: str) -> str:
+    """
+    Every section from one read of the artisan's last 30 days of rollup
+    rows, returned as arrays of structs in a single row.
+    """
+    return f"""
+        WITH {_rollup_hours(project_id, 30)},
+        {_AUDIENCE_CTE},
+        {_TIMING_CTE},
+        {_price_cte(project_id)},
+        {_GROWTH_CTE}
         SELECT 
-            p.craft_type,
-            COUNT(DISTINCT i.user_id) as total_users,
-            AVG(EXTRACT(YEAR FROM CURRENT_TIMESTAMP()) - 
-                SAFE_CAST(SPLIT(d.age_group, '-')[OFFSET(0)] AS INT64)) as avg_age
-        FROM `{project_id}.artisan_analytics.products` p
-        LEFT JOIN `{project_id}.artisan_analytics.user_interactions` i
-            ON p.product_id = i.product_id
-        LEFT JOIN `{project_id}.artisan_analytics.user_demographics` d
-            ON i.user_id = d.user_id
-        WHERE p.artisan_id = @artisan_id
-        GROUP BY p.craft_type
-        LIMIT 1
+            ARRAY({_audience_select(struct=True)}) as target_audience_data,
+            ARRAY({_timing_select(struct=True)}) as timing_data,
+            ARRAY({_price_select(struct=True)}) as price_data,
+            ARRAY({_growth_select(struct=True)}) as key_insights,
+            ARRAY(
+                SELECT AS STRUCT craft_type
+                FROM `{project_id}.artisan_analytics.products`
+                WHERE artisan_id = @artisan_id
+                GROUP BY craft_type
+                LIMIT 1
+            ) as recommended_channels
         """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("artisan_id", "STRING", artisan_id)
-            ]
-        )
-        
-        results = list(client.query(query, job_config=job_config).result())
-        
-        # Default recommendations
-        channels = get_mock_data()["recommended_channels"]
-        
-        # Customize based on data
-        if results and results[0].craft_type:
-            craft = results[0].craft_type
-            if craft in ['handloom', 'embroidery']:
-                channels[0]["reason"] = f"Perfect for showcasing {craft} craftsmanship"
-        
-        return channels
-        
+
+def get_query_pool() -> ThreadPoolExecutor:
+    global _query_pool
+    if _query_pool is None:
+        # Section jobs mostly wait on BigQuery, so threads are cheap here
+        _query_pool = ThreadPoolExecutor(max_workers=4 * len(INSIGHT_SECTIONS), thread_name_prefix="bigquery")
+    return _query_pool
+
+def _get_all_sequential(artisan_id: str, strict: bool = False) -> Dict[str, Any]:
+    return {section: _get_section(section, artisan_id, strict=strict) for section in INSIGHT_SECTIONS}
+
+def _get_all_concurrent(artisan_id: str, strict: bool = False) -> Dict[str, Any]:
+    futures = {
+        section: get_query_pool().submit(_get_section, section, artisan_id, strict=strict)
+        for section in INSIGHT_SECTIONS
+    }
+    return {section: future.result() for section, future in futures.items()}
+
+def _get_all_consolidated(artisan_id: str, strict: bool = False) -> Dict[str, Any]:
+    client = get_bigquery_client()
+    if not client:
+        return _get_all_sequential(artisan_id, strict)
+    
+    try:
+        rows = _run_query(client, _consolidated_query(os.environ.get("GCLOUD_PROJECT")), artisan_id)
     except Exception as e:
-        print(f"Error in get_recommended_channels: {e}")
-        return get_mock_data()["recommended_channels"]
+        print(f"⚠️ Consolidated insights query failed, running sections separately: {e}")
+        return _get_all_concurrent(artisan_id, strict)
+    
+    row = rows[0]
+    return {
+        section: _get_section(section, artisan_id, rows=[_Row(value) for value in row[section] or []], strict=strict)
+        for section in INSIGHT_SECTIONS
+    }
 
-def get_all_insights(artisan_id: str) -> Dict[str, Any]:
-    """Get all analytics insights for an artisan"""
+def get_all_insights(artisan_id: str, mode: Optional[str] = None, strict: bool = False) -> Dict[str, Any]:
+    """
+    Get all analytics insights for an artisan (mode: see INSIGHTS_QUERY_MODE).
+    Falls back to mock data when BigQuery is unavailable or fails, unless
+    strict, which raises instead (for callers that cache the result).
+    """
+    
+    mode = mode or INSIGHTS_QUERY_MODE
+    if mode not in INSIGHTS_QUERY_MODES:
+        raise ValueError(f"Unknown insights query mode '{mode}', expected one of {INSIGHTS_QUERY_MODES}")
     
     try:
-        return {
-            "target_audience_data": get_target_audience(artisan_id),
-            "timing_data": get_best_timing(artisan_id),
-            "price_data": get_price_performance(artisan_id),
-            "key_insights": get_key_insights(artisan_id),
-            "recommended_channels": get_recommended_channels(artisan_id)
-        }
+        if mode == "consolidated":
+            return _get_all_consolidated(artisan_id, strict)
+        if mode == "concurrent":
+            return _get_all_concurrent(artisan_id, strict)
+        return _get_all_sequential(artisan_id, strict)
     except Exception as e:
         print(f"❌ Error fetching insights for {artisan_id}: {e}")
+        if strict:
+            raise
         # Return mock data as complete fallback
-        return get_mock_data()
\ No newline at end of file
+        return get_mock_data()
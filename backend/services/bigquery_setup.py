@@ -104,6 +104,11 @@ def create_tables():
         table_id = f"{project_id}.artisan_analytics.{table_name}"
         table = bigquery.Table(table_id, schema=schema)
         
+        if table_name == "user_interactions":
+            # Rollup refreshes only read the partitions since their last run
+            table.time_partitioning = bigquery.TimePartitioning(field="timestamp")
+            table.clustering_fields = ["artisan_id"]
+        
         try:
             table = client.create_table(table)
             print(f"✅ Created table {table_id}")
@@ -126,7 +131,8 @@ def main():
     print("\n✅ BigQuery setup complete!")
     print("\n📝 Next steps:")
     print("   1. Run: python services/generate_sample_data.py")
-    print("   2. Restart your backend server")
+    print("   2. Run: python -m services.interaction_rollup (builds the hourly rollup)")
+    print("   3. Restart your backend server")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
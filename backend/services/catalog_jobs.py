@@ -0,0 +1,180 @@
+"""
+Catalog Jobs Module
+Runs CPU-bound catalog rendering on a process pool so the API event loop
+stays responsive, and tracks background catalog jobs with per-product progress
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from services import catalog_renderer
+
+CATALOG_POOL_SIZE = int(os.getenv("CATALOG_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+# Queued + running jobs accepted before new submissions are rejected
+CATALOG_QUEUE_LIMIT = int(os.getenv("CATALOG_QUEUE_LIMIT", "20"))
+# Finished jobs are kept this long for status/result polling
+CATALOG_JOB_TTL = int(os.getenv("CATALOG_JOB_TTL", "3600"))
+
+FINISHED_STATES = ("completed", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when CATALOG_QUEUE_LIMIT jobs are already pending"""
+
+
+# ----------------------------------------------------------
+# PROCESS POOL
+# ----------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_progress_queue = None
+_progress_listeners = {}  # job_id -> callback(done, total)
+
+
+def _drain_progress():
+    """Forward (job_id, done, total) messages from workers to listeners"""
+    while True:
+        try:
+            job_id, done, total = _progress_queue.get()
+        except (EOFError, OSError):
+            return
+        listener = _progress_listeners.get(job_id)
+        if listener:
+            listener(done, total)
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Lazily started worker pool. Workers are spawned rather than forked so
+    they don't inherit gRPC/Firebase state from the API process.
+    """
+    global _pool, _progress_queue
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _progress_queue = context.Queue()
+            _pool = ProcessPoolExecutor(
+                max_workers=CATALOG_POOL_SIZE,
+                mp_context=context,
+                initializer=catalog_renderer.init_worker,
+                initargs=(_progress_queue,),
+            )
+            threading.Thread(target=_drain_progress, daemon=True).start()
+            print(f"🏭 Catalog render pool started ({CATALOG_POOL_SIZE} workers)")
+    return _pool
+
+
+async def run_render(func, *args):
+    """Run a catalog_renderer function in the pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_pool(), func, *args)
+
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ----------------------------------------------------------
+# JOBS
+# ----------------------------------------------------------
+class CatalogJobManager:
+    """
+    In-memory registry of background catalog jobs. A job runs a coroutine
+    (usually a CatalogService.generate_* call given the job_id) on the event
+    loop; its rendering step reports progress through the pool.
+    """
+
+    def __init__(self, queue_limit: int = None, job_ttl: int = None):
+        self.queue_limit = queue_limit or CATALOG_QUEUE_LIMIT
+        self.job_ttl = job_ttl or CATALOG_JOB_TTL
+        self._jobs = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in FINISHED_STATES and now - job["updated_at"] > self.job_ttl:
+                self._jobs.pop(job_id, None)
+
+    def active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] not in FINISHED_STATES)
+
+    def submit(self, run, **details) -> dict:
+        """
+        run: callable(job_id) -> awaitable catalog result
+        details: stored on the job for display (artisan_id, catalog_type, ...)
+        """
+        with self._lock:
+            self._prune()
+            if self.active_count() >= self.queue_limit:
+                raise QueueFullError(f"Catalog queue is full ({self.queue_limit} jobs pending)")
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "progress": {"done": 0, "total": 0, "percent": 0},
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                **details,
+            }
+
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, run))
+        return self.get(job_id)
+
+    async def _run(self, job_id: str, run):
+        self.update(job_id, status="running")
+        _progress_listeners[job_id] = lambda done, total: self.set_progress(job_id, done, total)
+        try:
+            result = await run(job_id)
+            self.update(job_id, status="completed", result=result)
+            print(f"✅ Catalog job {job_id} completed")
+        except Exception as e:
+            self.update(job_id, status="failed", error=str(e))
+            print(f"❌ Catalog job {job_id} failed: {e}")
+        finally:
+            _progress_listeners.pop(job_id, None)
+            self._tasks.pop(job_id, None)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            if fields.get("status") == "completed":
+                total = job["progress"]["total"]
+                job["progress"] = {"done": total, "total": total, "percent": 100}
+
+    def set_progress(self, job_id: str, done: int, total: int):
+        """Called from the progress thread with products rendered so far"""
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return  # late message from the worker
+        percent = int(done * 100 / total) if total else 0
+        self.update(job_id, status="rendering", progress={"done": done, "total": total, "percent": percent})
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != "result"}
+
+    def get_result(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
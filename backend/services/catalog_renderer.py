@@ -0,0 +1,459 @@
+"""
+Catalog Renderer Module
+CPU-bound catalog drawing (ReportLab PDFs, PIL image grids, image
+derivatives). Kept free of Firebase and event-loop state so it can run in
+worker processes; see services/catalog_jobs.py
+"""
+
+import functools
+import io
+import os
+import platform
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Flowable, Image as RLImage
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from services.image_cache import ImageCache
+
+# Pre-rendered derivatives
+THUMBNAIL_SIZE = (280, 280)           # image catalog cards
+PDF_IMAGE_BOX_INCHES = 3              # product image box in PDFs
+
+# PDF image presets: resample to dpi for the 3-inch box, re-encode as JPEG
+PDF_QUALITY_PRESETS = {
+    'print': {'dpi': 300, 'quality': 90},
+    'standard': {'dpi': 200, 'quality': 82},
+    'ebook': {'dpi': 150, 'quality': 75},
+    'screen': {'dpi': 96, 'quality': 65},
+    'original': None,                 # embed downloaded bytes unchanged
+}
+DEFAULT_PDF_QUALITY = os.getenv("CATALOG_PDF_QUALITY", "print")
+
+# Image catalog encoders (PIL save parameters per output format)
+IMAGE_FORMAT_PRESETS = {
+    'jpeg': {
+        'format': 'JPEG', 'extension': 'jpg', 'content_type': 'image/jpeg',
+        'params': {'quality': 85, 'progressive': True, 'optimize': True, 'subsampling': '4:2:0'},
+    },
+    'webp': {
+        'format': 'WEBP', 'extension': 'webp', 'content_type': 'image/webp',
+        'params': {'quality': 80, 'method': 4},
+    },
+    'png': {
+        'format': 'PNG', 'extension': 'png', 'content_type': 'image/png',
+        'params': {'compress_level': 6},
+    },
+}
+DEFAULT_IMAGE_FORMAT = os.getenv("CATALOG_IMAGE_FORMAT", "jpeg")
+WEBP_MAX_DIMENSION = 16383
+JPEG_MAX_DIMENSION = 65500
+
+# Each process opens the shared on-disk cache itself
+image_cache = ImageCache()
+
+# Set in worker processes by catalog_jobs; receives (job_id, done, total)
+_progress_queue = None
+
+
+def init_worker(progress_queue):
+    """Process pool initializer"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def report_progress(job_id: str, done: int, total: int):
+    if job_id and _progress_queue is not None:
+        try:
+            _progress_queue.put_nowait((job_id, done, total))
+        except Exception:
+            pass
+
+
+class ProgressMarker(Flowable):
+    """Zero-size flowable that reports progress when ReportLab draws it"""
+
+    def __init__(self, job_id: str, done: int, total: int):
+        super().__init__()
+        self.job_id = job_id
+        self.done = done
+        self.total = total
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        report_progress(self.job_id, self.done, self.total)
+
+
+def get_font_paths():
+    """Get platform-specific font paths"""
+    system = platform.system()
+
+    if system == "Windows":
+        base_path = "C:/Windows/Fonts"
+        return {
+            'bold': f"{base_path}/arialbd.ttf",
+            'regular': f"{base_path}/arial.ttf",
+        }
+    elif system == "Linux":
+        return {
+            'bold': "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+            'regular': "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        }
+    elif system == "Darwin":  # macOS
+        return {
+            'bold': "/System/Library/Fonts/Helvetica.ttc",
+            'regular': "/System/Library/Fonts/Helvetica.ttc",
+        }
+    else:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def load_fonts():
+    """Load fonts with fallback to default (once per process)"""
+    font_paths = get_font_paths()
+
+    try:
+        if font_paths:
+            font_title = ImageFont.truetype(font_paths['bold'], 36)
+            font_subtitle = ImageFont.truetype(font_paths['regular'], 20)
+            font_name = ImageFont.truetype(font_paths['bold'], 22)
+            font_price = ImageFont.truetype(font_paths['bold'], 28)
+            print("✅ Loaded TrueType fonts")
+            return font_title, font_subtitle, font_name, font_price
+    except Exception as e:
+        print(f"⚠️ Error loading TrueType fonts: {e}")
+
+    print("⚠️ Using default fonts")
+    default_font = ImageFont.load_default()
+    return default_font, default_font, default_font, default_font
+
+
+def get_image_url(product: dict):
+    return product.get('image_url') or product.get('imageUrl')
+
+
+# ----------------------------------------------------------
+# DERIVATIVES
+# ----------------------------------------------------------
+def to_rgb(prod_img: Image.Image) -> Image.Image:
+    """Flatten transparency onto white and convert to RGB"""
+    if prod_img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', prod_img.size, (255, 255, 255))
+        if prod_img.mode == 'P':
+            prod_img = prod_img.convert('RGBA')
+        background.paste(prod_img, mask=prod_img.split()[-1] if prod_img.mode in ('RGBA', 'LA') else None)
+        return background
+    if prod_img.mode != 'RGB':
+        return prod_img.convert('RGB')
+    return prod_img
+
+
+def build_thumbnail(img_data: bytes) -> bytes:
+    """280x280 card image for image catalogs (PNG)"""
+    prod_img = to_rgb(Image.open(io.BytesIO(img_data)))
+    prod_img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    prod_img.save(out, format='PNG')
+    return out.getvalue()
+
+
+def build_print_image(img_data: bytes, dpi: int, quality: int) -> bytes:
+    """PDF rendition sized for the 3-inch box at dpi (JPEG)"""
+    test_img = Image.open(io.BytesIO(img_data))
+    test_img.verify()
+
+    box = PDF_IMAGE_BOX_INCHES * dpi
+    prod_img = Image.open(io.BytesIO(img_data))
+    # JPEG originals decode straight at 1/2..1/8 scale instead of full size
+    prod_img.draft('RGB', (box * 2, box * 2))
+    prod_img = to_rgb(prod_img)
+    prod_img.thumbnail((box, box), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    prod_img.save(out, format='JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def get_derivative(url: str, variant: str, builder) -> bytes:
+    """Cached rendition of url, built from the cached original on first use"""
+    data = image_cache.get_derivative(url, variant)
+    if data:
+        return data
+
+    original = image_cache.get_original(url)
+    if not original:
+        return None
+
+    data = builder(original)
+    image_cache.store_derivative(url, variant, data)
+    return data
+
+
+def get_thumbnail(url: str) -> bytes:
+    return get_derivative(url, 'thumb_280', build_thumbnail)
+
+
+def get_print_image(url: str, preset: str = DEFAULT_PDF_QUALITY) -> bytes:
+    settings = PDF_QUALITY_PRESETS[preset]
+    if settings is None:
+        return image_cache.get_original(url)
+    dpi, quality = settings['dpi'], settings['quality']
+    return get_derivative(
+        url, f"print_{dpi}dpi_q{quality}",
+        lambda data: build_print_image(data, dpi, quality)
+    )
+
+
+# ----------------------------------------------------------
+# PDF CATALOG
+# ----------------------------------------------------------
+def render_pdf(artisan_data: dict, products: list, images: dict, job_id: str = None,
+               quality: str = DEFAULT_PDF_QUALITY) -> bytes:
+    """
+    Build the PDF catalog. images maps image URL -> available in the image
+    cache (from CatalogService.prefetch_images); quality names a
+    PDF_QUALITY_PRESETS entry.
+    """
+    artisan_name = artisan_data.get('name', 'Artisan')
+
+    # Create PDF in memory
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch)
+    story = []
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Title'],
+        fontSize=24,
+        textColor=colors.HexColor('#1a56db'),
+        spaceAfter=30,
+        alignment=1
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#111827'),
+        spaceAfter=10,
+        spaceBefore=20
+    )
+
+    price_style = ParagraphStyle(
+        'PriceStyle',
+        parent=styles['Normal'],
+        fontSize=14,
+        textColor=colors.HexColor('#059669'),
+        fontName='Helvetica-Bold'
+    )
+
+    # Header
+    header = Paragraph(f"<b>{artisan_name}</b><br/>Product Catalog", title_style)
+    story.append(header)
+    story.append(Spacer(1, 0.3*inch))
+
+    # Contact info
+    contact_info = []
+    if artisan_data.get('email'):
+        contact_info.append(f"Email: {artisan_data['email']}")
+    if artisan_data.get('phone'):
+        contact_info.append(f"Phone: {artisan_data['phone']}")
+
+    if contact_info:
+        contact_text = " | ".join(contact_info)
+        story.append(Paragraph(contact_text, styles['Normal']))
+        story.append(Spacer(1, 0.3*inch))
+
+    # Products
+    for idx, product in enumerate(products, 1):
+        product_name = product.get('name', 'Unnamed Product')
+        story.append(Paragraph(f"{idx}. {product_name}", heading_style))
+
+        # Product image
+        image_url = get_image_url(product)
+        if image_url:
+            try:
+                img_data = get_print_image(image_url, quality) if images.get(image_url) else None
+                if img_data:
+                    # Pre-rendered JPEG from the image cache, sized for the box
+                    img_buffer = io.BytesIO(img_data)
+                    img = RLImage(img_buffer, width=3*inch, height=3*inch)
+                    story.append(img)
+                    story.append(Spacer(1, 0.1*inch))
+            except Exception as e:
+                print(f"⚠️ Error loading image for PDF: {e}")
+
+        # Description
+        description = product.get('description', 'No description available')
+        story.append(Paragraph(description, styles['Normal']))
+        story.append(Spacer(1, 0.1*inch))
+
+        # Price
+        price = product.get('price', 0)
+        price_text = f"Price: ₹{price:,.2f}"
+        story.append(Paragraph(price_text, price_style))
+
+        # Category
+        if product.get('category'):
+            category_text = f"Category: {product['category']}"
+            story.append(Paragraph(category_text, styles['Italic']))
+
+        story.append(ProgressMarker(job_id, idx, len(products)))
+        story.append(Spacer(1, 0.4*inch))
+
+    # Build PDF
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# ----------------------------------------------------------
+# IMAGE CATALOG
+# ----------------------------------------------------------
+def render_image_page(artisan_name: str, products: list, images: dict, fonts=None,
+                      total_products: int = None, page_number: int = None,
+                      page_count: int = None, job_id: str = None,
+                      progress_offset: int = 0) -> Image.Image:
+    """Draw the header and product grid for products onto one canvas"""
+    # Calculate dimensions
+    products_per_row = 2
+    product_height = 450
+    header_height = 150
+    rows = (len(products) + products_per_row - 1) // products_per_row
+
+    img_width = 1200
+    img_height = header_height + (rows * product_height)
+    total_products = total_products or len(products)
+
+    # Create image
+    catalog_img = Image.new('RGB', (img_width, img_height), '#ffffff')
+    draw = ImageDraw.Draw(catalog_img)
+
+    font_title, font_subtitle, font_name, font_price = fonts or load_fonts()
+
+    # Header
+    # Draw header background
+    draw.rectangle([(0, 0), (img_width, header_height)], fill='#1e40af')
+
+    # Title
+    title = f"{artisan_name} - Product Catalog"
+    try:
+        title_bbox = draw.textbbox((0, 0), title, font=font_title)
+        title_width = title_bbox[2] - title_bbox[0]
+    except:
+        title_width = len(title) * 15
+    draw.text(((img_width - title_width) // 2, 40), title, fill='#ffffff', font=font_title)
+
+    # Subtitle
+    subtitle = f"{total_products} Products Available"
+    if page_count and page_count > 1:
+        subtitle += f"  •  Page {page_number} of {page_count}"
+    try:
+        subtitle_bbox = draw.textbbox((0, 0), subtitle, font=font_subtitle)
+        subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
+    except:
+        subtitle_width = len(subtitle) * 10
+    draw.text(((img_width - subtitle_width) // 2, 95), subtitle, fill='#e0e7ff', font=font_subtitle)
+
+    # Products grid
+    x_offset = 50
+    y_offset = header_height + 30
+    col_width = 550
+
+    for idx, product in enumerate(products):
+        col = idx % products_per_row
+        row = idx // products_per_row
+
+        x_pos = x_offset + (col * col_width)
+        y_pos = y_offset + (row * product_height)
+
+        # Product card background
+        card_x = x_pos - 10
+        card_y = y_pos - 10
+        card_width = 530
+        card_height = 420
+        draw.rectangle(
+            [(card_x, card_y), (card_x + card_width, card_y + card_height)],
+            outline='#d1d5db',
+            width=2
+        )
+
+        # Product image
+        image_url = get_image_url(product)
+        if image_url:
+            try:
+                img_data = get_thumbnail(image_url) if images.get(image_url) else None
+                if img_data:
+                    # Pre-rendered RGB 280x280 thumbnail from the image cache
+                    prod_img = Image.open(io.BytesIO(img_data))
+
+                    # Center the image
+                    img_x = x_pos + (510 - prod_img.width) // 2
+                    catalog_img.paste(prod_img, (img_x, y_pos))
+                    print(f"✅ Added product image for: {product.get('name', 'Product')}")
+            except Exception as e:
+                print(f"⚠️ Error loading product image for {product.get('name', 'Product')}: {e}")
+                # Draw placeholder
+                draw.rectangle(
+                    [(x_pos, y_pos), (x_pos + 280, y_pos + 280)],
+                    fill='#f3f4f6',
+                    outline='#d1d5db'
+                )
+                draw.text((x_pos + 80, y_pos + 130), "No Image", fill='#9ca3af', font=font_subtitle)
+
+        # Product details
+        text_y = y_pos + 300
+
+        # Product name
+        product_name = product.get('name', 'Product')[:35]
+        if len(product.get('name', '')) > 35:
+            product_name += '...'
+        draw.text((x_pos, text_y), product_name, fill='#111827', font=font_name)
+
+        # Price
+        price = product.get('price', 0)
+        price_text = f"₹{price:,.2f}"
+        draw.text((x_pos, text_y + 35), price_text, fill='#059669', font=font_price)
+
+        # Category
+        if product.get('category'):
+            category = product['category'][:25]
+            draw.text((x_pos, text_y + 75), category, fill='#6b7280', font=font_subtitle)
+
+        report_progress(job_id, progress_offset + idx + 1, total_products)
+
+    return catalog_img
+
+
+def encode_catalog_image(catalog_img: Image.Image, image_format: str = DEFAULT_IMAGE_FORMAT):
+    """Encode with an IMAGE_FORMAT_PRESETS entry; returns (bytes, format used)"""
+    if image_format == 'webp' and max(catalog_img.size) > WEBP_MAX_DIMENSION:
+        # Long single-canvas catalogs exceed WebP's size limit
+        print(f"⚠️ Catalog is {catalog_img.height}px tall, too large for WebP; using JPEG")
+        image_format = 'jpeg'
+    if image_format == 'jpeg' and max(catalog_img.size) > JPEG_MAX_DIMENSION:
+        # ...and very long ones JPEG's (~290+ products on one canvas)
+        print(f"⚠️ Catalog is {catalog_img.height}px tall, too large for JPEG; using PNG")
+        image_format = 'png'
+
+    preset = IMAGE_FORMAT_PRESETS[image_format]
+    buffer = io.BytesIO()
+    catalog_img.save(buffer, format=preset['format'], **preset['params'])
+    return buffer.getvalue(), image_format
+
+
+def render_image_catalog(artisan_name: str, products: list, images: dict,
+                         total_products: int = None, page_number: int = None,
+                         page_count: int = None, job_id: str = None,
+                         progress_offset: int = 0, image_format: str = DEFAULT_IMAGE_FORMAT):
+    """Render one image catalog page; returns (encoded bytes, format used)"""
+    catalog_img = render_image_page(
+        artisan_name, products, images,
+        total_products=total_products, page_number=page_number, page_count=page_count,
+        job_id=job_id, progress_offset=progress_offset
+    )
+    return encode_catalog_image(catalog_img, image_format)
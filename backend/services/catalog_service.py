@@ -1,84 +1,93 @@
 from firebase_admin import firestore, storage
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+from PIL import Image
 import io
-import requests
-import uuid
-import platform
+import json
+import hashlib
+import asyncio
+import tempfile
+import zipfile
+import httpx
+import time
 import os
+from urllib.parse import urlparse
 from firebase_config import db, bucket
+from services import catalog_renderer
+from services.catalog_renderer import image_cache
+from services.catalog_jobs import run_render
+from services.artisan_cache import artisan_cache, ARTISAN_CATALOG_FIELDS
+from services.paged_queries import first_pages
+from services import image_hashes
+
+# Concurrent product image prefetch
+CATALOG_FETCH_CONCURRENCY = int(os.getenv("CATALOG_FETCH_CONCURRENCY", "8"))
+CATALOG_FETCH_PER_HOST = int(os.getenv("CATALOG_FETCH_PER_HOST", "4"))
+CATALOG_FETCH_TIMEOUT = 15
+FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Skip revalidation of images checked within this many seconds
+CATALOG_IMAGE_FRESH_SECONDS = int(os.getenv("CATALOG_IMAGE_FRESH_SECONDS", "300"))
+
+# Uploads larger than this go up as resumable, chunked transfers
+CATALOG_RESUMABLE_THRESHOLD = int(os.getenv("CATALOG_RESUMABLE_THRESHOLD_MB", "5")) * 1024 * 1024
+CATALOG_UPLOAD_CHUNK_SIZE = int(os.getenv("CATALOG_UPLOAD_CHUNK_MB", "4")) * 1024 * 1024  # multiple of 256 KB
+
+# Background Storage publishes started by preview requests
+_publish_tasks = set()
+# Background perceptual-hash indexing of freshly fetched product images
+_index_tasks = set()
+
+# Paged image catalogs
+DEFAULT_PRODUCTS_PER_PAGE = 10
+MAX_PRODUCTS_PER_PAGE = 20
+
+# Bump when the catalog layout changes so old fingerprints stop matching
+CATALOG_RENDER_VERSION = 2
+FINGERPRINT_HEADER_FIELDS = ('name', 'email', 'phone')
+FINGERPRINT_PRODUCT_FIELDS = ('name', 'description', 'price', 'category', 'image_url', 'imageUrl')
+
+# Shared keep-alive client, recreated if the event loop changes
+_http_client = None
+_http_client_loop = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled async HTTP client reused across catalog builds"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=FETCH_HEADERS,
+            timeout=CATALOG_FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=CATALOG_FETCH_CONCURRENCY,
+                max_keepalive_connections=CATALOG_FETCH_CONCURRENCY,
+            ),
+        )
+        _http_client_loop = loop
+    return _http_client
 
 class CatalogService:
     
-    @staticmethod
-    def get_font_paths():
-        """Get platform-specific font paths"""
-        system = platform.system()
-        
-        if system == "Windows":
-            base_path = "C:/Windows/Fonts"
-            return {
-                'bold': f"{base_path}/arialbd.ttf",
-                'regular': f"{base_path}/arial.ttf",
-            }
-        elif system == "Linux":
-            return {
-                'bold': "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                'regular': "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            }
-        elif system == "Darwin":  # macOS
-            return {
-                'bold': "/System/Library/Fonts/Helvetica.ttc",
-                'regular': "/System/Library/Fonts/Helvetica.ttc",
-            }
-        else:
-            return None
-    
-    @staticmethod
-    def load_fonts():
-        """Load fonts with fallback to default"""
-        font_paths = CatalogService.get_font_paths()
-        
-        try:
-            if font_paths:
-                font_title = ImageFont.truetype(font_paths['bold'], 36)
-                font_subtitle = ImageFont.truetype(font_paths['regular'], 20)
-                font_name = ImageFont.truetype(font_paths['bold'], 22)
-                font_price = ImageFont.truetype(font_paths['bold'], 28)
-                print("✅ Loaded TrueType fonts")
-                return font_title, font_subtitle, font_name, font_price
-        except Exception as e:
-            print(f"⚠️ Error loading TrueType fonts: {e}")
-        
-        print("⚠️ Using default fonts")
-        default_font = ImageFont.load_default()
-        return default_font, default_font, default_font, default_font
-    
     @staticmethod
     async def get_artisan_products(artisan_id: str):
-        """Fetch artisan profile and products from Firestore"""
+        """Fetch artisan profile and products (via the shared artisan cache)"""
         try:
-            # Get artisan profile
-            artisan_ref = db.collection('users').document(artisan_id)
-            artisan_doc = artisan_ref.get()
+            artisan_data = await asyncio.to_thread(artisan_cache.get, artisan_id, ARTISAN_CATALOG_FIELDS)
             
-            if not artisan_doc.exists:
+            if artisan_data is None:
                 raise ValueError(f"Artisan not found with ID: {artisan_id}")
             
-            artisan_data = artisan_doc.to_dict()
-            artisan_data['id'] = artisan_doc.id
-            
             # ✅ FIX: Products are stored inside the user document
             products = artisan_data.get("products", [])
             if not products or len(products) == 0:
                 raise ValueError(f"No products found for this artisan")
 
             print(f"📦 Found {len(products)} embedded products for artisan {artisan_id}")
+            
             return artisan_data, products
             
         except Exception as e:
@@ -86,37 +95,282 @@ class CatalogService:
             raise Exception(f"Error fetching data: {str(e)}")
     
     @staticmethod
-    def download_image(url: str) -> bytes:
-        """Download image from URL with better error handling"""
+    def get_image_url(product: dict):
+        return catalog_renderer.get_image_url(product)
+    
+    @staticmethod
+    async def fetch_image(client: httpx.AsyncClient, url: str) -> bool:
+        """
+        Make sure url is in the image cache, revalidating a cached copy with a
+        conditional GET (If-None-Match / If-Modified-Since). Returns True when
+        usable bytes are cached.
+        """
+        meta = image_cache.get_meta(url)
+        if meta and time.time() - meta.get('validated_at', 0) < CATALOG_IMAGE_FRESH_SECONDS:
+            return True
+        
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        
         try:
-            print(f"🔄 Downloading image from: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, timeout=15, headers=headers)
+            response = await client.get(url, headers=headers)
+            
+            if response.status_code == 304 and meta:
+                image_cache.mark_validated(url)
+                return True
+            
             response.raise_for_status()
             
-            # Verify it's actually an image
             content_type = response.headers.get('content-type', '')
             if 'image' not in content_type.lower():
                 print(f"⚠️ URL returned non-image content-type: {content_type}")
-                return None
-            
-            print(f"✅ Downloaded image ({len(response.content)} bytes)")
-            return response.content
-            
-        except requests.exceptions.Timeout:
+                return False
+            
+            image_cache.store_original(
+                url,
+                response.content,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+                content_type=content_type,
+            )
+            return True
+        
+        except httpx.TimeoutException:
             print(f"⚠️ Timeout downloading image from {url}")
-            return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"⚠️ Error downloading image from {url}: {e}")
-            return None
         except Exception as e:
             print(f"⚠️ Unexpected error downloading image: {e}")
-            return None
+        
+        # Origin unreachable: a previously cached copy is better than nothing
+        if meta:
+            print(f"⚠️ Using stale cached copy of {url}")
+            return True
+        return False
+    
+    @staticmethod
+    async def prefetch_images(products: list) -> dict:
+        """
+        Download (or revalidate) all product images concurrently before
+        rendering. Bounded by CATALOG_FETCH_CONCURRENCY overall and
+        CATALOG_FETCH_PER_HOST per host. Returns {url: available}.
+        """
+        urls = []
+        for product in products:
+            url = CatalogService.get_image_url(product)
+            if url and url not in urls:
+                urls.append(url)
+        
+        if not urls:
+            return {}
+        
+        client = get_http_client()
+        overall = asyncio.Semaphore(CATALOG_FETCH_CONCURRENCY)
+        per_host = {}
+        
+        async def fetch(url):
+            host = urlparse(url).netloc
+            host_limit = per_host.setdefault(host, asyncio.Semaphore(CATALOG_FETCH_PER_HOST))
+            async with overall, host_limit:
+                return url, await CatalogService.fetch_image(client, url)
+        
+        started = asyncio.get_running_loop().time()
+        results = dict(await asyncio.gather(*(fetch(url) for url in urls)))
+        elapsed = asyncio.get_running_loop().time() - started
+        
+        fetched = sum(1 for ok in results.values() if ok)
+        print(f"✅ Prefetched {fetched}/{len(urls)} images in {elapsed:.2f}s")
+        return results
+    
+    @staticmethod
+    def index_image_hashes(artisan_id: str, artisan_data: dict, images: dict):
+        """Hash newly fetched images in the background for later duplicate detection"""
+        stored = artisan_data.get(image_hashes.HASH_FIELD) or {}
+        if all(image_hashes.url_key(url) in stored for url, ok in images.items() if ok):
+            return
+        
+        async def index():
+            try:
+                await asyncio.to_thread(
+                    image_hashes.index_images, artisan_id, stored, images, image_cache.get_original
+                )
+            except Exception as e:
+                print(f"⚠️ Could not index image hashes for {artisan_id}: {e}")
+        
+        task = asyncio.create_task(index())
+        _index_tasks.add(task)
+        task.add_done_callback(_index_tasks.discard)
+    
+    @staticmethod
+    async def render(func, *args):
+        """Run a catalog_renderer function in the render process pool"""
+        return await run_render(func, *args)
+    
+    @staticmethod
+    def catalog_fingerprint(artisan_data: dict, products: list, catalog_type: str, options: dict = None) -> str:
+        """Hash of everything that shows up in a rendered catalog"""
+        payload = {
+            'version': CATALOG_RENDER_VERSION,
+            'type': catalog_type,
+            'options': options or {},
+            'header': {field: artisan_data.get(field) for field in FINGERPRINT_HEADER_FIELDS},
+            'products': [
+                {field: product.get(field) for field in FINGERPRINT_PRODUCT_FIELDS}
+                for product in products
+            ],
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def catalog_doc_id(artisan_id: str, catalog_type: str, fingerprint: str) -> str:
+        return f"{artisan_id}_{catalog_type}_{fingerprint[:16]}"
+    
+    @staticmethod
+    def find_existing_catalog(artisan_id: str, catalog_type: str, fingerprint: str):
+        """Catalog metadata already rendered for this exact fingerprint, if any"""
+        try:
+            doc = db.collection('catalogs').document(
+                CatalogService.catalog_doc_id(artisan_id, catalog_type, fingerprint)
+            ).get()
+            if doc.exists:
+                data = doc.to_dict()
+                if data.get('fingerprint') == fingerprint and data.get('url'):
+                    return data
+        except Exception as e:
+            print(f"⚠️ Could not look up existing catalog: {e}")
+        return None
+    
+    @staticmethod
+    def reused_result(existing: dict, artisan_name: str) -> dict:
+        print(f"♻️ Products unchanged, reusing catalog {existing['id']}")
+        return {
+            'success': True,
+            'catalog_url': existing['url'],
+            'catalog_id': existing['id'],
+            'product_count': existing.get('product_count', 0),
+            'artisan_name': artisan_name,
+            'reused': True
+        }
+    
+    @staticmethod
+    def catalog_blob_name(artisan_id: str, fingerprint: str, extension: str) -> str:
+        return f"catalogs/{artisan_id}_{fingerprint[:16]}.{extension}"
+    
+    @staticmethod
+    def upload_public(filename: str, file_obj, content_type: str) -> str:
+        """
+        Upload file_obj as a publicly readable blob and return its URL. The
+        ACL is set in the upload request itself (no separate make_public
+        round trip); large files are sent in resumable chunks so a dropped
+        connection retries a chunk rather than the whole catalog.
+        """
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell()
+        file_obj.seek(0)
+        
+        blob = bucket.blob(filename)
+        if size > CATALOG_RESUMABLE_THRESHOLD:
+            blob.chunk_size = CATALOG_UPLOAD_CHUNK_SIZE
+        blob.upload_from_file(file_obj, size=size, content_type=content_type, predefined_acl='publicRead')
+        return blob.public_url
+    
+    @staticmethod
+    def publish_catalog(artisan_id: str, catalog_type: str, fingerprint: str, buffer, content_type: str,
+                        extension: str, product_count: int, artisan_name: str,
+                        extra: dict = None, url_field: str = None) -> dict:
+        """
+        Upload a rendered catalog and record its metadata. The blob name and
+        document ID derive from the fingerprint, so regenerating identical
+        content overwrites the same blob instead of orphaning a new one.
+        
+        extra: additional metadata (e.g. page manifest) stored and returned
+        url_field: also expose the uploaded URL under this key of extra
+        buffer=None records metadata only; catalog_url is then the first page
+        """
+        extra = dict(extra or {})
+        filename = None
+        if buffer is not None:
+            filename = CatalogService.catalog_blob_name(artisan_id, fingerprint, extension)
+            catalog_url = CatalogService.upload_public(filename, buffer, content_type)
+            if url_field:
+                extra[url_field] = catalog_url
+        else:
+            catalog_url = (extra.get('pages') or [None])[0]
+        
+        # Save catalog metadata to Firestore
+        catalog_ref = db.collection('catalogs').document(
+            CatalogService.catalog_doc_id(artisan_id, catalog_type, fingerprint)
+        )
+        catalog_data = {
+            'id': catalog_ref.id,
+            'artisan_id': artisan_id,
+            'type': catalog_type,
+            'url': catalog_url,
+            'product_count': product_count,
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'storage_path': filename,
+            'fingerprint': fingerprint,
+            **extra
+        }
+        catalog_ref.set(catalog_data)
+        first_pages.invalidate('catalogs', artisan_id)
+        
+        return {
+            'success': True,
+            'catalog_url': catalog_url,
+            'catalog_id': catalog_ref.id,
+            'product_count': product_count,
+            'artisan_name': artisan_name,
+            'reused': False,
+            **extra
+        }
     
     @staticmethod
-    async def generate_pdf_catalog(artisan_id: str) -> dict:
+    def publish_in_background(artisan_id: str, catalog_type: str, fingerprint: str, data: bytes,
+                              content_type: str, extension: str, product_count: int,
+                              artisan_name: str) -> dict:
+        """
+        Preview mode: hand the rendered bytes back to the caller right away
+        and upload/record the catalog in a background task. The blob name is
+        deterministic, so the eventual public URL is known up front.
+        """
+        async def publish():
+            try:
+                await asyncio.to_thread(
+                    CatalogService.publish_catalog,
+                    artisan_id, catalog_type, fingerprint, io.BytesIO(data), content_type,
+                    extension, product_count, artisan_name
+                )
+                print(f"✅ Preview catalog published for artisan {artisan_id}")
+            except Exception as e:
+                print(f"❌ Background catalog publish failed: {e}")
+        
+        task = asyncio.create_task(publish())
+        _publish_tasks.add(task)
+        task.add_done_callback(_publish_tasks.discard)
+        
+        filename = CatalogService.catalog_blob_name(artisan_id, fingerprint, extension)
+        catalog_id = CatalogService.catalog_doc_id(artisan_id, catalog_type, fingerprint)
+        return {
+            'success': True,
+            'catalog_url': bucket.blob(filename).public_url,
+            'catalog_id': catalog_id,
+            'product_count': product_count,
+            'artisan_name': artisan_name,
+            'reused': False,
+            'data': data,
+            'content_type': content_type,
+            'filename': f"{catalog_id}.{extension}"
+        }
+    
+    @staticmethod
+    async def generate_pdf_catalog(artisan_id: str, force: bool = False, job_id: str = None,
+                                   quality: str = None, preview: bool = False) -> dict:
         """Generate PDF catalog"""
         try:
             print(f"🔄 Generating PDF catalog for artisan {artisan_id}")
@@ -126,139 +380,52 @@ class CatalogService:
             if not products:
                 raise ValueError("No products found for this artisan")
             
-            # Create PDF in memory
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Title'],
-                fontSize=24,
-                textColor=colors.HexColor('#1a56db'),
-                spaceAfter=30,
-                alignment=1
+            artisan_name = artisan_data.get('name', 'Artisan')
+            quality = quality or catalog_renderer.DEFAULT_PDF_QUALITY
+            if quality not in catalog_renderer.PDF_QUALITY_PRESETS:
+                raise ValueError(f"Unknown PDF quality preset: {quality}")
+            fingerprint = CatalogService.catalog_fingerprint(
+                artisan_data, products, 'pdf', {'quality': quality}
             )
+            if not force:
+                existing = await asyncio.to_thread(
+                    CatalogService.find_existing_catalog, artisan_id, 'pdf', fingerprint
+                )
+                if existing:
+                    return CatalogService.reused_result(existing, artisan_name)
             
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=16,
-                textColor=colors.HexColor('#111827'),
-                spaceAfter=10,
-                spaceBefore=20
-            )
+            # Download every product image up front, concurrently
+            images = await CatalogService.prefetch_images(products)
+            CatalogService.index_image_hashes(artisan_id, artisan_data, images)
             
-            price_style = ParagraphStyle(
-                'PriceStyle',
-                parent=styles['Normal'],
-                fontSize=14,
-                textColor=colors.HexColor('#059669'),
-                fontName='Helvetica-Bold'
+            # ReportLab layout runs in the render pool, off the event loop
+            pdf_data = await CatalogService.render(
+                catalog_renderer.render_pdf, artisan_data, products, images, job_id, quality
             )
+            if preview:
+                return CatalogService.publish_in_background(
+                    artisan_id, 'pdf', fingerprint, pdf_data, 'application/pdf', 'pdf',
+                    len(products), artisan_name
+                )
+            buffer = io.BytesIO(pdf_data)
             
-            # Header
-            artisan_name = artisan_data.get('name', 'Artisan')
-            header = Paragraph(f"<b>{artisan_name}</b><br/>Product Catalog", title_style)
-            story.append(header)
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Contact info
-            contact_info = []
-            if artisan_data.get('email'):
-                contact_info.append(f"Email: {artisan_data['email']}")
-            if artisan_data.get('phone'):
-                contact_info.append(f"Phone: {artisan_data['phone']}")
-            
-            if contact_info:
-                contact_text = " | ".join(contact_info)
-                story.append(Paragraph(contact_text, styles['Normal']))
-                story.append(Spacer(1, 0.3*inch))
-            
-            # Products
-            for idx, product in enumerate(products, 1):
-                product_name = product.get('name', 'Unnamed Product')
-                story.append(Paragraph(f"{idx}. {product_name}", heading_style))
-                
-                # Product image
-                image_url = product.get('image_url') or product.get('imageUrl')
-                if image_url:
-                    try:
-                        img_data = CatalogService.download_image(image_url)
-                        if img_data:
-                            # Verify image data
-                            img_buffer = io.BytesIO(img_data)
-                            test_img = Image.open(img_buffer)
-                            test_img.verify()
-                            
-                            # Create new buffer for ReportLab
-                            img_buffer = io.BytesIO(img_data)
-                            img = RLImage(img_buffer, width=3*inch, height=3*inch)
-                            story.append(img)
-                            story.append(Spacer(1, 0.1*inch))
-                    except Exception as e:
-                        print(f"⚠️ Error loading image for PDF: {e}")
-                
-                # Description
-                description = product.get('description', 'No description available')
-                story.append(Paragraph(description, styles['Normal']))
-                story.append(Spacer(1, 0.1*inch))
-                
-                # Price
-                price = product.get('price', 0)
-                price_text = f"Price: ₹{price:,.2f}"
-                story.append(Paragraph(price_text, price_style))
-                
-                # Category
-                if product.get('category'):
-                    category_text = f"Category: {product['category']}"
-                    story.append(Paragraph(category_text, styles['Italic']))
-                
-                story.append(Spacer(1, 0.4*inch))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            
-            # Upload to Firebase Storage
-            filename = f"catalogs/{artisan_id}_{uuid.uuid4()}.pdf"
-            blob = bucket.blob(filename)
-            blob.upload_from_file(buffer, content_type='application/pdf')
-            blob.make_public()
-            
-            catalog_url = blob.public_url
-            
-            print(f"✅ PDF catalog generated: {catalog_url}")
-            
-            # Save catalog metadata to Firestore
-            catalog_ref = db.collection('catalogs').document()
-            catalog_data = {
-                'id': catalog_ref.id,
-                'artisan_id': artisan_id,
-                'type': 'pdf',
-                'url': catalog_url,
-                'product_count': len(products),
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'storage_path': filename
-            }
-            catalog_ref.set(catalog_data)
-            
-            return {
-                'success': True,
-                'catalog_url': catalog_url,
-                'catalog_id': catalog_ref.id,
-                'product_count': len(products),
-                'artisan_name': artisan_name
-            }
+            result = await asyncio.to_thread(
+                CatalogService.publish_catalog,
+                artisan_id, 'pdf', fingerprint, buffer, 'application/pdf', 'pdf',
+                len(products), artisan_name
+            )
+            print(f"✅ PDF catalog generated: {result['catalog_url']}")
+            return result
             
         except Exception as e:
             print(f"❌ Error generating PDF: {str(e)}")
             raise Exception(f"Error generating PDF: {str(e)}")
     
     @staticmethod
-    async def generate_image_catalog(artisan_id: str) -> dict:
+    async def generate_image_catalog(artisan_id: str, force: bool = False, paged: bool = False,
+                                     products_per_page: int = DEFAULT_PRODUCTS_PER_PAGE,
+                                     bundle: str = None, job_id: str = None,
+                                     image_format: str = None, preview: bool = False) -> dict:
         """Generate image-based catalog"""
         try:
             print(f"🔄 Generating image catalog for artisan {artisan_id}")
@@ -268,160 +435,161 @@ class CatalogService:
             if not products:
                 raise ValueError("No products found for this artisan")
             
-            # Calculate dimensions
-            products_per_row = 2
-            product_height = 450
-            header_height = 150
-            rows = (len(products) + products_per_row - 1) // products_per_row
-            
-            img_width = 1200
-            img_height = header_height + (rows * product_height)
-            
-            # Create image
-            catalog_img = Image.new('RGB', (img_width, img_height), '#ffffff')
-            draw = ImageDraw.Draw(catalog_img)
+            image_format = image_format or catalog_renderer.DEFAULT_IMAGE_FORMAT
+            if image_format not in catalog_renderer.IMAGE_FORMAT_PRESETS:
+                raise ValueError(f"Unknown image format: {image_format}")
             
-            # Load fonts
-            font_title, font_subtitle, font_name, font_price = CatalogService.load_fonts()
+            if paged:
+                return await CatalogService.generate_paged_image_catalog(
+                    artisan_id, artisan_data, products, force, products_per_page, bundle, job_id,
+                    image_format
+                )
             
-            # Header
             artisan_name = artisan_data.get('name', 'Artisan')
+            fingerprint = CatalogService.catalog_fingerprint(
+                artisan_data, products, 'image', {'format': image_format}
+            )
+            if not force:
+                existing = await asyncio.to_thread(
+                    CatalogService.find_existing_catalog, artisan_id, 'image', fingerprint
+                )
+                if existing:
+                    return CatalogService.reused_result(existing, artisan_name)
             
-            # Draw header background
-            draw.rectangle([(0, 0), (img_width, header_height)], fill='#1e40af')
-            
-            # Title
-            title = f"{artisan_name} - Product Catalog"
-            try:
-                title_bbox = draw.textbbox((0, 0), title, font=font_title)
-                title_width = title_bbox[2] - title_bbox[0]
-            except:
-                title_width = len(title) * 15
-            draw.text(((img_width - title_width) // 2, 40), title, fill='#ffffff', font=font_title)
-            
-            # Subtitle
-            subtitle = f"{len(products)} Products Available"
-            try:
-                subtitle_bbox = draw.textbbox((0, 0), subtitle, font=font_subtitle)
-                subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-            except:
-                subtitle_width = len(subtitle) * 10
-            draw.text(((img_width - subtitle_width) // 2, 95), subtitle, fill='#e0e7ff', font=font_subtitle)
-            
-            # Products grid
-            x_offset = 50
-            y_offset = header_height + 30
-            col_width = 550
+            # Download every product image up front, concurrently
+            images = await CatalogService.prefetch_images(products)
+            CatalogService.index_image_hashes(artisan_id, artisan_data, images)
             
-            for idx, product in enumerate(products):
-                col = idx % products_per_row
-                row = idx // products_per_row
-                
-                x_pos = x_offset + (col * col_width)
-                y_pos = y_offset + (row * product_height)
-                
-                # Product card background
-                card_x = x_pos - 10
-                card_y = y_pos - 10
-                card_width = 530
-                card_height = 420
-                draw.rectangle(
-                    [(card_x, card_y), (card_x + card_width, card_y + card_height)],
-                    outline='#d1d5db',
-                    width=2
+            image_data, used_format = await CatalogService.render(
+                catalog_renderer.render_image_catalog, artisan_name, products, images,
+                len(products), None, None, job_id, 0, image_format
+            )
+            preset = catalog_renderer.IMAGE_FORMAT_PRESETS[used_format]
+            if preview:
+                return CatalogService.publish_in_background(
+                    artisan_id, 'image', fingerprint, image_data, preset['content_type'],
+                    preset['extension'], len(products), artisan_name
                 )
-                
-                # Product image
-                image_url = product.get('image_url') or product.get('imageUrl')
-                if image_url:
-                    try:
-                        img_data = CatalogService.download_image(image_url)
-                        if img_data:
-                            # Open and verify image
-                            img_buffer = io.BytesIO(img_data)
-                            prod_img = Image.open(img_buffer)
-                            
-                            # Convert to RGB if necessary
-                            if prod_img.mode in ('RGBA', 'LA', 'P'):
-                                background = Image.new('RGB', prod_img.size, (255, 255, 255))
-                                if prod_img.mode == 'P':
-                                    prod_img = prod_img.convert('RGBA')
-                                background.paste(prod_img, mask=prod_img.split()[-1] if prod_img.mode == 'RGBA' else None)
-                                prod_img = background
-                            elif prod_img.mode != 'RGB':
-                                prod_img = prod_img.convert('RGB')
-                            
-                            # Resize
-                            prod_img.thumbnail((280, 280), Image.Resampling.LANCZOS)
-                            
-                            # Center the image
-                            img_x = x_pos + (510 - prod_img.width) // 2
-                            catalog_img.paste(prod_img, (img_x, y_pos))
-                            print(f"✅ Added product image for: {product.get('name', 'Product')}")
-                    except Exception as e:
-                        print(f"⚠️ Error loading product image for {product.get('name', 'Product')}: {e}")
-                        # Draw placeholder
-                        draw.rectangle(
-                            [(x_pos, y_pos), (x_pos + 280, y_pos + 280)],
-                            fill='#f3f4f6',
-                            outline='#d1d5db'
-                        )
-                        draw.text((x_pos + 80, y_pos + 130), "No Image", fill='#9ca3af', font=font_subtitle)
-                
-                # Product details
-                text_y = y_pos + 300
-                
-                # Product name
-                product_name = product.get('name', 'Product')[:35]
-                if len(product.get('name', '')) > 35:
-                    product_name += '...'
-                draw.text((x_pos, text_y), product_name, fill='#111827', font=font_name)
-                
-                # Price
-                price = product.get('price', 0)
-                price_text = f"₹{price:,.2f}"
-                draw.text((x_pos, text_y + 35), price_text, fill='#059669', font=font_price)
-                
-                # Category
-                if product.get('category'):
-                    category = product['category'][:25]
-                    draw.text((x_pos, text_y + 75), category, fill='#6b7280', font=font_subtitle)
             
             # Upload to Firebase Storage
-            buffer = io.BytesIO()
-            catalog_img.save(buffer, format='PNG', quality=95, optimize=True)
-            buffer.seek(0)
-            
-            filename = f"catalogs/{artisan_id}_{uuid.uuid4()}.png"
-            blob = bucket.blob(filename)
-            blob.upload_from_file(buffer, content_type='image/png')
-            blob.make_public()
+            buffer = io.BytesIO(image_data)
             
-            catalog_url = blob.public_url
-            
-            print(f"✅ Image catalog generated: {catalog_url}")
-            
-            # Save to Firestore
-            catalog_ref = db.collection('catalogs').document()
-            catalog_data = {
-                'id': catalog_ref.id,
-                'artisan_id': artisan_id,
-                'type': 'image',
-                'url': catalog_url,
-                'product_count': len(products),
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'storage_path': filename
-            }
-            catalog_ref.set(catalog_data)
-            
-            return {
-                'success': True,
-                'catalog_url': catalog_url,
-                'catalog_id': catalog_ref.id,
-                'product_count': len(products),
-                'artisan_name': artisan_name
-            }
+            result = await asyncio.to_thread(
+                CatalogService.publish_catalog,
+                artisan_id, 'image', fingerprint, buffer, preset['content_type'], preset['extension'],
+                len(products), artisan_name
+            )
+            print(f"✅ Image catalog generated: {result['catalog_url']}")
+            return result
             
         except Exception as e:
             print(f"❌ Error generating image: {str(e)}")
-            raise Exception(f"Error generating image: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error generating image: {str(e)}")
+    
+    @staticmethod
+    def append_pdf_page(pdf_file, page_buffer: io.BytesIO):
+        """
+        Add one encoded page image to the PDF in pdf_file. Pages after the
+        first are appended as incremental updates (Pillow reads the existing
+        file through mmap), so finished pages stay on disk.
+        """
+        page_buffer.seek(0)
+        with Image.open(page_buffer) as page:
+            if page.mode not in ('RGB', 'L', 'CMYK'):
+                page = page.convert('RGB')
+            pdf_file.seek(0, io.SEEK_END)
+            # 72 dpi: one PDF point per pixel, as the page image is sized
+            page.save(pdf_file, 'PDF', append=pdf_file.tell() > 0, resolution=72)
+    
+    @staticmethod
+    async def generate_paged_image_catalog(artisan_id: str, artisan_data: dict, products: list,
+                                           force: bool, products_per_page: int, bundle: str = None,
+                                           job_id: str = None, image_format: str = None) -> dict:
+        """
+        Render products_per_page products per page image and upload each page
+        as soon as it is encoded, so only one page bitmap is alive at a time.
+        Images are prefetched page by page for the same reason. Optionally
+        collects the encoded pages into a ZIP or multi-page PDF on a temp file;
+        each page is written out as it is rendered, not held until the end.
+        """
+        if bundle not in (None, 'zip', 'pdf'):
+            raise ValueError("Invalid bundle type. Use 'zip' or 'pdf'")
+        products_per_page = max(2, min(products_per_page, MAX_PRODUCTS_PER_PAGE))
+        
+        artisan_name = artisan_data.get('name', 'Artisan')
+        image_format = image_format or catalog_renderer.DEFAULT_IMAGE_FORMAT
+        options = {
+            'paged': True,
+            'products_per_page': products_per_page,
+            'bundle': bundle,
+            'format': image_format
+        }
+        fingerprint = CatalogService.catalog_fingerprint(artisan_data, products, 'image', options)
+        if not force:
+            existing = await asyncio.to_thread(
+                CatalogService.find_existing_catalog, artisan_id, 'image', fingerprint
+            )
+            if existing:
+                result = CatalogService.reused_result(existing, artisan_name)
+                result['pages'] = existing.get('pages', [])
+                result['page_count'] = existing.get('page_count', len(result['pages']))
+                result['bundle_url'] = existing.get('bundle_url')
+                return result
+        
+        page_count = (len(products) + products_per_page - 1) // products_per_page
+        page_urls = []
+        
+        bundle_file = tempfile.TemporaryFile() if bundle else None
+        zip_bundle = zipfile.ZipFile(bundle_file, 'w', zipfile.ZIP_STORED) if bundle == 'zip' else None
+        
+        try:
+            for page_index in range(page_count):
+                page_products = products[page_index * products_per_page:(page_index + 1) * products_per_page]
+                images = await CatalogService.prefetch_images(page_products)
+                CatalogService.index_image_hashes(artisan_id, artisan_data, images)
+                
+                image_data, used_format = await CatalogService.render(
+                    catalog_renderer.render_image_catalog, artisan_name, page_products, images,
+                    len(products), page_index + 1, page_count, job_id, page_index * products_per_page,
+                    image_format
+                )
+                preset = catalog_renderer.IMAGE_FORMAT_PRESETS[used_format]
+                buffer = io.BytesIO(image_data)
+                del image_data
+                
+                page_name = f"catalogs/{artisan_id}_{fingerprint[:16]}_p{page_index + 1}.{preset['extension']}"
+                page_urls.append(await asyncio.to_thread(
+                    CatalogService.upload_public, page_name, buffer, preset['content_type']
+                ))
+                print(f"✅ Page {page_index + 1}/{page_count} uploaded")
+                
+                # Pages are already compressed, so the ZIP just stores them
+                if zip_bundle:
+                    zip_bundle.writestr(f"page_{page_index + 1:03d}.{preset['extension']}", buffer.getvalue())
+                elif bundle == 'pdf':
+                    await asyncio.to_thread(CatalogService.append_pdf_page, bundle_file, buffer)
+                del buffer
+            
+            extra = {'pages': page_urls, 'page_count': page_count, 'bundle_url': None}
+            if bundle:
+                if zip_bundle:
+                    zip_bundle.close()
+                bundle_file.seek(0)
+                content_type = 'application/zip' if bundle == 'zip' else 'application/pdf'
+                result = await asyncio.to_thread(
+                    CatalogService.publish_catalog,
+                    artisan_id, 'image', fingerprint, bundle_file, content_type, bundle,
+                    len(products), artisan_name, extra=extra, url_field='bundle_url'
+                )
+            else:
+                result = await asyncio.to_thread(
+                    CatalogService.publish_catalog,
+                    artisan_id, 'image', fingerprint, None, None, None,
+                    len(products), artisan_name, extra=extra
+                )
+        finally:
+            if bundle_file:
+                bundle_file.close()
+        
+        print(f"✅ Paged image catalog generated: {page_count} pages")
+        return result
\ No newline at end of file
@@ -122,8 +122,9 @@ if __name__ == "__main__":
     
     if success:
         print("\n✅ All done! Next steps:")
-        print("   1. Restart your backend: uvicorn main:app --reload")
-        print("   2. Refresh your artisan dashboard")
-        print("   3. You should now see analytics data!")
+        print("   1. Roll up the back-dated interactions: python -m services.interaction_rollup --backfill-days 31")
+        print("   2. Restart your backend: uvicorn main:app --reload")
+        print("   3. Refresh your artisan dashboard")
+        print("   4. You should now see analytics data!")
     else:
         print("\n❌ Something went wrong. Check the errors above.")
\ No newline at end of file
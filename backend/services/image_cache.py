@@ -0,0 +1,222 @@
+"""
+Image Cache Module
+On-disk cache of product images keyed by URL, with validators for
+conditional revalidation and pre-rendered derivatives (thumbnails, print size)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only serializes threads of one process
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "lokkala_image_cache")
+# Share of max_bytes a process writes between directory scans
+EVICT_SCAN_FRACTION = 0.05
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class ImageCache:
+    """
+    One entry per image URL, stored under sha256(url):
+        <key>.json       metadata: url, etag, last_modified, validated_at, variants
+        <key>.orig       original bytes as downloaded
+        <key>.<variant>  derived renditions (e.g. thumb_280, print_300dpi_q90)
+
+    Entries are evicted whole, least recently used first (newest file mtime;
+    reads touch the .json), once the total size on disk exceeds max_bytes.
+    Sizes come from scanning the directory under an exclusive lock on
+    <cache_dir>/.lock, so the API process and the catalog render workers
+    sharing the directory enforce one limit between them.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or os.getenv("CATALOG_IMAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.getenv("CATALOG_IMAGE_CACHE_MAX_MB", "500")) * 1024 * 1024
+
+        self._lock = threading.Lock()
+        # Bytes this process wrote since its last scan; a scan runs once it
+        # reaches EVICT_SCAN_FRACTION of max_bytes, so the directory can
+        # overshoot by at most that much per writing process
+        self._written = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        images, total_bytes = self.enforce_limit()
+        if images:
+            print(f"🖼️ Image cache: {images} images, {total_bytes / 1024 / 1024:.1f} MB")
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{suffix}")
+
+    @contextmanager
+    def _dir_lock(self):
+        """Exclusive across processes (and threads) sharing cache_dir"""
+        with self._lock, open(os.path.join(self.cache_dir, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _scan(self) -> dict:
+        """key -> [bytes on disk, last used] for every entry in the directory"""
+        entries = {}
+        for directory in os.scandir(self.cache_dir):
+            if not directory.is_dir():
+                continue
+            for file in os.scandir(directory.path):
+                key, _, suffix = file.name.partition(".")
+                if suffix.endswith("part"):
+                    continue  # write in progress
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+                entry = entries.setdefault(key, [0, 0.0])
+                entry[0] += stat.st_size
+                entry[1] = max(entry[1], stat.st_mtime)
+        return entries
+
+    def _remove_entry(self, key: str):
+        """Delete all files of an entry"""
+        directory = os.path.join(self.cache_dir, key[:2])
+        try:
+            for name in os.listdir(directory):
+                if name.startswith(key) and not name.endswith(".part"):
+                    os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+    def enforce_limit(self) -> tuple:
+        """Evict least recently used entries down to max_bytes; returns (images, bytes)"""
+        with self._dir_lock():
+            self._written = 0
+            entries = self._scan()
+            total_bytes = sum(size for size, _ in entries.values())
+            by_age = sorted(entries.items(), key=lambda item: item[1][1])
+            for key, (size, _) in by_age[:-1]:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove_entry(key)
+                total_bytes -= size
+                del entries[key]
+            return len(entries), total_bytes
+
+    def _wrote(self, size: int):
+        with self._lock:
+            self._written += size
+            due = self._written >= self.max_bytes * EVICT_SCAN_FRACTION
+        if due:
+            self.enforce_limit()
+
+    def _write_meta(self, key: str, meta: dict):
+        _atomic_write(self._path(key, "json"), json.dumps(meta).encode("utf-8"))
+
+    # ----------------------------------------------------------
+    # ORIGINALS
+    # ----------------------------------------------------------
+    def get_meta(self, url: str):
+        key = self.key_for(url)
+        try:
+            with open(self._path(key, "json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_original(self, url: str):
+        key = self.key_for(url)
+        try:
+            with open(self._path(key, "orig"), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.touch(url)
+        return data
+
+    def store_original(self, url: str, data: bytes, etag: str = None,
+                       last_modified: str = None, content_type: str = None):
+        """Save freshly downloaded bytes; stale derivatives are dropped"""
+        key = self.key_for(url)
+        with self._dir_lock():
+            self._remove_entry(key)
+            _atomic_write(self._path(key, "orig"), data)
+            self._write_meta(key, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_type": content_type,
+                "validated_at": time.time(),
+                "variants": [],
+            })
+        self._wrote(len(data))
+
+    def mark_validated(self, url: str):
+        """Record a 304 Not Modified from the origin"""
+        key = self.key_for(url)
+        with self._dir_lock():
+            meta = self.get_meta(url)
+            if meta is None:
+                return
+            meta["validated_at"] = time.time()
+            self._write_meta(key, meta)
+
+    def touch(self, url: str):
+        try:
+            os.utime(self._path(self.key_for(url), "json"))
+        except OSError:
+            pass
+
+    # ----------------------------------------------------------
+    # DERIVATIVES
+    # ----------------------------------------------------------
+    def get_derivative(self, url: str, variant: str):
+        key = self.key_for(url)
+        try:
+            with open(self._path(key, variant), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.touch(url)
+        return data
+
+    def store_derivative(self, url: str, variant: str, data: bytes):
+        key = self.key_for(url)
+        with self._dir_lock():
+            # Re-read under the lock: the entry may have been evicted or replaced
+            meta = self.get_meta(url)
+            if meta is None:
+                return
+            _atomic_write(self._path(key, variant), data)
+            if variant not in meta["variants"]:
+                meta["variants"].append(variant)
+                self._write_meta(key, meta)
+        self._wrote(len(data))
+
+    def stats(self) -> dict:
+        with self._dir_lock():
+            entries = self._scan()
+        return {
+            "images": len(entries),
+            "total_bytes": sum(size for size, _ in entries.values()),
+            "max_bytes": self.max_bytes,
+        }
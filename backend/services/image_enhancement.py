@@ -0,0 +1,180 @@
+"""
+Image Enhancement Module
+Product photo clean-up as NumPy array operations: auto-levels, brightness/
+contrast, white-background cleanup and sharpening. Used by the /api/images
+endpoints and optionally by the caption and Instagram posting routes.
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from services.catalog_renderer import to_rgb
+
+# Larger photos are downscaled first; nothing downstream needs more
+ENHANCE_MAX_SIDE = int(os.getenv("ENHANCE_MAX_SIDE", "2048"))
+# NumPy and Pillow release the GIL, so threads scale for batches
+ENHANCE_WORKERS = int(os.getenv("ENHANCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Defaults match the old in-browser enhancement (brightness +12, contrast 1.08)
+ENHANCE_DEFAULTS = {
+    'auto_levels': True,
+    'brightness': 12.0,
+    'contrast': 1.08,
+    'white_background': False,
+    'sharpen': 0.5,
+}
+
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': 90, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'image/png', 'png', {'compress_level': 6}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 88, 'method': 4}),
+}
+
+LEVELS_CLIP = 0.005        # fraction of darkest/brightest pixels clipped per channel
+WHITE_THRESHOLD = 215      # darkest channel at least this bright...
+WHITE_MAX_SPREAD = 28      # ...and nearly grey counts as background
+WHITE_RAMP = 25            # levels over which background blends to pure white
+
+_pool = None
+
+
+def decode_image(data: bytes, max_side: int = None) -> np.ndarray:
+    """RGB uint8 array (H, W, 3), EXIF-rotated and capped at max_side"""
+    max_side = max_side or ENHANCE_MAX_SIDE
+    img = Image.open(io.BytesIO(data))
+    # JPEGs decode straight at 1/2..1/8 scale when they are much larger
+    img.draft('RGB', (max_side, max_side))
+    img = to_rgb(ImageOps.exif_transpose(img))
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def encode_image(arr: np.ndarray, output_format: str = 'jpeg') -> tuple:
+    """Returns (bytes, content_type, extension)"""
+    pil_format, content_type, extension, options = OUTPUT_FORMATS[output_format]
+    out = io.BytesIO()
+    Image.fromarray(arr).save(out, format=pil_format, **options)
+    return out.getvalue(), content_type, extension
+
+
+def levels_bounds(arr: np.ndarray, clip: float = LEVELS_CLIP) -> tuple:
+    """Per-channel (low, high) input levels from a histogram of a subsample"""
+    step = max(1, int(np.sqrt(arr.shape[0] * arr.shape[1] / 250_000)))
+    sample = arr[::step, ::step].reshape(-1, 3)
+    lows, highs = np.zeros(3), np.full(3, 255.0)
+    for c in range(3):
+        cdf = np.cumsum(np.bincount(sample[:, c], minlength=256)) / len(sample)
+        lows[c] = np.searchsorted(cdf, clip)
+        highs[c] = np.searchsorted(cdf, 1 - clip)
+    # Nearly flat channels are left alone rather than blown up
+    flat = highs - lows < 32
+    lows[flat], highs[flat] = 0, 255
+    return lows, highs
+
+
+def tone_lut(arr: np.ndarray, auto_levels: bool, brightness: float, contrast: float) -> np.ndarray:
+    """Levels, brightness and contrast folded into one (3, 256) lookup table"""
+    values = np.arange(256, dtype=np.float32)
+    if auto_levels:
+        lows, highs = levels_bounds(arr)
+    else:
+        lows, highs = np.zeros(3), np.full(3, 255.0)
+    scale = (255.0 / (highs - lows)).astype(np.float32)
+    lut = (values[None, :] - lows[:, None].astype(np.float32)) * scale[:, None]
+    lut = (lut + brightness - 128.0) * contrast + 128.0
+    return np.clip(lut + 0.5, 0, 255).astype(np.uint8)
+
+
+def apply_lut(arr: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    out = np.empty_like(arr)
+    for c in range(3):
+        np.take(lut[c], arr[..., c], out=out[..., c])
+    return out
+
+
+def clean_white_background(arr: np.ndarray) -> np.ndarray:
+    """Push bright, nearly neutral pixels (grey-ish studio backdrops) to pure white"""
+    r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
+    lo = np.minimum(np.minimum(r, g), b)
+    hi = np.maximum(np.maximum(r, g), b)
+    # Blend weight in 1/256ths, looked up from the darkest channel
+    ramp = np.clip((np.arange(256) - WHITE_THRESHOLD) * 256 // WHITE_RAMP, 0, 256).astype(np.uint16)
+    weight = ramp[lo]
+    weight[hi - lo > WHITE_MAX_SPREAD] = 0
+    if not weight.any():
+        return arr
+    out = arr.astype(np.uint16)
+    out += ((255 - out) * weight[..., None] + 128) >> 8
+    return out.astype(np.uint8)
+
+
+def sharpen(arr: np.ndarray, amount: float) -> np.ndarray:
+    """Unsharp mask with a separable 3x3 binomial blur, in integer arithmetic"""
+    src = arr.astype(np.int16)
+    padded = np.pad(src, ((1, 1), (1, 1), (0, 0)), mode='edge')
+    rows = padded[:-2] + 2 * padded[1:-1] + padded[2:]
+    blur16 = rows[:, :-2] + 2 * rows[:, 1:-1] + rows[:, 2:]  # 16 x blur
+    detail = ((src << 4) - blur16).astype(np.int32)
+    # amount in 1/256ths; detail is x16, hence the shift by 12
+    out = src + ((detail * int(round(amount * 256)) + 2048) >> 12)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def enhance_array(arr: np.ndarray, auto_levels: bool = True, brightness: float = 12.0,
+                  contrast: float = 1.08, white_background: bool = False,
+                  sharpen_amount: float = 0.5) -> np.ndarray:
+    out = apply_lut(arr, tone_lut(arr, auto_levels, brightness, contrast))
+    if white_background:
+        out = clean_white_background(out)
+    if sharpen_amount > 0:
+        out = sharpen(out, sharpen_amount)
+    return out
+
+
+def enhance_image_bytes(data: bytes, output_format: str = 'jpeg', **options) -> tuple:
+    """
+    Decode, enhance and re-encode one image. options are ENHANCE_DEFAULTS keys.
+    Returns (bytes, content_type, extension, stats).
+    """
+    settings = {**ENHANCE_DEFAULTS, **{k: v for k, v in options.items() if v is not None}}
+    started = time.perf_counter()
+    arr = decode_image(data)
+    out = enhance_array(
+        arr, settings['auto_levels'], settings['brightness'], settings['contrast'],
+        settings['white_background'], settings['sharpen']
+    )
+    encoded, content_type, extension = encode_image(out, output_format)
+    stats = {
+        'width': arr.shape[1],
+        'height': arr.shape[0],
+        'megapixels': round(arr.shape[0] * arr.shape[1] / 1e6, 2),
+        'ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    return encoded, content_type, extension, stats
+
+
+def get_enhance_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=ENHANCE_WORKERS, thread_name_prefix="enhance")
+    return _pool
+
+
+def enhance_batch(images: list, output_format: str = 'jpeg', **options) -> list:
+    """
+    Enhance many images in parallel; results keep the input order. A failed
+    image yields {'error': ...} instead of aborting the batch.
+    """
+    def run(data):
+        try:
+            return enhance_image_bytes(data, output_format, **options)
+        except Exception as e:
+            return {'error': str(e)}
+
+    return list(get_enhance_pool().map(run, images))
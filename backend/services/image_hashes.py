@@ -0,0 +1,267 @@
+"""
+Image Hashes Module
+Perceptual hashes (dHash + pHash, computed with NumPy) of product images,
+stored on the artisan document next to the products, and near-duplicate
+grouping on top of them. Duplicate groups are only reported (the catalog
+duplicates endpoint); catalogs always render each product's own photo, since
+grey-level hashes can't tell colour variants apart. Captioning reuses results
+for near-duplicate uploads.
+
+Backfill all artisans from backend/: python -m services.image_hashes [--artisan ID]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from firebase_config import db
+from services.artisan_cache import artisan_cache, ARTISAN_CATALOG_FIELDS
+
+# Max Hamming distance (of 64 bits, for both hashes) to call two images duplicates
+IMAGE_DUPLICATE_THRESHOLD = int(os.getenv("IMAGE_DUPLICATE_THRESHOLD", "6"))
+HASH_FIELD = 'image_hashes'  # map on the artisan document: url key -> hashes
+
+_DCT_SIZE = 32
+_dct_matrix = None
+
+
+def product_image_urls(product: dict) -> list:
+    urls = [product.get('image_url') or product.get('imageUrl')] + list(product.get('images') or [])
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def url_key(url: str) -> str:
+    """Map key for a URL (Firestore field names can't hold arbitrary URLs)"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+
+
+def _gray(img_data: bytes, size: tuple) -> np.ndarray:
+    img = Image.open(io.BytesIO(img_data))
+    img.draft('L', (size[0] * 8, size[1] * 8))
+    img = img.convert('L').resize(size, Image.Resampling.BILINEAR)
+    return np.asarray(img, dtype=np.float32)
+
+
+def _to_hex(bits: np.ndarray) -> str:
+    return np.packbits(bits.astype(np.uint8).ravel()).tobytes().hex()
+
+
+def _dct(n: int) -> np.ndarray:
+    global _dct_matrix
+    if _dct_matrix is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrix = matrix.astype(np.float32)
+    return _dct_matrix
+
+
+def dhash(img_data: bytes) -> str:
+    """Gradient hash: is each pixel brighter than its right neighbour (9x8 grey)"""
+    gray = _gray(img_data, (9, 8))
+    return _to_hex(gray[:, 1:] > gray[:, :-1])
+
+
+def phash(img_data: bytes) -> str:
+    """DCT hash: low-frequency 8x8 coefficients of a 32x32 grey image vs. their median"""
+    gray = _gray(img_data, (_DCT_SIZE, _DCT_SIZE))
+    dct = _dct(_DCT_SIZE)
+    low = (dct @ gray @ dct.T)[:8, :8]
+    return _to_hex(low > np.median(low.ravel()[1:]))
+
+
+def compute_hashes(img_data: bytes) -> dict:
+    return {'dhash': dhash(img_data), 'phash': phash(img_data)}
+
+
+def _as_uint64(hex_hashes: list) -> np.ndarray:
+    return np.array([int(value, 16) for value in hex_hashes], dtype=np.uint64)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    as_bytes = values.astype('>u8').view(np.uint8).reshape(values.shape + (8,))
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1)
+
+
+def distance(a: dict, b: dict) -> int:
+    """Larger of the dHash and pHash Hamming distances"""
+    return max(
+        bin(int(a['dhash'], 16) ^ int(b['dhash'], 16)).count('1'),
+        bin(int(a['phash'], 16) ^ int(b['phash'], 16)).count('1'),
+    )
+
+
+def duplicate_groups(entries: list, threshold: int = None) -> list:
+    """
+    entries: [{'url', 'dhash', 'phash'}, ...] in priority order. Returns
+    groups (lists of indexes, first = canonical) of two or more images.
+    Each image joins the first earlier canonical within threshold of it, so
+    every member is compared directly with its canonical; A~B and B~C does
+    not put A and C together.
+    """
+    threshold = IMAGE_DUPLICATE_THRESHOLD if threshold is None else threshold
+    if len(entries) < 2:
+        return []
+
+    # All pairwise distances at once: (n, n) XOR + popcount per hash
+    d = _as_uint64([entry['dhash'] for entry in entries])
+    p = _as_uint64([entry['phash'] for entry in entries])
+    close = np.maximum(_popcount(d[:, None] ^ d[None, :]), _popcount(p[:, None] ^ p[None, :])) <= threshold
+
+    groups = {}  # canonical index -> member indexes
+    for i in range(len(entries)):
+        canonical = next((c for c in groups if close[c, i]), None)
+        if canonical is None:
+            groups[i] = [i]
+        else:
+            groups[canonical].append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def hashed_entries(products: list, stored: dict) -> list:
+    """Stored hashes for the products' images, in product order"""
+    entries = []
+    seen = set()
+    for product in products:
+        for url in product_image_urls(product):
+            entry = (stored or {}).get(url_key(url))
+            if url not in seen and entry and entry.get('dhash'):
+                seen.add(url)
+                entries.append({'url': url, 'dhash': entry['dhash'], 'phash': entry['phash']})
+    return entries
+
+
+def find_duplicates(products: list, stored: dict, threshold: int = None) -> list:
+    """Suspected duplicate groups with the products using each image"""
+    entries = hashed_entries(products, stored)
+    used_by = {}
+    for product in products:
+        for url in product_image_urls(product):
+            used_by.setdefault(url, []).append(product.get('name', 'Unnamed product'))
+
+    report = []
+    for group in duplicate_groups(entries, threshold):
+        canonical = entries[group[0]]
+        report.append({
+            'canonical_url': canonical['url'],
+            'images': [
+                {
+                    'url': entries[index]['url'],
+                    'distance': distance(canonical, entries[index]),
+                    'products': used_by.get(entries[index]['url'], []),
+                }
+                for index in group
+            ],
+        })
+    return report
+
+
+def index_images(artisan_id: str, stored: dict, images: dict, get_original) -> int:
+    """
+    Hash images (url -> available) not yet in stored and save them on the
+    artisan document. get_original(url) returns cached bytes. Returns the
+    number of new entries.
+    """
+    updates = {}
+    for url, available in images.items():
+        key = url_key(url)
+        if not available or key in (stored or {}):
+            continue
+        data = get_original(url)
+        if not data:
+            continue
+        try:
+            entry = {'url': url, **compute_hashes(data)}
+        except Exception as e:
+            print(f"⚠️ Could not hash {url}: {e}")
+            entry = {'url': url, 'dhash': None, 'phash': None}
+        updates[f"{HASH_FIELD}.{key}"] = entry
+
+    if updates:
+        db.collection('users').document(artisan_id).update(updates)
+        artisan_cache.invalidate(artisan_id)
+        print(f"🧬 Indexed {len(updates)} product image hashes for artisan {artisan_id}")
+    return len(updates)
+
+
+class NearDuplicateCache:
+    """
+    Small LRU of results keyed by image hashes plus an exact context string
+    (e.g. the caption prompt); a lookup hits for any stored image within
+    threshold.
+    """
+
+    def __init__(self, max_entries: int = 256, threshold: int = None):
+        self.max_entries = max_entries
+        self.threshold = IMAGE_DUPLICATE_THRESHOLD if threshold is None else threshold
+        self._entries = OrderedDict()  # (dhash, phash, context) -> value
+        self._lock = threading.Lock()
+
+    def get(self, hashes: dict, context: str = ''):
+        with self._lock:
+            for key, value in reversed(self._entries.items()):
+                if key[2] == context and distance(hashes, {'dhash': key[0], 'phash': key[1]}) <= self.threshold:
+                    self._entries.move_to_end(key)
+                    return value
+        return None
+
+    def put(self, hashes: dict, value, context: str = ''):
+        with self._lock:
+            self._entries[(hashes['dhash'], hashes['phash'], context)] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+async def sync_artisan(artisan_id: str) -> int:
+    """Download and hash any product images of one artisan not indexed yet"""
+    # catalog_service imports this module
+    from services.catalog_service import CatalogService
+    from services.catalog_renderer import image_cache
+
+    artisan_data = await asyncio.to_thread(artisan_cache.get, artisan_id, ARTISAN_CATALOG_FIELDS)
+    if artisan_data is None:
+        raise ValueError(f"Artisan not found with ID: {artisan_id}")
+    stored = artisan_data.get(HASH_FIELD) or {}
+    urls = [
+        url for product in artisan_data.get('products', [])
+        for url in product_image_urls(product) if url_key(url) not in stored
+    ]
+    if not urls:
+        return 0
+    images = await CatalogService.prefetch_images([{'image_url': url} for url in urls])
+    return await asyncio.to_thread(index_images, artisan_id, stored, images, image_cache.get_original)
+
+
+async def sync_all(artisan_id: str = None):
+    if artisan_id:
+        artisan_ids = [artisan_id]
+    else:
+        docs = db.collection('users').where('type', '==', 'artisan').select([]).stream()
+        artisan_ids = [doc.id for doc in docs]
+
+    total = 0
+    for current in artisan_ids:
+        try:
+            total += await sync_artisan(current)
+        except Exception as e:
+            print(f"❌ {current}: {e}")
+    print(f"✅ Indexed {total} new image hashes across {len(artisan_ids)} artisans")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill perceptual hashes of product images")
+    parser.add_argument("--artisan", default=None, help="only this artisan ID")
+    args = parser.parse_args()
+    asyncio.run(sync_all(args.artisan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Insights Cache Module
+Per-artisan cache of dashboard insights (five BigQuery sections). Fresh
+entries are served as they are; stale ones are served immediately while a
+background refresh recomputes them (stale-while-revalidate); entries past
+the stale window, and explicit refreshes, wait for a new computation.
+Failed computations are never cached: the last good entry is kept (and
+served if there is one), otherwise the fallback is served uncached.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Served without recomputing for this long...
+INSIGHTS_CACHE_TTL = float(os.getenv("INSIGHTS_CACHE_TTL", "600"))
+# ...then served stale (and refreshed in the background) up to this age
+INSIGHTS_CACHE_MAX_STALE = float(os.getenv("INSIGHTS_CACHE_MAX_STALE", "21600"))
+INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "256"))
+
+
+class InsightsCache:
+    """
+    load(artisan_id) is the blocking computation (run in a thread); it must
+    raise rather than return placeholder data. Concurrent computations for
+    the same artisan are shared. fallback(artisan_id), if given, answers a
+    request whose computation failed with nothing cached.
+    """
+
+    def __init__(self, load, ttl: float = None, max_stale: float = None, max_entries: int = None,
+                 fallback=None):
+        self.load = load
+        self.fallback = fallback
+        self.ttl = INSIGHTS_CACHE_TTL if ttl is None else ttl
+        self.max_stale = INSIGHTS_CACHE_MAX_STALE if max_stale is None else max_stale
+        self.max_entries = max_entries or INSIGHTS_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()  # artisan_id -> (computed_at, insights)
+        self._loading = {}             # artisan_id -> Future of the computation in flight
+        self._refreshes = set()        # background refresh tasks (kept referenced)
+
+    async def get(self, artisan_id: str, refresh: bool = False) -> tuple:
+        """
+        Returns (insights, age in seconds, status) with status one of
+        'hit', 'stale', 'miss', 'refresh' or 'fallback' (not cached).
+        """
+        entry = self._entries.get(artisan_id)
+        if entry and not refresh:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._entries.move_to_end(artisan_id)
+                return entry[1], age, 'hit'
+            if age < self.max_stale:
+                self._entries.move_to_end(artisan_id)
+                self._revalidate(artisan_id)
+                return entry[1], age, 'stale'
+
+        try:
+            computed_at, insights = await self._compute(artisan_id)
+        except Exception as e:
+            entry = self._entries.get(artisan_id)
+            if entry:
+                print(f"⚠️ Insights computation failed, serving the cached result: {e}")
+                return entry[1], time.monotonic() - entry[0], 'stale'
+            if self.fallback is None:
+                raise
+            print(f"⚠️ Insights computation failed, serving fallback data: {e}")
+            return self.fallback(artisan_id), 0, 'fallback'
+        return insights, time.monotonic() - computed_at, 'refresh' if refresh else 'miss'
+
+    async def _compute(self, artisan_id: str) -> tuple:
+        if artisan_id in self._loading:
+            return await asyncio.shield(self._loading[artisan_id])
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[artisan_id] = future
+        try:
+            insights = await asyncio.to_thread(self.load, artisan_id)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved; waiters re-raise it
+            raise
+        finally:
+            self._loading.pop(artisan_id, None)
+
+        entry = (time.monotonic(), insights)
+        future.set_result(entry)
+        self._entries[artisan_id] = entry
+        self._entries.move_to_end(artisan_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _revalidate(self, artisan_id: str):
+        if artisan_id in self._loading:
+            return
+        task = asyncio.create_task(self._compute(artisan_id))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception():
+            # The stale entry stays; the next request retries
+            print(f"⚠️ Background insights refresh failed: {task.exception()}")
+
+    def invalidate(self, artisan_id: str):
+        self._entries.pop(artisan_id, None)
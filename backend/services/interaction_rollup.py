@@ -0,0 +1,177 @@
+"""
+Interaction Rollup Module
+Hourly rollup of artisan_analytics.user_interactions that the dashboard
+insights read instead of raw events: one row per (artisan_id, product_id,
+date, hour, action_type, age_group, location_state, location_city) with the
+interaction count and an HLL sketch of distinct users, so distinct counts can
+be merged across any set of hours, products or demographics.
+
+A MERGE script keeps it current. It recomputes every hour since the last
+refresh (minus ROLLUP_LOOKBACK_HOURS for late events), so reruns are
+harmless. Run it hourly from cron / Cloud Scheduler; on a single-worker
+deployment the analytics router can run it instead every
+ROLLUP_REFRESH_INTERVAL seconds (off by default, since every API worker
+would run its own refresh):
+
+Refresh from backend/: python -m services.interaction_rollup [--backfill-days N]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from google.cloud import bigquery
+
+from services.bigquery_analytics import ROLLUP_TABLE, get_bigquery_client
+
+load_dotenv()
+
+# Seconds between in-process refreshes; opt-in (0 = only cron / the CLI refreshes)
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "0"))
+# Hours before the previous refresh that are recomputed, for late-arriving events
+ROLLUP_LOOKBACK_HOURS = int(os.getenv("ROLLUP_LOOKBACK_HOURS", "3"))
+
+_refresher = None
+
+
+def merge_script(project_id: str) -> str:
+    dataset = f"{project_id}.artisan_analytics"
+    return f"""
+        DECLARE window_start TIMESTAMP;
+
+        CREATE TABLE IF NOT EXISTS `{dataset}.{ROLLUP_TABLE}` (
+            artisan_id STRING,
+            product_id STRING,
+            date DATE,
+            hour INT64,
+            action_type STRING,
+            age_group STRING,
+            location_state STRING,
+            location_city STRING,
+            interactions INT64,
+            users_sketch BYTES,
+            refreshed_at TIMESTAMP
+        )
+        PARTITION BY date
+        CLUSTER BY artisan_id, product_id
+        OPTIONS (description = 'Hourly user_interactions rollup with HLL user sketches');
+
+        -- An empty rollup (or @backfill_days) recomputes everything in range
+        SET window_start = IF(
+            @backfill_days > 0,
+            TIMESTAMP_SUB(TIMESTAMP_TRUNC(CURRENT_TIMESTAMP(), HOUR), INTERVAL @backfill_days DAY),
+            TIMESTAMP_TRUNC(TIMESTAMP_SUB(
+                IFNULL((SELECT MAX(refreshed_at) FROM `{dataset}.{ROLLUP_TABLE}`), TIMESTAMP '2000-01-01'),
+                INTERVAL @lookback_hours HOUR), HOUR)
+        );
+
+        MERGE `{dataset}.{ROLLUP_TABLE}` t
+        USING (
+            SELECT
+                i.artisan_id,
+                i.product_id,
+                DATE(i.timestamp) as date,
+                EXTRACT(HOUR FROM i.timestamp) as hour,
+                i.action_type,
+                d.age_group,
+                d.location_state,
+                d.location_city,
+                COUNT(*) as interactions,
+                HLL_COUNT.INIT(i.user_id) as users_sketch
+            FROM `{dataset}.user_interactions` i
+            LEFT JOIN `{dataset}.user_demographics` d
+                ON i.user_id = d.user_id
+            WHERE i.timestamp >= window_start
+            GROUP BY artisan_id, product_id, date, hour, action_type, age_group, location_state, location_city
+        ) s
+        ON t.date >= DATE(window_start)
+            AND t.artisan_id IS NOT DISTINCT FROM s.artisan_id
+            AND t.product_id IS NOT DISTINCT FROM s.product_id
+            AND t.date = s.date
+            AND t.hour = s.hour
+            AND t.action_type IS NOT DISTINCT FROM s.action_type
+            AND t.age_group IS NOT DISTINCT FROM s.age_group
+            AND t.location_state IS NOT DISTINCT FROM s.location_state
+            AND t.location_city IS NOT DISTINCT FROM s.location_city
+        WHEN MATCHED THEN
+            UPDATE SET interactions = s.interactions, users_sketch = s.users_sketch,
+                refreshed_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (artisan_id, product_id, date, hour, action_type, age_group, location_state,
+                    location_city, interactions, users_sketch, refreshed_at)
+            VALUES (s.artisan_id, s.product_id, s.date, s.hour, s.action_type, s.age_group,
+                    s.location_state, s.location_city, s.interactions, s.users_sketch, CURRENT_TIMESTAMP())
+        -- Buckets in the window with no events left (deleted rows, changed demographics)
+        WHEN NOT MATCHED BY SOURCE
+            AND t.date >= DATE(window_start)
+            AND TIMESTAMP_ADD(TIMESTAMP(t.date), INTERVAL t.hour HOUR) >= window_start THEN
+            DELETE;
+        """
+
+
+def refresh_rollup(backfill_days: int = 0, lookback_hours: int = None) -> dict:
+    """Run the MERGE script once. Returns stats, or None without BigQuery."""
+    client = get_bigquery_client()
+    if not client:
+        return None
+
+    lookback_hours = ROLLUP_LOOKBACK_HOURS if lookback_hours is None else lookback_hours
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("backfill_days", "INT64", backfill_days),
+            bigquery.ScalarQueryParameter("lookback_hours", "INT64", lookback_hours),
+        ]
+    )
+    started = time.perf_counter()
+    job = client.query(merge_script(os.environ.get("GCLOUD_PROJECT")), job_config=job_config)
+    job.result()
+
+    # Script statements run as child jobs, newest first; the MERGE is the last statement
+    merge_job = next(iter(client.list_jobs(parent_job=job.job_id)), None)
+    stats = {
+        'rows_affected': merge_job.num_dml_affected_rows if merge_job else None,
+        'mb_processed': round((job.total_bytes_processed or 0) / 1e6, 2),
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+    print(f"📊 Interaction rollup refreshed: {stats}")
+    return stats
+
+
+async def _refresh_periodically(interval: float):
+    while True:
+        try:
+            await asyncio.to_thread(refresh_rollup)
+        except Exception as e:
+            print(f"⚠️ Interaction rollup refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_refresher():
+    global _refresher
+    if _refresher is None and ROLLUP_REFRESH_INTERVAL > 0 and get_bigquery_client():
+        _refresher = asyncio.create_task(_refresh_periodically(ROLLUP_REFRESH_INTERVAL))
+
+
+def stop_refresher():
+    global _refresher
+    if _refresher:
+        _refresher.cancel()
+        _refresher = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the hourly user_interactions rollup")
+    parser.add_argument("--backfill-days", type=int, default=0,
+                        help="recompute this many days instead of since the last refresh")
+    parser.add_argument("--lookback-hours", type=int, default=None,
+                        help=f"hours before the last refresh to recompute (default {ROLLUP_LOOKBACK_HOURS})")
+    args = parser.parse_args()
+
+    if refresh_rollup(args.backfill_days, args.lookback_hours) is None:
+        print("❌ BigQuery is not configured (GOOGLE_APPLICATION_CREDENTIALS / GCLOUD_PROJECT)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Paged Queries Module
+Cursor pagination for the artisan list views (catalog history, WhatsApp
+shares): field-projected Firestore queries ordered newest first, opaque page
+tokens, and a short-lived cache of first pages.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from firebase_admin import firestore
+from firebase_config import db
+
+LIST_PAGE_MAX = 50
+# First pages are served from memory this long (dashboard refresh storms)
+LIST_FIRST_PAGE_TTL = float(os.getenv("LIST_FIRST_PAGE_TTL", "15"))
+LIST_CACHE_MAX_ENTRIES = 512
+
+# Only what the list views show; message bodies, manifests etc. stay behind
+CATALOG_LIST_FIELDS = ('id', 'type', 'url', 'product_count', 'page_count', 'created_at')
+SHARE_LIST_FIELDS = (
+    'id', 'phone_number', 'catalog_url', 'status', 'error_code',
+    'created_at', 'delivered_at', 'read_at',
+)
+
+
+class InvalidPageToken(ValueError):
+    pass
+
+
+def encode_page_token(created_at, doc_id: str) -> str:
+    payload = json.dumps({'c': created_at.isoformat(), 'id': doc_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_token(token: str) -> tuple:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['c']), payload['id']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidPageToken("Invalid page token") from e
+
+
+def fetch_page(collection: str, artisan_id: str, fields: tuple, limit: int, page_token: str = None) -> dict:
+    """
+    One page of an artisan's documents, newest first. Ties on created_at are
+    broken by document ID, so pages never skip or repeat documents.
+    """
+    collection_ref = db.collection(collection)
+    query = collection_ref.where('artisan_id', '==', artisan_id)\
+        .order_by('created_at', direction=firestore.Query.DESCENDING)\
+        .order_by(firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING)\
+        .select(list(fields))
+    if page_token:
+        created_at, doc_id = decode_page_token(page_token)
+        query = query.start_after({'created_at': created_at, '__name__': collection_ref.document(doc_id)})
+
+    # One extra document tells whether there is a next page
+    docs = list(query.limit(limit + 1).stream())
+    page = docs[:limit]
+    items = []
+    for doc in page:
+        item = doc.to_dict() or {}
+        item.setdefault('id', doc.id)
+        items.append(item)
+
+    next_page_token = None
+    if len(docs) > limit and items[-1].get('created_at'):
+        next_page_token = encode_page_token(items[-1]['created_at'], page[-1].id)
+    return {'data': items, 'next_page_token': next_page_token}
+
+
+class FirstPageCache:
+    """
+    Caches first pages for LIST_FIRST_PAGE_TTL seconds. Concurrent misses for
+    the same key share one Firestore query. Keys start with (collection,
+    artisan_id); invalidate() may be called from any thread (publishing runs
+    in worker threads) and also keeps a query already in flight from caching
+    its now outdated page.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl or LIST_FIRST_PAGE_TTL
+        self.max_entries = max_entries or LIST_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()  # key -> (expires_at, page)
+        self._loading = {}             # key -> Future of the query in flight (event loop only)
+        self._generations = {}         # (collection, artisan_id) -> invalidation count
+        self._lock = threading.Lock()  # guards _entries and _generations
+
+    async def get(self, key: tuple, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations.get(key[:2], 0)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            page = await asyncio.to_thread(load)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved; waiters re-raise it
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+        future.set_result(page)
+        with self._lock:
+            if self._generations.get(key[:2], 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, page)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return page
+
+    def invalidate(self, collection: str, artisan_id: str):
+        with self._lock:
+            scope = (collection, artisan_id)
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            for key in [key for key in self._entries if key[:2] == scope]:
+                del self._entries[key]
+
+
+first_pages = FirstPageCache()
+
+
+async def list_artisan_docs(collection: str, artisan_id: str, fields: tuple, limit: int,
+                            page_token: str = None) -> dict:
+    limit = max(1, min(limit, LIST_PAGE_MAX))
+    if page_token:
+        return await asyncio.to_thread(fetch_page, collection, artisan_id, fields, limit, page_token)
+    return await first_pages.get(
+        (collection, artisan_id, limit),
+        lambda: fetch_page(collection, artisan_id, fields, limit)
+    )
@@ -0,0 +1,196 @@
+"""
+Bulk Catalog Regeneration
+Refreshes catalogs for every artisan (e.g. nightly), skipping artisans whose
+products are unchanged. Progress is checkpointed so an interrupted run resumes
+where it stopped.
+
+Run from backend/: python -m services.regenerate_catalogs [--type pdf image] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from firebase_admin import firestore
+from firebase_config import db
+from services.catalog_service import CatalogService
+from services.catalog_jobs import shutdown_render_pool
+
+CATALOG_REGEN_WORKERS = int(os.getenv("CATALOG_REGEN_WORKERS", "4"))
+CATALOG_REGEN_PAGE_SIZE = int(os.getenv("CATALOG_REGEN_PAGE_SIZE", "50"))
+DEFAULT_CHECKPOINT = os.path.join(tempfile.gettempdir(), "lokkala_catalog_regen.json")
+
+
+def load_checkpoint(path: str):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    """Atomic write so a crash mid-save never corrupts the checkpoint"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def fetch_artisan_page(cursor: str, page_size: int):
+    """One page of artisan users ordered by document ID, after cursor"""
+    users_ref = db.collection('users')
+    query = users_ref.where('type', '==', 'artisan')\
+        .order_by(firestore.FieldPath.document_id())\
+        .limit(page_size)
+    if cursor:
+        query = query.start_after({'__name__': users_ref.document(cursor)})
+    return list(query.stream())
+
+
+async def regenerate_artisan(artisan_id: str, catalog_types: list, force: bool) -> dict:
+    """Returns {catalog_type: 'regenerated' | 'unchanged' | 'failed'}"""
+    outcome = {}
+    for catalog_type in catalog_types:
+        try:
+            if catalog_type == 'pdf':
+                result = await CatalogService.generate_pdf_catalog(artisan_id, force=force)
+            else:
+                result = await CatalogService.generate_image_catalog(artisan_id, force=force)
+            outcome[catalog_type] = 'unchanged' if result.get('reused') else 'regenerated'
+        except Exception as e:
+            print(f"❌ {artisan_id} ({catalog_type}): {e}")
+            outcome[catalog_type] = 'failed'
+    return outcome
+
+
+async def run(catalog_types: list, workers: int, page_size: int, checkpoint_path: str,
+              reset: bool = False, force: bool = False, limit: int = None):
+    checkpoint = None if reset else load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get('types') != catalog_types:
+        print("⚠️ Checkpoint is for different catalog types, starting over")
+        checkpoint = None
+
+    if checkpoint:
+        print(f"⏯️ Resuming run from {checkpoint['started_at']} after artisan {checkpoint['cursor']}")
+    else:
+        checkpoint = {
+            'started_at': datetime.now().isoformat(),
+            'types': catalog_types,
+            'cursor': None,          # last artisan ID of the last finished page
+            'page_done': [],         # finished artisans of the page in progress
+            'failed': [],
+            'stats': {'artisans': 0, 'regenerated': 0, 'unchanged': 0, 'failed': 0, 'skipped': 0},
+        }
+    stats = checkpoint['stats']
+
+    semaphore = asyncio.Semaphore(workers)
+    started = time.perf_counter()
+    processed_this_run = 0
+    regenerated_this_run = 0
+
+    async def process(doc):
+        async with semaphore:
+            data = doc.to_dict() or {}
+            if not data.get('products'):
+                outcome = {'skipped': True}
+            else:
+                outcome = await regenerate_artisan(doc.id, catalog_types, force)
+            return doc.id, outcome
+
+    while True:
+        page = await asyncio.to_thread(fetch_artisan_page, checkpoint['cursor'], page_size)
+        if not page:
+            break
+
+        done_on_page = set(checkpoint['page_done'])
+        pending = [doc for doc in page if doc.id not in done_on_page]
+        if limit is not None:
+            pending = pending[:max(0, limit - processed_this_run)]
+
+        for future in asyncio.as_completed([process(doc) for doc in pending]):
+            artisan_id, outcome = await future
+            stats['artisans'] += 1
+            processed_this_run += 1
+            if outcome.get('skipped'):
+                stats['skipped'] += 1
+            for status in outcome.values():
+                if status in ('regenerated', 'unchanged', 'failed'):
+                    stats[status] += 1
+                    if status == 'regenerated':
+                        regenerated_this_run += 1
+            if 'failed' in outcome.values():
+                checkpoint['failed'].append(artisan_id)
+            checkpoint['page_done'].append(artisan_id)
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        if limit is not None and processed_this_run >= limit:
+            print(f"⏸️ Stopped after --limit {limit} artisans; rerun to resume")
+            break
+
+        checkpoint['cursor'] = page[-1].id
+        checkpoint['page_done'] = []
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed_min = (time.perf_counter() - started) / 60
+        print(f"📄 Page done: {stats['artisans']} artisans, {stats['regenerated']} regenerated, "
+              f"{stats['unchanged']} unchanged, {stats['failed']} failed "
+              f"({regenerated_this_run / elapsed_min if elapsed_min else 0:.1f} catalogs/min this run)")
+
+        if len(page) < page_size:
+            break
+
+    elapsed = time.perf_counter() - started
+    finished = limit is None or processed_this_run < limit
+
+    print("\n" + "="*60)
+    print(f"  Catalog regeneration {'complete' if finished else 'paused'}")
+    print("="*60)
+    print(f"   Artisans processed : {stats['artisans']} ({stats['skipped']} without products)")
+    print(f"   Regenerated        : {stats['regenerated']}")
+    print(f"   Unchanged (skipped): {stats['unchanged']}")
+    print(f"   Failed             : {stats['failed']}")
+    print(f"   This run           : {processed_this_run} artisans, {regenerated_this_run} catalogs "
+          f"regenerated in {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"   Throughput         : {regenerated_this_run * 60 / elapsed:.1f} catalogs/min regenerated, "
+              f"{processed_this_run * 60 / elapsed:.1f} artisans/min checked")
+    if checkpoint['failed']:
+        print(f"   Failed artisans    : {', '.join(checkpoint['failed'][:20])}")
+
+    if finished:
+        try:
+            os.remove(checkpoint_path)
+        except OSError:
+            pass
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate catalogs for all artisans")
+    parser.add_argument("--type", nargs="+", choices=["pdf", "image"], default=["pdf"], dest="types")
+    parser.add_argument("--workers", type=int, default=CATALOG_REGEN_WORKERS,
+                        help="artisans processed concurrently (rendering uses CATALOG_POOL_SIZE processes)")
+    parser.add_argument("--page-size", type=int, default=CATALOG_REGEN_PAGE_SIZE)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--force", action="store_true", help="regenerate even unchanged catalogs")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many artisans")
+    args = parser.parse_args()
+
+    print("🚀 Starting bulk catalog regeneration...\n")
+    try:
+        asyncio.run(run(
+            args.types, args.workers, args.page_size, args.checkpoint,
+            reset=args.reset, force=args.force, limit=args.limit
+        ))
+    finally:
+        shutdown_render_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Share Log Module
+Buffers WhatsApp share records, artisan share counters and delivery status
+updates in memory and writes them to Firestore in batches from a background
+thread
+"""
+
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from firebase_admin import firestore
+from firebase_config import db
+
+SHARE_LOG_FLUSH_SECONDS = float(os.getenv("SHARE_LOG_FLUSH_SECONDS", "2"))
+SHARE_LOG_MAX_BUFFER = int(os.getenv("SHARE_LOG_MAX_BUFFER", "200"))
+FIRESTORE_BATCH_LIMIT = 500  # writes per WriteBatch commit
+WRITTEN_STATUS_MEMORY = 20000  # recent SIDs whose written status rank is remembered
+
+# Twilio message statuses by progress; callbacks can arrive out of order and
+# a lower-ranked status never replaces a higher one
+STATUS_RANK = {
+    'accepted': 0, 'scheduled': 0, 'queued': 1, 'sending': 2, 'sent': 3,
+    'delivered': 4, 'read': 5, 'undelivered': 6, 'failed': 6, 'canceled': 6,
+}
+# Statuses whose first arrival time is kept as <status>_at
+TIMESTAMPED_STATUSES = ('sent', 'delivered', 'read', 'failed', 'undelivered')
+
+
+class ShareLogBuffer:
+    """
+    add() queues one whatsapp_shares document and counts the share against
+    its artisan. A flush writes all queued documents plus one
+    Increment(n) per artisan, in WriteBatches of up to 500 writes, so a
+    campaign of N messages costs roughly N/500 commits instead of 2N writes
+    and the artisan document is touched once per flush.
+
+    update_status() collapses delivery callbacks per message SID, keeping
+    the most advanced status, and writes them in the same flush after the
+    share records, so a buffered 'queued' record can't overwrite a newer
+    status. Statuses are update()s of existing share records: SIDs not
+    written by this process are looked up first (one get_all per flush)
+    and dropped if there is no record for them.
+
+    Flushes run every flush_seconds, as soon as max_buffer records are
+    queued, and on close() (registered with atexit and app shutdown). Records
+    from a failed flush are re-queued for the next one.
+    """
+
+    def __init__(self, flush_seconds: float = None, max_buffer: int = None):
+        self.flush_seconds = flush_seconds or SHARE_LOG_FLUSH_SECONDS
+        self.max_buffer = max_buffer or SHARE_LOG_MAX_BUFFER
+
+        self._shares = {}    # doc_id -> share data
+        self._counts = {}    # artisan_id -> shares since last flush
+        self._statuses = {}  # message_sid -> collapsed status fields
+        self._written_rank = OrderedDict()  # message_sid -> rank last written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def add(self, doc_id: str, share_data: dict):
+        with self._lock:
+            self._shares[doc_id] = share_data
+            artisan_id = share_data.get('artisan_id')
+            if artisan_id:
+                self._counts[artisan_id] = self._counts.get(artisan_id, 0) + 1
+            pending = len(self._shares) + len(self._statuses)
+
+        self._after_add(pending)
+
+    def _after_add(self, pending: int):
+        if self._closed:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= self.max_buffer:
+            self._wake.set()
+
+    @staticmethod
+    def _merge_status(current: dict, status: str, error_code: str, received_at: datetime) -> dict:
+        merged = dict(current or {})
+        if STATUS_RANK.get(status, -1) >= STATUS_RANK.get(merged.get('status'), -1):
+            merged['status'] = status
+            merged['status_updated_at'] = received_at
+        if status in TIMESTAMPED_STATUSES:
+            merged.setdefault(f"{status}_at", received_at)
+        if error_code:
+            merged['error_code'] = error_code
+        return merged
+
+    def update_status(self, message_sid: str, status: str, error_code: str = None):
+        """Record a delivery status callback; O(1), never touches Firestore"""
+        received_at = datetime.now(timezone.utc)
+        with self._lock:
+            self._statuses[message_sid] = self._merge_status(
+                self._statuses.get(message_sid), status, error_code, received_at
+            )
+            pending = len(self._shares) + len(self._statuses)
+
+        self._after_add(pending)
+
+    def flush(self) -> int:
+        """Write everything buffered; returns the number of writes committed"""
+        with self._flush_lock:
+            with self._lock:
+                shares, self._shares = self._shares, {}
+                counts, self._counts = self._counts, {}
+                statuses, self._statuses = self._statuses, {}
+            if not shares and not counts and not statuses:
+                return 0
+
+            for sid, fields in list(statuses.items()):
+                if sid in shares:
+                    # Status arrived before its share record was written
+                    share = dict(shares[sid])
+                    if STATUS_RANK.get(fields['status'], -1) < STATUS_RANK.get(share.get('status'), -1):
+                        fields = {k: v for k, v in fields.items() if k not in ('status', 'status_updated_at')}
+                    share.update(fields)
+                    shares[sid] = share
+                    statuses.pop(sid)
+                elif STATUS_RANK.get(fields['status'], -1) < self._written_rank.get(sid, -1):
+                    # Late callback for a status already superseded in Firestore
+                    fields = {k: v for k, v in fields.items() if k not in ('status', 'status_updated_at')}
+                    if fields:
+                        statuses[sid] = fields
+                    else:
+                        statuses.pop(sid)
+
+            try:
+                statuses = self._drop_unknown(statuses)
+            except Exception as e:
+                print(f"❌ Share log status lookup failed, will retry {len(statuses)} statuses: {e}")
+                with self._lock:
+                    for sid, fields in statuses.items():
+                        self._statuses.setdefault(sid, fields)
+                statuses = {}
+
+            writes = [
+                ('share', doc_id, db.collection('whatsapp_shares').document(doc_id), data)
+                for doc_id, data in shares.items()
+            ]
+            # Update artisan analytics: one collapsed increment per artisan
+            writes += [
+                ('count', artisan_id, db.collection('users').document(artisan_id), {
+                    'whatsapp_shares_count': firestore.Increment(count),
+                    'last_shared_at': firestore.SERVER_TIMESTAMP
+                })
+                for artisan_id, count in counts.items()
+            ]
+            # Delivery statuses last, after any share record they apply to
+            writes += [
+                ('status', sid, db.collection('whatsapp_shares').document(sid), fields)
+                for sid, fields in statuses.items()
+            ]
+
+            committed = 0
+            try:
+                for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+                    chunk = writes[start:start + FIRESTORE_BATCH_LIMIT]
+                    batch = db.batch()
+                    for kind, _, ref, data in chunk:
+                        if kind == 'status':
+                            batch.update(ref, data)
+                        else:
+                            batch.set(ref, data, merge=True)
+                    batch.commit()
+                    committed += len(chunk)
+                    self._remember_ranks(chunk)
+            except Exception as e:
+                print(f"❌ Share log flush failed, will retry {len(writes) - committed} writes: {e}")
+                with self._lock:
+                    for kind, key, _, _ in writes[committed:]:
+                        if kind == 'share':
+                            self._shares.setdefault(key, shares[key])
+                        elif kind == 'status':
+                            self._statuses.setdefault(key, statuses[key])
+                            # Check it still exists before retrying the update
+                            self._written_rank.pop(key, None)
+                        else:
+                            self._counts[key] = self._counts.get(key, 0) + counts[key]
+
+            print(f"🗂️ Share log: {committed} writes in {(committed + FIRESTORE_BATCH_LIMIT - 1) // FIRESTORE_BATCH_LIMIT} batches "
+                  f"({len(shares)} shares, {len(counts)} artisans, {len(statuses)} statuses)")
+            return committed
+
+    def _drop_unknown(self, statuses: dict) -> dict:
+        """Statuses whose whatsapp_shares record exists"""
+        unchecked = [sid for sid in statuses if sid not in self._written_rank]
+        if not unchecked:
+            return statuses
+        refs = [db.collection('whatsapp_shares').document(sid) for sid in unchecked]
+        existing = {snapshot.id for snapshot in db.get_all(refs, field_paths=[]) if snapshot.exists}
+        unknown = set(unchecked) - existing
+        if unknown:
+            print(f"⚠️ Share log: dropped statuses for {len(unknown)} unknown messages")
+        for sid in existing:
+            self._written_rank.setdefault(sid, -1)
+        return {sid: fields for sid, fields in statuses.items() if sid not in unknown}
+
+    def _remember_ranks(self, chunk: list):
+        for kind, key, _, data in chunk:
+            if kind != 'count' and 'status' in data:
+                self._written_rank[key] = STATUS_RANK.get(data['status'], -1)
+                self._written_rank.move_to_end(key)
+        while len(self._written_rank) > WRITTEN_STATUS_MEMORY:
+            self._written_rank.popitem(last=False)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._shares) + len(self._statuses)
+
+    def close(self):
+        """Stop the flusher and write out whatever is left"""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+
+share_log = ShareLogBuffer()
+atexit.register(share_log.close)
@@ -0,0 +1,178 @@
+"""
+TTS Cache Module
+Content-addressed on-disk store for synthesized speech, with LRU eviction
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+# (text, lang_code) -> MP3 bytes
+Synthesizer = Callable[[str, str], bytes]
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "lokkala_tts_cache")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# Older temp files were left by a crashed write, not one still in progress
+STALE_PART_SECONDS = 3600
+
+
+class TTSCache:
+    """
+    Caches synthesized audio under sha256(lang_code, text).
+
+    Files live at <cache_dir>/<key[:2]>/<key>.mp3. Recency is tracked in
+    memory (seeded from file mtimes on startup) and the least recently used
+    files are deleted once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, cache_dir: str = None, max_bytes: int = None):
+        self.synthesizer = synthesizer
+        self.cache_dir = cache_dir or os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.getenv("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> (lock, waiters)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def cache_key(text: str, lang_code: str) -> str:
+        return hashlib.sha256(f"{lang_code}\0{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def _load_index(self):
+        """Rebuild the LRU order from files already on disk"""
+        found = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    if name.endswith(".part") and now - stat.st_mtime > STALE_PART_SECONDS:
+                        os.remove(path)
+                except OSError:
+                    continue
+                if name.endswith(".mp3"):
+                    found.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        if found:
+            print(f"🔊 TTS cache: {len(found)} files, {self._total_bytes / 1024 / 1024:.1f} MB")
+        self._evict()
+
+    def _touch(self, key: str):
+        self._entries.move_to_end(key)
+        try:
+            os.utime(self.path_for(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Delete least recently used files until under max_bytes (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def lookup(self, text: str, lang_code: str):
+        """Return the cached file path or None, marking it recently used"""
+        key = self.cache_key(text, lang_code)
+        with self._lock:
+            if key in self._entries and os.path.exists(self.path_for(key)):
+                self._touch(key)
+                return self.path_for(key)
+            if key in self._entries:
+                # File removed behind our back
+                self._total_bytes -= self._entries.pop(key)
+        return None
+
+    def get_or_synthesize(self, text: str, lang_code: str):
+        """
+        Return (path, cache_hit). Concurrent requests for the same phrase
+        wait for a single synthesis instead of each calling the backend.
+        """
+        path = self.lookup(text, lang_code)
+        if path:
+            return path, True
+
+        key = self.cache_key(text, lang_code)
+        key_lock = self._hold_key_lock(key)
+        try:
+            with key_lock:
+                path = self.lookup(text, lang_code)
+                if path:
+                    return path, True
+
+                audio = self.synthesizer(text, lang_code)
+                if not audio:
+                    raise ValueError("Speech synthesis returned no audio")
+
+                path = self.path_for(key)
+                self._write_file(path, audio)
+
+                with self._lock:
+                    self._entries[key] = len(audio)
+                    self._total_bytes += len(audio)
+                    self._evict()
+        finally:
+            # Also on failure, or the per-phrase lock would stay forever
+            self._release_key_lock(key)
+
+        return path, False
+
+    def _hold_key_lock(self, key: str) -> threading.Lock:
+        """Per-phrase lock, shared by everyone waiting on the same key"""
+        with self._lock:
+            key_lock, waiters = self._key_locks.get(key, (None, 0))
+            key_lock = key_lock or threading.Lock()
+            self._key_locks[key] = (key_lock, waiters + 1)
+            return key_lock
+
+    def _release_key_lock(self, key: str):
+        """Drop the lock only once its last waiter is done with it"""
+        with self._lock:
+            key_lock, waiters = self._key_locks[key]
+            if waiters > 1:
+                self._key_locks[key] = (key_lock, waiters - 1)
+            else:
+                del self._key_locks[key]
+
+    @staticmethod
+    def _write_file(path: str, audio: bytes):
+        """Write via a unique temp file so readers never see a partial MP3"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
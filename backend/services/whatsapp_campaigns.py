@@ -0,0 +1,545 @@
+"""
+WhatsApp Campaigns Module
+Persistent bulk sends. A campaign's recipient list, cursor and per-recipient
+send records live in Firestore (or local JSON files), so a campaign survives
+worker restarts and client timeouts and never messages the same number twice.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from firebase_admin import firestore
+from firebase_config import db
+from services.whatsapp_service import WhatsAppService
+
+# 'firestore' or 'local' (JSON files in WHATSAPP_CAMPAIGN_DIR, single host only)
+WHATSAPP_CAMPAIGN_STORE = os.getenv("WHATSAPP_CAMPAIGN_STORE", "firestore").lower()
+WHATSAPP_CAMPAIGN_DIR = os.getenv("WHATSAPP_CAMPAIGN_DIR") or os.path.join(
+    tempfile.gettempdir(), "lokkala_campaigns"
+)
+FIRESTORE_BATCH_LIMIT = 500
+# Recipients sent between checkpoints (one checkpoint = one transaction, so
+# the window's send records plus the campaign must fit in its 500 writes)
+CAMPAIGN_CHECKPOINT_EVERY = min(int(os.getenv("CAMPAIGN_CHECKPOINT_EVERY", "50")), FIRESTORE_BATCH_LIMIT - 1)
+# A worker that stops renewing its lease for this long is presumed dead
+CAMPAIGN_LEASE_SECONDS = int(os.getenv("CAMPAIGN_LEASE_SECONDS", "300"))
+CAMPAIGN_RESUME_INTERVAL = int(os.getenv("CAMPAIGN_RESUME_INTERVAL", "60"))
+RECIPIENT_CHUNK_SIZE = 1000  # phone numbers per Firestore recipients document
+
+ACTIVE_STATUSES = ('running', 'paused')
+
+
+def idempotency_key(campaign_id: str, phone_number: str) -> str:
+    """Send record ID for one (campaign, phone) pair"""
+    return hashlib.sha1(f"{campaign_id}:{phone_number}".encode("utf-8")).hexdigest()
+
+
+def lease_is_free(campaign: dict, owner: str, now: float) -> bool:
+    return (
+        not campaign.get('lease_owner')
+        or campaign['lease_owner'] == owner
+        or campaign.get('lease_expires', 0) < now
+    )
+
+
+class FirestoreCampaignStore:
+    """
+    whatsapp_campaigns/{id}                 campaign, cursor, counts, lease
+    whatsapp_campaigns/{id}/recipients/{n}  up to RECIPIENT_CHUNK_SIZE phones
+    whatsapp_campaigns/{id}/sends/{key}     one record per (campaign, phone)
+    """
+
+    @staticmethod
+    def _ref(campaign_id: str):
+        return db.collection('whatsapp_campaigns').document(campaign_id)
+
+    @staticmethod
+    def _commit(writes: list):
+        for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for ref, data in writes[start:start + FIRESTORE_BATCH_LIMIT]:
+                if data is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, data, merge=True)
+            batch.commit()
+
+    def create(self, campaign: dict, phone_numbers: list):
+        ref = self._ref(campaign['id'])
+        writes = [
+            (ref.collection('recipients').document(f"{index:05d}"),
+             {'phones': phone_numbers[start:start + RECIPIENT_CHUNK_SIZE]})
+            for index, start in enumerate(range(0, len(phone_numbers), RECIPIENT_CHUNK_SIZE))
+        ]
+        # Campaign document last: it only becomes visible with all recipients
+        self._commit(writes + [(ref, campaign)])
+
+    def get(self, campaign_id: str):
+        doc = self._ref(campaign_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def find_running(self) -> list:
+        docs = db.collection('whatsapp_campaigns').where('status', '==', 'running').stream()
+        return [doc.to_dict() for doc in docs]
+
+    def load_recipients(self, campaign_id: str, start: int, count: int) -> list:
+        first = start // RECIPIENT_CHUNK_SIZE
+        last = (start + count - 1) // RECIPIENT_CHUNK_SIZE
+        recipients = self._ref(campaign_id).collection('recipients')
+        refs = [recipients.document(f"{index:05d}") for index in range(first, last + 1)]
+        chunks = {doc.id: (doc.to_dict() or {}).get('phones', []) for doc in db.get_all(refs)}
+        phones = []
+        for index in range(first, last + 1):
+            phones += chunks.get(f"{index:05d}", [])
+        offset = start - first * RECIPIENT_CHUNK_SIZE
+        return phones[offset:offset + count]
+
+    def get_sends(self, campaign_id: str, keys: list) -> dict:
+        if not keys:
+            return {}
+        sends = self._ref(campaign_id).collection('sends')
+        docs = db.get_all([sends.document(key) for key in keys])
+        return {doc.id: doc.to_dict() for doc in docs if doc.exists}
+
+    def write(self, campaign_id: str, updates: dict, sends: dict = None):
+        """Campaign fields and send records (None deletes) in one batch"""
+        ref = self._ref(campaign_id)
+        writes = [(ref.collection('sends').document(key), record) for key, record in (sends or {}).items()]
+        self._commit(writes + [(ref, updates)])
+
+    def acquire_lease(self, campaign_id: str, owner: str, seconds: int) -> bool:
+        ref = self._ref(campaign_id)
+
+        @firestore.transactional
+        def acquire(transaction):
+            doc = ref.get(transaction=transaction)
+            campaign = doc.to_dict() if doc.exists else None
+            now = time.time()
+            if not campaign or campaign.get('status') != 'running' or not lease_is_free(campaign, owner, now):
+                return False
+            transaction.update(ref, {'lease_owner': owner, 'lease_expires': now + seconds})
+            return True
+
+        return acquire(db.transaction())
+
+    def renew_lease(self, campaign_id: str, owner: str, seconds: int,
+                    updates: dict = None, sends: dict = None, expect_status: str = None) -> bool:
+        """
+        Extend the lease and apply campaign updates and send records (None
+        deletes) in one transaction, only while owner still holds the lease
+        and, if expect_status is given, the stored status still matches it
+        """
+        ref = self._ref(campaign_id)
+
+        @firestore.transactional
+        def renew(transaction):
+            doc = ref.get(field_paths=['lease_owner', 'status'], transaction=transaction)
+            if not doc.exists:
+                return False
+            stored = doc.to_dict() or {}
+            if stored.get('lease_owner') != owner:
+                return False
+            if expect_status and stored.get('status') != expect_status:
+                return False
+            for key, record in (sends or {}).items():
+                send_ref = ref.collection('sends').document(key)
+                if record is None:
+                    transaction.delete(send_ref)
+                else:
+                    transaction.set(send_ref, record, merge=True)
+            transaction.update(ref, {**(updates or {}), 'lease_expires': time.time() + seconds})
+            return True
+
+        return renew(db.transaction())
+
+    def release_lease(self, campaign_id: str, owner: str) -> bool:
+        ref = self._ref(campaign_id)
+
+        @firestore.transactional
+        def release(transaction):
+            doc = ref.get(field_paths=['lease_owner'], transaction=transaction)
+            if not doc.exists or (doc.to_dict() or {}).get('lease_owner') != owner:
+                return False
+            transaction.update(ref, {'lease_owner': None, 'lease_expires': 0})
+            return True
+
+        return release(db.transaction())
+
+
+class LocalCampaignStore:
+    """One JSON file per campaign holding the campaign, recipients and send records"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or WHATSAPP_CAMPAIGN_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, campaign_id: str) -> str:
+        return os.path.join(self.directory, f"{campaign_id}.json")
+
+    def _load(self, campaign_id: str):
+        try:
+            with open(self._path(campaign_id), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, campaign_id: str, state: dict):
+        """Atomic write so a crash mid-save never corrupts the campaign"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self._path(campaign_id))
+
+    def create(self, campaign: dict, phone_numbers: list):
+        with self._lock:
+            self._save(campaign['id'], {'campaign': campaign, 'recipients': phone_numbers, 'sends': {}})
+
+    def get(self, campaign_id: str):
+        with self._lock:
+            state = self._load(campaign_id)
+        return state['campaign'] if state else None
+
+    def find_running(self) -> list:
+        running = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                campaign = self.get(name[:-len(".json")])
+                if campaign and campaign.get('status') == 'running':
+                    running.append(campaign)
+        return running
+
+    def load_recipients(self, campaign_id: str, start: int, count: int) -> list:
+        with self._lock:
+            state = self._load(campaign_id)
+        return state['recipients'][start:start + count] if state else []
+
+    def get_sends(self, campaign_id: str, keys: list) -> dict:
+        with self._lock:
+            state = self._load(campaign_id)
+        sends = state['sends'] if state else {}
+        return {key: sends[key] for key in keys if key in sends}
+
+    def write(self, campaign_id: str, updates: dict, sends: dict = None):
+        with self._lock:
+            state = self._load(campaign_id)
+            if state is None:
+                return
+            state['campaign'].update(updates)
+            for key, record in (sends or {}).items():
+                if record is None:
+                    state['sends'].pop(key, None)
+                else:
+                    state['sends'][key] = {**state['sends'].get(key, {}), **record}
+            self._save(campaign_id, state)
+
+    def acquire_lease(self, campaign_id: str, owner: str, seconds: int) -> bool:
+        with self._lock:
+            state = self._load(campaign_id)
+            now = time.time()
+            if not state or state['campaign'].get('status') != 'running' \
+                    or not lease_is_free(state['campaign'], owner, now):
+                return False
+            state['campaign'].update({'lease_owner': owner, 'lease_expires': now + seconds})
+            self._save(campaign_id, state)
+            return True
+
+    def renew_lease(self, campaign_id: str, owner: str, seconds: int,
+                    updates: dict = None, sends: dict = None, expect_status: str = None) -> bool:
+        with self._lock:
+            state = self._load(campaign_id)
+            if not state or state['campaign'].get('lease_owner') != owner:
+                return False
+            if expect_status and state['campaign'].get('status') != expect_status:
+                return False
+            state['campaign'].update({**(updates or {}), 'lease_expires': time.time() + seconds})
+            for key, record in (sends or {}).items():
+                if record is None:
+                    state['sends'].pop(key, None)
+                else:
+                    state['sends'][key] = {**state['sends'].get(key, {}), **record}
+            self._save(campaign_id, state)
+            return True
+
+    def release_lease(self, campaign_id: str, owner: str) -> bool:
+        with self._lock:
+            state = self._load(campaign_id)
+            if not state or state['campaign'].get('lease_owner') != owner:
+                return False
+            state['campaign'].update({'lease_owner': None, 'lease_expires': 0})
+            self._save(campaign_id, state)
+            return True
+
+
+def get_campaign_store():
+    if WHATSAPP_CAMPAIGN_STORE == "local":
+        return LocalCampaignStore()
+    return FirestoreCampaignStore()
+
+
+class CampaignManager:
+    """
+    Runs campaigns in this worker. Recipients are processed in windows of
+    CAMPAIGN_CHECKPOINT_EVERY: the window's send records are claimed
+    ('sending') before any message goes out, then results, counts and the
+    advanced cursor are written in one transaction. Records already 'sent' or
+    'failed' are never sent again. A 'sending' record left by a crashed
+    worker is checked against Twilio's message log before resending.
+
+    A campaign is run by at most one worker at a time. Claims and checkpoints
+    are written with renew_lease, which only commits while this worker still
+    holds the lease; a worker that finds its lease taken stops at once and
+    leaves the window to the new owner. Running campaigns are picked up at
+    startup and every CAMPAIGN_RESUME_INTERVAL once their lease is free.
+    """
+
+    def __init__(self, whatsapp_service: WhatsAppService, store=None):
+        self.whatsapp = whatsapp_service
+        self.store = store or get_campaign_store()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._running = {}   # campaign_id -> (task, stop event)
+        self._sweeper = None
+
+    @staticmethod
+    def progress(campaign: dict) -> dict:
+        total = campaign.get('total', 0)
+        return {
+            'campaign_id': campaign['id'],
+            'artisan_id': campaign.get('artisan_id'),
+            'catalog_url': campaign.get('catalog_url'),
+            'status': campaign.get('status'),
+            'total': total,
+            'processed': campaign.get('cursor', 0),
+            'sent': campaign.get('sent', 0),
+            'failed': campaign.get('failed', 0),
+            'unconfirmed': campaign.get('unconfirmed', 0),
+            'duplicates_removed': campaign.get('duplicates_removed', 0),
+            'percent': round(100 * campaign.get('cursor', 0) / total, 1) if total else 100.0,
+            'created_at': campaign.get('created_at'),
+            'updated_at': campaign.get('updated_at'),
+            'completed_at': campaign.get('completed_at'),
+        }
+
+    async def create(self, artisan_id: str, phone_numbers: list, catalog_url: str,
+                     custom_message: str = None) -> dict:
+        body = self.whatsapp.prepare_message(artisan_id, custom_message)
+
+        # Same number written two ways is still one recipient
+        phones = list(dict.fromkeys(WhatsAppService.format_phone(phone) for phone in phone_numbers))
+        now = datetime.now().isoformat()
+        campaign = {
+            'id': uuid.uuid4().hex,
+            'artisan_id': artisan_id,
+            'catalog_url': catalog_url,
+            'body': body,
+            'status': 'running',
+            'total': len(phones),
+            'duplicates_removed': len(phone_numbers) - len(phones),
+            'cursor': 0,             # recipients before this index are settled
+            'sent': 0,
+            'failed': 0,
+            'unconfirmed': 0,
+            'created_at': now,
+            'updated_at': now,
+            'completed_at': None,
+            'lease_owner': None,
+            'lease_expires': 0,
+        }
+        await asyncio.to_thread(self.store.create, campaign, phones)
+        print(f"📣 Campaign {campaign['id']}: {len(phones)} recipients for artisan {artisan_id}")
+        self.start(campaign['id'])
+        return self.progress(campaign)
+
+    async def get(self, campaign_id: str):
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        progress = self.progress(campaign)
+        progress['running_here'] = self.is_running(campaign_id)
+        return progress
+
+    def is_running(self, campaign_id: str) -> bool:
+        running = self._running.get(campaign_id)
+        return running is not None and not running[0].done()
+
+    def start(self, campaign_id: str) -> bool:
+        if self.is_running(campaign_id):
+            return False
+        stop = asyncio.Event()
+        task = asyncio.create_task(self._run(campaign_id, stop))
+        self._running[campaign_id] = (task, stop)
+        task.add_done_callback(lambda _: self._forget(campaign_id, task))
+        return True
+
+    def _forget(self, campaign_id: str, task):
+        if self._running.get(campaign_id, (None,))[0] is task:
+            self._running.pop(campaign_id, None)
+
+    async def set_status(self, campaign_id: str, status: str):
+        """Pause, cancel or resume. Other workers see the new status at their next window."""
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        if campaign['status'] not in ACTIVE_STATUSES:
+            raise ValueError(f"Campaign is already {campaign['status']}")
+        if status == 'running' and campaign['status'] != 'paused':
+            raise ValueError("Only paused campaigns can be resumed")
+
+        await asyncio.to_thread(self.store.write, campaign_id, {
+            'status': status,
+            'updated_at': datetime.now().isoformat(),
+        })
+        if status == 'running':
+            self.start(campaign_id)
+        elif campaign_id in self._running:
+            self._running[campaign_id][1].set()
+        return await self.get(campaign_id)
+
+    async def _settle_unconfirmed(self, record: dict):
+        """A previous worker died mid-send: did the message go out?"""
+        try:
+            return await self.whatsapp.find_sent_message(record['phone'], record['claimed_at']), True
+        except Exception as e:
+            print(f"⚠️ Could not check Twilio for {record['phone']}: {e}")
+            return None, False
+
+    async def _renew(self, campaign_id: str, updates: dict, sends: dict = None,
+                     expect_status: str = None) -> bool:
+        """
+        Write under the lease; False (nothing written) if another worker took
+        it or the stored status is no longer expect_status
+        """
+        renewed = await asyncio.to_thread(
+            self.store.renew_lease, campaign_id, self.worker_id, CAMPAIGN_LEASE_SECONDS,
+            updates, sends, expect_status
+        )
+        if not renewed:
+            print(f"⚠️ Campaign {campaign_id}: lease taken or status changed, stopping here")
+        return renewed
+
+    async def _run(self, campaign_id: str, stop: asyncio.Event):
+        acquired = await asyncio.to_thread(
+            self.store.acquire_lease, campaign_id, self.worker_id, CAMPAIGN_LEASE_SECONDS
+        )
+        if not acquired:
+            return
+
+        try:
+            while not stop.is_set():
+                # Re-read every window: pause/cancel may come from another worker
+                campaign = await asyncio.to_thread(self.store.get, campaign_id)
+                if campaign is None or campaign['status'] != 'running':
+                    break
+                start = campaign['cursor']
+                if start >= campaign['total']:
+                    now = datetime.now().isoformat()
+                    # A pause/cancel landing after the re-read above must win
+                    if await self._renew(campaign_id, {
+                        'status': 'completed', 'completed_at': now, 'updated_at': now
+                    }, expect_status='running'):
+                        print(f"✅ Campaign {campaign_id} completed: {campaign['sent']} sent, {campaign['failed']} failed")
+                    break
+
+                window = await asyncio.to_thread(
+                    self.store.load_recipients, campaign_id, start, CAMPAIGN_CHECKPOINT_EVERY
+                )
+                if not window:
+                    break
+                keys = {phone: idempotency_key(campaign_id, phone) for phone in window}
+                existing = await asyncio.to_thread(self.store.get_sends, campaign_id, list(keys.values()))
+
+                sends = {}
+                counts = {'sent': 0, 'failed': 0, 'unconfirmed': 0}
+                to_send = []
+                for phone in window:
+                    record = existing.get(keys[phone])
+                    if record is None:
+                        to_send.append(phone)
+                    elif record.get('status') == 'sending':
+                        message_sid, checked = await self._settle_unconfirmed(record)
+                        if message_sid:
+                            sends[keys[phone]] = {'status': 'sent', 'message_sid': message_sid}
+                            counts['sent'] += 1
+                        elif checked:
+                            to_send.append(phone)
+                        else:
+                            # Unknown outcome: never risk a duplicate message
+                            sends[keys[phone]] = {'status': 'unconfirmed'}
+                            counts['unconfirmed'] += 1
+
+                claimed_at = time.time()
+                if to_send and not await self._renew(campaign_id, {}, {
+                    keys[phone]: {'phone': phone, 'status': 'sending', 'claimed_at': claimed_at}
+                    for phone in to_send
+                }):
+                    break
+
+                async for result in self.whatsapp.send_bulk_stream(
+                    campaign['artisan_id'], to_send, campaign['catalog_url'], campaign['body'], stop
+                ):
+                    key = keys[result['phone']]
+                    if result['success']:
+                        sends[key] = {'status': 'sent', 'message_sid': result['message_sid']}
+                        counts['sent'] += 1
+                    elif result.get('cancelled'):
+                        sends[key] = None  # not sent; release the claim
+                    else:
+                        sends[key] = {'status': 'failed', 'error': result.get('error')}
+                        counts['failed'] += 1
+
+                updates = {name: campaign[name] + count for name, count in counts.items()}
+                if not any(record is None for record in sends.values()):
+                    updates['cursor'] = start + len(window)
+                updates['updated_at'] = datetime.now().isoformat()
+                if not await self._renew(campaign_id, updates, sends):
+                    break
+
+                print(f"📣 Campaign {campaign_id}: {updates.get('cursor', start)}/{campaign['total']} "
+                      f"({updates['sent']} sent, {updates['failed']} failed)")
+        except Exception as e:
+            print(f"❌ Campaign {campaign_id} stopped: {e}")
+        finally:
+            try:
+                await asyncio.to_thread(self.store.release_lease, campaign_id, self.worker_id)
+            except Exception as e:
+                print(f"⚠️ Could not release campaign {campaign_id}: {e}")
+
+    async def resume_running(self):
+        """Pick up running campaigns whose worker stopped (restart, crash, scale-down)"""
+        try:
+            campaigns = await asyncio.to_thread(self.store.find_running)
+        except Exception as e:
+            print(f"⚠️ Could not look up running campaigns: {e}")
+            return
+        now = time.time()
+        for campaign in campaigns:
+            if not self.is_running(campaign['id']) and lease_is_free(campaign, self.worker_id, now):
+                print(f"⏯️ Resuming campaign {campaign['id']} at {campaign.get('cursor', 0)}/{campaign.get('total', 0)}")
+                self.start(campaign['id'])
+
+    async def _sweep(self):
+        while True:
+            await self.resume_running()
+            await asyncio.sleep(CAMPAIGN_RESUME_INTERVAL)
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def shutdown(self, timeout: float = 10):
+        """Stop after the current message; campaigns stay 'running' for the next worker"""
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        running = list(self._running.values())
+        for _, stop in running:
+            stop.set()
+        if running:
+            await asyncio.wait([task for task, _ in running], timeout=timeout)
@@ -1,13 +1,72 @@
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from twilio.request_validator import RequestValidator
 from firebase_admin import firestore
-from firebase_config import db
+from services.artisan_cache import artisan_cache
+from services.share_log import share_log
+import asyncio
 import os
-from datetime import datetime
+import time
+import uuid
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Bulk sending: messages per second allowed for the sender (Twilio tier) and
+# how many Twilio requests may be in flight at once
+TWILIO_SEND_RATE = float(os.getenv("TWILIO_SEND_RATE", "10"))
+TWILIO_SEND_BURST = int(os.getenv("TWILIO_SEND_BURST", "10"))
+WHATSAPP_BULK_CONCURRENCY = int(os.getenv("WHATSAPP_BULK_CONCURRENCY", "8"))
+
+# Public URL of POST /api/catalog/whatsapp/status; when set, Twilio reports
+# delivery/read events there and callbacks are signature-checked against it
+TWILIO_STATUS_CALLBACK_URL = os.getenv("TWILIO_STATUS_CALLBACK_URL")
+
+# One keep-alive Twilio client per credential pair, shared by all services
+_twilio_clients = {}
+
+
+def get_twilio_client(account_sid: str, auth_token: str) -> Client:
+    key = (account_sid, auth_token)
+    if key not in _twilio_clients:
+        http_client = TwilioHttpClient(pool_connections=True, timeout=30, max_retries=2)
+        _twilio_clients[key] = Client(account_sid, auth_token, http_client=http_client)
+    return _twilio_clients[key]
+
+
+class TokenBucket:
+    """Async token bucket: acquire() waits until a send is allowed"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Shared by every bulk send, since the limit applies to the sender number
+send_bucket = TokenBucket(TWILIO_SEND_RATE, TWILIO_SEND_BURST)
+
+
 class WhatsAppService:
     
     def __init__(self):
@@ -20,6 +79,9 @@ class WhatsAppService:
         if self.whatsapp_number.startswith('whatsapp:'):
             self.whatsapp_number = self.whatsapp_number.replace('whatsapp:', '')
         
+        # Running bulk sends: job_id -> cancel event
+        self.bulk_jobs = {}
+        
         # Debug output
         print(f"🔍 Loading Twilio credentials...")
         print(f"   Account SID: {self.account_sid[:10] if self.account_sid else 'NOT SET'}...")
@@ -31,7 +93,7 @@ class WhatsAppService:
             self.client = None
         else:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = get_twilio_client(self.account_sid, self.auth_token)
                 print("✅ Twilio WhatsApp client initialized")
                 
                 # Test the number format
@@ -40,107 +102,184 @@ class WhatsAppService:
                 print(f"❌ Error initializing Twilio client: {e}")
                 self.client = None
     
+    @staticmethod
+    def format_phone(phone_number: str) -> str:
+        # Remove any 'whatsapp:' prefix if present
+        if phone_number.startswith('whatsapp:'):
+            phone_number = phone_number.replace('whatsapp:', '')
+        
+        # Format phone number - ensure it has country code
+        if not phone_number.startswith('+'):
+            phone_number = '+91' + phone_number.lstrip('0')
+        return phone_number
+    
+    @staticmethod
+    def default_message(artisan_name: str) -> str:
+        return (
+            f"🛍️ *{artisan_name}* Product Catalog\n\n"
+            f"Check out our latest products!\n"
+            f"Browse the catalog and place your order.\n\n"
+            f"📱 For orders, reply to this message."
+        )
+    
+    def prepare_message(self, artisan_id: str, custom_message: str = None) -> str:
+        """Validate the sender and artisan; returns the message body"""
+        if not self.client:
+            raise ValueError("Twilio client not initialized. Check your .env credentials.")
+        
+        # Get artisan profile (cached; bulk sends read it once)
+        artisan_data = artisan_cache.get(artisan_id)
+        
+        if artisan_data is None:
+            raise ValueError(f"Artisan not found with ID: {artisan_id}")
+        
+        artisan_name = artisan_data.get('name', 'Our Artisan')
+        return custom_message or WhatsAppService.default_message(artisan_name)
+    
+    def log_share(self, artisan_id: str, phone_number: str, catalog_url: str, message, body: str) -> str:
+        """
+        Queue the whatsapp_shares record and the artisan's share count; both
+        are written in batches by services.share_log. The message SID is the
+        document ID so later status updates can address it directly.
+        """
+        share_data = {
+            'id': message.sid,
+            'artisan_id': artisan_id,
+            'phone_number': phone_number,
+            'catalog_url': catalog_url,
+            'message_sid': message.sid,
+            'status': message.status,
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'message_sent': body
+        }
+        share_log.add(message.sid, share_data)
+        return message.sid
+    
+    async def deliver(self, artisan_id: str, phone_number: str, catalog_url: str, body: str) -> dict:
+        """Send one message and log it; the blocking Twilio call runs in a thread"""
+        phone_number = WhatsAppService.format_phone(phone_number)
+        
+        options = {'status_callback': TWILIO_STATUS_CALLBACK_URL} if TWILIO_STATUS_CALLBACK_URL else {}
+        message = await asyncio.to_thread(
+            self.client.messages.create,
+            from_=f'whatsapp:{self.whatsapp_number}',
+            to=f'whatsapp:{phone_number}',
+            body=body,
+            media_url=[catalog_url],
+            **options
+        )
+        print(f"✅ Message sent to {phone_number}! SID: {message.sid}, Status: {message.status}")
+        
+        share_id = self.log_share(artisan_id, phone_number, catalog_url, message, body)
+        
+        return {
+            'success': True,
+            'message_sid': message.sid,
+            'status': message.status,
+            'share_id': share_id
+        }
+    
     async def send_catalog(self, artisan_id: str, phone_number: str, catalog_url: str, custom_message: str = None):
         """Send catalog via WhatsApp"""
         try:
-            if not self.client:
-                raise ValueError("Twilio client not initialized. Check your .env credentials.")
-            
-            # Get artisan data
-            artisan_ref = db.collection('users').document(artisan_id)
-            artisan_doc = artisan_ref.get()
-            
-            if not artisan_doc.exists:
-                raise ValueError(f"Artisan not found with ID: {artisan_id}")
-            
-            artisan_data = artisan_doc.to_dict()
-            artisan_name = artisan_data.get('name', 'Our Artisan')
-            
-            # Format phone number - ensure it has country code
-            if not phone_number.startswith('+'):
-                phone_number = '+91' + phone_number.lstrip('0')
-            
-            # Remove any 'whatsapp:' prefix if present
-            if phone_number.startswith('whatsapp:'):
-                phone_number = phone_number.replace('whatsapp:', '')
+            body = self.prepare_message(artisan_id, custom_message)
             
             print(f"📤 Sending catalog...")
             print(f"   From: whatsapp:{self.whatsapp_number}")
-            print(f"   To: whatsapp:{phone_number}")
+            print(f"   To: whatsapp:{WhatsAppService.format_phone(phone_number)}")
             print(f"   Media: {catalog_url}")
             
-            # Default message
-            if not custom_message:
-                custom_message = (
-                    f"🛍️ *{artisan_name}* Product Catalog\n\n"
-                    f"Check out our latest products!\n"
-                    f"Browse the catalog and place your order.\n\n"
-                    f"📱 For orders, reply to this message."
-                )
-            
-            # Send WhatsApp message
-            message = self.client.messages.create(
-                from_=f'whatsapp:{self.whatsapp_number}',
-                to=f'whatsapp:{phone_number}',
-                body=custom_message,
-                media_url=[catalog_url]
-            )
-            
-            print(f"✅ Message sent! SID: {message.sid}, Status: {message.status}")
-            
-            # Log to Firestore
-            share_ref = db.collection('whatsapp_shares').document()
-            share_data = {
-                'id': share_ref.id,
-                'artisan_id': artisan_id,
-                'phone_number': phone_number,
-                'catalog_url': catalog_url,
-                'message_sid': message.sid,
-                'status': message.status,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'message_sent': custom_message
-            }
-            share_ref.set(share_data)
-            
-            # Update artisan analytics
-            try:
-                artisan_ref.update({
-                    'whatsapp_shares_count': firestore.Increment(1),
-                    'last_shared_at': firestore.SERVER_TIMESTAMP
-                })
-            except:
-                pass
-            
-            return {
-                'success': True,
-                'message_sid': message.sid,
-                'status': message.status,
-                'share_id': share_ref.id
-            }
-            
+            await send_bucket.acquire()
+            return await self.deliver(artisan_id, phone_number, catalog_url, body)
+        
         except Exception as e:
             print(f"❌ Error sending WhatsApp: {str(e)}")
             raise Exception(f"Error sending WhatsApp: {str(e)}")
     
+    async def find_sent_message(self, phone_number: str, since: float):
+        """
+        SID of a message from our number to phone_number sent since the given
+        epoch time, or None. Twilio filters date_sent by day, so this errs
+        toward finding a message (i.e. toward not sending again).
+        """
+        messages = await asyncio.to_thread(
+            self.client.messages.list,
+            from_=f'whatsapp:{self.whatsapp_number}',
+            to=f'whatsapp:{WhatsAppService.format_phone(phone_number)}',
+            date_sent_after=datetime.fromtimestamp(since, timezone.utc),
+            limit=1
+        )
+        return messages[0].sid if messages else None
+    
+    def is_valid_callback(self, signature: str, params: dict) -> bool:
+        """
+        Check X-Twilio-Signature against TWILIO_STATUS_CALLBACK_URL. Without
+        the URL or auth token nothing can be verified, so every callback is
+        rejected (messages aren't sent with a callback then anyway).
+        """
+        if not TWILIO_STATUS_CALLBACK_URL or not self.auth_token:
+            return False
+        return RequestValidator(self.auth_token).validate(TWILIO_STATUS_CALLBACK_URL, params, signature or '')
+    
+    def start_bulk_job(self) -> tuple:
+        """Register a cancellable bulk send; returns (job_id, cancel event)"""
+        job_id = uuid.uuid4().hex
+        cancel_event = asyncio.Event()
+        self.bulk_jobs[job_id] = cancel_event
+        return job_id, cancel_event
+    
+    def cancel_bulk_job(self, job_id: str) -> bool:
+        cancel_event = self.bulk_jobs.get(job_id)
+        if cancel_event is None:
+            return False
+        cancel_event.set()
+        return True
+    
+    async def send_bulk_stream(self, artisan_id: str, phone_numbers: list, catalog_url: str,
+                               body: str, cancel_event: asyncio.Event = None):
+        """
+        Send to all numbers with at most WHATSAPP_BULK_CONCURRENCY requests in
+        flight, paced by the shared token bucket. Yields one result per
+        number as it finishes; numbers not yet sent when cancel_event is set
+        are reported as cancelled.
+        """
+        semaphore = asyncio.Semaphore(WHATSAPP_BULK_CONCURRENCY)
+        cancel_event = cancel_event or asyncio.Event()
+        
+        async def send_one(phone):
+            async with semaphore:
+                if not cancel_event.is_set():
+                    await send_bucket.acquire()
+                if cancel_event.is_set():
+                    return {'phone': phone, 'success': False, 'cancelled': True, 'error': 'Cancelled'}
+                try:
+                    result = await self.deliver(artisan_id, phone, catalog_url, body)
+                    return {'phone': phone, 'success': True, 'message_sid': result['message_sid']}
+                except Exception as e:
+                    print(f"❌ Error sending WhatsApp to {phone}: {str(e)}")
+                    return {'phone': phone, 'success': False, 'error': str(e)}
+        
+        tasks = [asyncio.create_task(send_one(phone)) for phone in phone_numbers]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away or the consumer stopped early
+            for task in tasks:
+                task.cancel()
+    
     async def send_bulk_catalog(self, artisan_id: str, phone_numbers: list, catalog_url: str):
         """Send catalog to multiple numbers"""
-        results = []
-        
         print(f"📤 Bulk sending to {len(phone_numbers)} contacts")
         
-        for phone in phone_numbers:
-            try:
-                result = await self.send_catalog(artisan_id, phone, catalog_url)
-                results.append({
-                    'phone': phone,
-                    'success': True,
-                    'message_sid': result['message_sid']
-                })
-            except Exception as e:
-                results.append({
-                    'phone': phone,
-                    'success': False,
-                    'error': str(e)
-                })
+        try:
+            body = self.prepare_message(artisan_id)
+        except Exception as e:
+            return [{'phone': phone, 'success': False, 'error': str(e)} for phone in phone_numbers]
+        
+        results = [result async for result in self.send_bulk_stream(artisan_id, phone_numbers, catalog_url, body)]
         
-        return results
\ No newline at end of file
+        # Keep the request order in the response
+        order = {phone: index for index, phone in enumerate(phone_numbers)}
+        results.sort(key=lambda result: order[result['phone']])
+        return results
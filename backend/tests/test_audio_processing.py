@@ -0,0 +1,122 @@
+import numpy as np
+
+from services import audio_processing
+from services.audio_processing import TARGET_SAMPLE_RATE, pcm_duration
+
+
+def tone(seconds: float, amplitude: int = 8000, hz: int = 220) -> np.ndarray:
+    t = np.arange(int(seconds * TARGET_SAMPLE_RATE)) / TARGET_SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * hz * t)
+
+
+def room(seconds: float, amplitude: int = 40, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(0, amplitude, int(seconds * TARGET_SAMPLE_RATE))
+
+
+def pcm(*parts: np.ndarray) -> bytes:
+    return np.clip(np.concatenate(parts), -32768, 32767).astype("<i2").tobytes()
+
+
+def test_trim_silence_keeps_speech_with_padding():
+    audio = pcm(room(1.0), tone(2.0), room(1.0, seed=1))
+
+    trimmed, noise_floor = audio_processing.trim_silence(audio)
+
+    padding = audio_processing.VAD_PADDING_MS / 1000
+    assert 2.0 <= pcm_duration(trimmed) <= 2.0 + 2 * padding + 0.1
+    assert noise_floor < audio_processing.VAD_MIN_ENERGY
+
+
+def test_trim_silence_of_silence_is_empty():
+    trimmed, _ = audio_processing.trim_silence(pcm(room(2.0)))
+    assert trimmed == b""
+    assert audio_processing.trim_silence(b"") == (b"", 0.0)
+
+
+def test_detect_speech_adapts_to_a_noisy_room():
+    # Loud background: speech is judged against the noise floor, not a fixed level
+    audio = pcm(room(1.0, amplitude=600), tone(1.0, amplitude=12000) + room(1.0, amplitude=600, seed=1),
+                room(1.0, amplitude=600, seed=2))
+
+    mask, noise_floor = audio_processing.detect_speech(audio)
+
+    frames_per_second = 1000 // audio_processing.VAD_FRAME_MS
+    assert 500 < noise_floor < 800
+    assert mask[int(1.5 * frames_per_second)]
+    assert not mask[:frames_per_second // 2].any()
+    assert not mask[-frames_per_second // 2:].any()
+
+
+def test_speech_without_pauses_is_not_silence():
+    # Every frame is speech, so the quietest decile must not become the floor
+    mask, _ = audio_processing.detect_speech(pcm(tone(6.0)))
+    assert mask.all()
+    assert pcm_duration(audio_processing.trim_silence(pcm(tone(6.0)))[0]) == 6.0
+
+
+def test_cut_lands_in_the_pause():
+    audio = pcm(tone(8.0), room(1.0), tone(8.0))
+
+    cut = audio_processing.find_silence_cut(audio, min_seconds=5, max_seconds=12)
+
+    assert 8.0 < pcm_duration(audio[:cut]) < 9.0
+
+
+def test_no_cut_needed_or_possible_yet():
+    audio = pcm(tone(8.0), room(1.0), tone(8.0))
+    # Final audio that already fits in one segment
+    assert audio_processing.find_silence_cut(audio, min_seconds=5, max_seconds=20) is None
+    # Streaming: no pause yet and under max_seconds, so wait for more audio
+    assert audio_processing.find_silence_cut(pcm(tone(7.0)), 5, 20, final=False) is None
+
+
+def test_hard_cut_when_the_speaker_never_pauses():
+    audio = pcm(tone(25.0))
+    cut = audio_processing.find_silence_cut(audio, min_seconds=5, max_seconds=20)
+    # Cuts are frame-aligned: the last whole frame before max_seconds
+    assert 20.0 - audio_processing.VAD_FRAME_MS / 1000 <= pcm_duration(audio[:cut]) <= 20.0
+
+
+def test_split_on_silence_covers_the_recording():
+    audio = pcm(tone(8.0), room(1.0), tone(8.0), room(1.0, seed=1), tone(8.0))
+
+    segments = audio_processing.split_on_silence(audio, min_seconds=5, max_seconds=12)
+
+    assert len(segments) == 3
+    assert segments[0][0] == 0.0
+    assert abs(segments[-1][1] - pcm_duration(audio)) < 0.05
+    for (start, end, chunk), following in zip(segments, segments[1:] + [None]):
+        assert end - start <= 12
+        assert abs(pcm_duration(chunk) - (end - start)) < 1e-6
+        if following:
+            assert following[0] == end
+
+
+def test_split_on_silence_drops_silent_segments():
+    audio = pcm(tone(8.0), room(15.0))
+    segments = audio_processing.split_on_silence(audio, min_seconds=5, max_seconds=12)
+    assert len(segments) == 1
+    assert segments[0][0] == 0.0
+
+
+def test_stream_decoder_decodes_chunks_once():
+    audio = pcm(tone(3.0), room(1.0))
+    upload = audio_processing.pcm_to_wav(audio)
+    decoder = audio_processing.StreamDecoder()
+
+    decoded = bytearray()
+    for start in range(0, len(upload), 4096):
+        decoder.feed(upload[start:start + 4096])
+        decoded += decoder.drain()
+    decoded += decoder.finish(timeout=10)
+
+    assert decoder.error is None
+    assert abs(pcm_duration(bytes(decoded)) - 4.0) < 0.05
+    assert decoder.drain() == b""
+
+
+def test_stream_decoder_reports_undecodable_input():
+    decoder = audio_processing.StreamDecoder()
+    decoder.feed(b"not audio at all" * 64)
+    assert decoder.finish(timeout=10) == b""
+    assert decoder.error is not None
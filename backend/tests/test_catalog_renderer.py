@@ -0,0 +1,28 @@
+import io
+
+import pytest
+from PIL import Image
+
+from services import catalog_renderer
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "webp", "png"])
+def test_encodes_in_the_requested_format(image_format):
+    data, used = catalog_renderer.encode_catalog_image(Image.new("RGB", (400, 600), "white"), image_format)
+    assert used == image_format
+    assert Image.open(io.BytesIO(data)).format == catalog_renderer.IMAGE_FORMAT_PRESETS[used]['format']
+
+
+def test_webp_too_tall_falls_back_to_jpeg():
+    tall = Image.new("RGB", (10, catalog_renderer.WEBP_MAX_DIMENSION + 1), "white")
+    data, used = catalog_renderer.encode_catalog_image(tall, "webp")
+    assert used == "jpeg"
+    assert Image.open(io.BytesIO(data)).size == tall.size
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "webp"])
+def test_past_jpeg_limit_falls_back_to_png(image_format):
+    tall = Image.new("RGB", (10, catalog_renderer.JPEG_MAX_DIMENSION + 500), "white")
+    data, used = catalog_renderer.encode_catalog_image(tall, image_format)
+    assert used == "png"
+    assert Image.open(io.BytesIO(data)).size == tall.size
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import time
+
+from services.image_cache import ImageCache
+
+KB = 1024
+
+
+def _fill(cache_dir, prefix, count):
+    cache = ImageCache(cache_dir=cache_dir, max_bytes=200 * KB)
+    for i in range(count):
+        url = f"https://img.example/{prefix}/{i}.jpg"
+        cache.store_original(url, os.urandom(20 * KB))
+        cache.store_derivative(url, "thumb_280", os.urandom(5 * KB))
+
+
+def test_store_and_read_back(tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), max_bytes=1024 * KB)
+    cache.store_original("https://img.example/a.jpg", b"orig", etag='"v1"')
+    cache.store_derivative("https://img.example/a.jpg", "thumb_280", b"thumb")
+
+    assert cache.get_original("https://img.example/a.jpg") == b"orig"
+    assert cache.get_derivative("https://img.example/a.jpg", "thumb_280") == b"thumb"
+    assert cache.get_meta("https://img.example/a.jpg")["variants"] == ["thumb_280"]
+    # A new original drops the derivatives rendered from the old one
+    cache.store_original("https://img.example/a.jpg", b"orig2")
+    assert cache.get_derivative("https://img.example/a.jpg", "thumb_280") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), max_bytes=100 * KB)
+    for i in range(3):
+        cache.store_original(f"https://img.example/{i}.jpg", os.urandom(30 * KB))
+        time.sleep(0.01)
+    cache.get_original("https://img.example/0.jpg")  # now the most recent
+
+    cache.store_original("https://img.example/3.jpg", os.urandom(30 * KB))
+
+    assert cache.stats()["total_bytes"] <= 100 * KB
+    assert cache.get_original("https://img.example/0.jpg") is not None
+    assert cache.get_original("https://img.example/1.jpg") is None
+
+
+def test_limit_holds_across_processes(tmp_path):
+    # Render workers are spawned processes with their own ImageCache
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_fill, args=(str(tmp_path), name, 20)) for name in "abc"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    # Each writer may overshoot by its unscanned writes (under 5% of the limit)
+    sizes = [path.stat().st_size for path in tmp_path.rglob("*.orig")]
+    sizes += [path.stat().st_size for path in tmp_path.rglob("*.thumb_280")]
+    assert sizes
+    assert sum(sizes) <= 200 * KB * 1.15
@@ -0,0 +1,76 @@
+import importlib
+import io
+import sys
+import types
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def image_hashes(monkeypatch):
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=None))
+    for name in ("services.artisan_cache", "services.image_hashes"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module("services.image_hashes")
+
+
+def entry(url: str, bits: int) -> dict:
+    """Hashes with the lowest `bits` bits set: distance(a, b) = |a.bits - b.bits|"""
+    value = f"{(1 << bits) - 1:016x}"
+    return {'url': url, 'dhash': value, 'phash': value}
+
+
+def photo(seed: int, size=(320, 240)) -> bytes:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (15, 20, 3), dtype=np.uint8)
+    img = Image.fromarray(pixels).resize(size, Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def test_groups_are_not_transitive(image_hashes):
+    # a~b and b~c, but a and c are 10 bits apart
+    entries = [entry("a", 0), entry("b", 5), entry("c", 10)]
+    assert image_hashes.duplicate_groups(entries, threshold=6) == [[0, 1]]
+
+
+def test_members_join_the_first_close_canonical(image_hashes):
+    entries = [entry("a", 0), entry("b", 20), entry("c", 3), entry("d", 22), entry("e", 40)]
+    assert image_hashes.duplicate_groups(entries, threshold=6) == [[0, 2], [1, 3]]
+    assert image_hashes.duplicate_groups(entries[:1]) == []
+
+
+def test_resized_copy_is_a_duplicate_of_its_original(image_hashes):
+    original = image_hashes.compute_hashes(photo(1))
+    resized = image_hashes.compute_hashes(photo(1, size=(160, 120)))
+    other = image_hashes.compute_hashes(photo(2))
+
+    assert image_hashes.distance(original, resized) <= image_hashes.IMAGE_DUPLICATE_THRESHOLD
+    assert image_hashes.distance(original, other) > image_hashes.IMAGE_DUPLICATE_THRESHOLD
+
+
+def test_find_duplicates_reports_products_without_changing_them(image_hashes):
+    products = [
+        {'name': "Red vase", 'image_url': "https://img/red.jpg"},
+        {'name': "Blue vase", 'image_url': "https://img/blue.jpg"},
+        {'name': "Plate", 'image_url': "https://img/plate.jpg"},
+    ]
+    before = [dict(product) for product in products]
+    stored = {
+        image_hashes.url_key(e['url']): e
+        for e in (entry("https://img/red.jpg", 0), entry("https://img/blue.jpg", 2),
+                  entry("https://img/plate.jpg", 30))
+    }
+
+    report = image_hashes.find_duplicates(products, stored, threshold=6)
+
+    assert products == before
+    assert len(report) == 1
+    assert report[0]['canonical_url'] == "https://img/red.jpg"
+    assert [(image['url'], image['distance'], image['products']) for image in report[0]['images']] == [
+        ("https://img/red.jpg", 0, ["Red vase"]),
+        ("https://img/blue.jpg", 2, ["Blue vase"]),
+    ]
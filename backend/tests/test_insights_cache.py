@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.insights_cache import InsightsCache
+
+
+class Loader:
+    """Counts calls; fails while `failing` is set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, artisan_id):
+        self.calls += 1
+        self.release.wait(5)
+        if self.failing:
+            raise RuntimeError("bigquery down")
+        return {'artisan': artisan_id, 'version': self.calls}
+
+
+def age(cache, artisan_id, seconds):
+    """Pretend the cached entry was computed `seconds` ago"""
+    computed_at, insights = cache._entries[artisan_id]
+    cache._entries[artisan_id] = (time.monotonic() - seconds, insights)
+
+
+def test_miss_then_hit():
+    async def run():
+        load = Loader()
+        cache = InsightsCache(load, ttl=60, max_stale=600)
+        first = await cache.get("a1")
+        second = await cache.get("a1")
+        return load.calls, first[0], first[2], second[2]
+
+    calls, insights, first_status, second_status = asyncio.run(run())
+    assert (calls, first_status, second_status) == (1, 'miss', 'hit')
+    assert insights == {'artisan': "a1", 'version': 1}
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        load = Loader()
+        load.release.clear()
+        cache = InsightsCache(load, ttl=60, max_stale=600)
+        pending = [asyncio.create_task(cache.get("a1")) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        load.release.set()
+        results = await asyncio.gather(*pending)
+        return load.calls, results
+
+    calls, results = asyncio.run(run())
+    assert calls == 1
+    assert all(insights['version'] == 1 for insights, _, _ in results)
+
+
+def test_stale_entry_is_served_while_refreshing():
+    async def run():
+        load = Loader()
+        cache = InsightsCache(load, ttl=60, max_stale=600)
+        await cache.get("a1")
+        age(cache, "a1", 120)
+        stale = await cache.get("a1")
+        await asyncio.gather(*cache._refreshes)
+        fresh = await cache.get("a1")
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert (stale[0]['version'], stale[2]) == (1, 'stale')
+    assert (fresh[0]['version'], fresh[2]) == (2, 'hit')
+
+
+def test_failed_background_refresh_keeps_stale_entry():
+    async def run():
+        load = Loader()
+        cache = InsightsCache(load, ttl=60, max_stale=600)
+        await cache.get("a1")
+        age(cache, "a1", 120)
+        load.failing = True
+        await cache.get("a1")
+        await asyncio.gather(*cache._refreshes, return_exceptions=True)
+        return await cache.get("a1")
+
+    insights, entry_age, status = asyncio.run(run())
+    assert (insights['version'], status) == (1, 'stale')
+    assert entry_age >= 120
+
+
+def test_failed_refresh_serves_last_good_result():
+    async def run():
+        load = Loader()
+        cache = InsightsCache(load, ttl=60, max_stale=600)
+        await cache.get("a1")
+        load.failing = True
+        return await cache.get("a1", refresh=True)
+
+    insights, _, status = asyncio.run(run())
+    assert (insights['version'], status) == (1, 'stale')
+
+
+def test_failure_without_entry_serves_fallback_uncached():
+    async def run():
+        load = Loader()
+        load.failing = True
+        cache = InsightsCache(load, ttl=60, max_stale=600, fallback=lambda artisan_id: {'mock': True})
+        first = await cache.get("a1")
+        load.failing = False
+        second = await cache.get("a1")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert (first[0], first[2]) == ({'mock': True}, 'fallback')
+    assert (second[0]['version'], second[2]) == (2, 'miss')
+
+
+def test_failure_without_entry_or_fallback_raises():
+    async def run():
+        load = Loader()
+        load.failing = True
+        await InsightsCache(load, ttl=60, max_stale=600).get("a1")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+
+def test_least_recently_used_entries_are_evicted():
+    async def run():
+        cache = InsightsCache(Loader(), ttl=60, max_stale=600, max_entries=2)
+        for artisan_id in ("a1", "a2", "a1", "a3"):
+            await cache.get(artisan_id)
+        return list(cache._entries)
+
+    assert asyncio.run(run()) == ["a1", "a3"]
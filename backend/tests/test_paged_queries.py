@@ -0,0 +1,75 @@
+import asyncio
+import importlib
+import sys
+import threading
+import types
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+
+
+@pytest.fixture
+def paged_queries(monkeypatch):
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=None))
+    monkeypatch.delitem(sys.modules, "services.paged_queries", raising=False)
+    return importlib.import_module("services.paged_queries")
+
+
+def test_page_token_round_trip(paged_queries):
+    from datetime import datetime, timezone
+    created_at = datetime(2026, 10, 1, 12, 30, tzinfo=timezone.utc)
+    token = paged_queries.encode_page_token(created_at, "doc1")
+    assert paged_queries.decode_page_token(token) == (created_at, "doc1")
+    with pytest.raises(paged_queries.InvalidPageToken):
+        paged_queries.decode_page_token("not-a-token")
+
+
+def test_first_page_is_cached_and_invalidated_from_another_thread(paged_queries):
+    async def run():
+        cache = paged_queries.FirstPageCache(ttl=60)
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {'data': [len(calls)]}
+
+        key = ('catalogs', "a1", 5)
+        first = await cache.get(key, load)
+        assert await cache.get(key, load) == first
+
+        worker = threading.Thread(target=cache.invalidate, args=('catalogs', "a1"))
+        worker.start()
+        worker.join()
+        return first, await cache.get(key, load), len(calls)
+
+    first, after, calls = asyncio.run(run())
+    assert first == {'data': [1]}
+    assert after == {'data': [2]}
+    assert calls == 2
+
+
+def test_invalidation_during_load_does_not_cache_the_old_page(paged_queries):
+    async def run():
+        cache = paged_queries.FirstPageCache(ttl=60)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'data': [len(calls)]}
+
+        key = ('catalogs', "a1", 5)
+        pending = asyncio.create_task(cache.get(key, load))
+        await asyncio.to_thread(started.wait, 5)
+        cache.invalidate('catalogs', "a1")  # a catalog was published meanwhile
+        release.set()
+        stale = await pending
+        return stale, await cache.get(key, load), len(calls)
+
+    stale, fresh, calls = asyncio.run(run())
+    assert stale == {'data': [1]}
+    assert fresh == {'data': [2]}
+    assert calls == 2
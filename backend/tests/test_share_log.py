@@ -0,0 +1,143 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+
+
+class FakeRef:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, exists):
+        self.id = doc_id
+        self.exists = exists
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append(('set', ref.collection, ref.id, data))
+
+    def update(self, ref, data):
+        self.writes.append(('update', ref.collection, ref.id, data))
+
+    def commit(self):
+        if self.db.fail_commits:
+            self.db.fail_commits -= 1
+            raise RuntimeError("unavailable")
+        for op, collection, doc_id, data in self.writes:
+            if op == 'update' and (collection, doc_id) not in self.db.docs:
+                raise RuntimeError(f"NotFound: {doc_id}")  # fails the whole batch
+        for op, collection, doc_id, data in self.writes:
+            self.db.docs.setdefault((collection, doc_id), {}).update(data)
+        self.db.commits.append(self.writes)
+
+
+class FakeDb:
+    def __init__(self):
+        self.docs = {}
+        self.commits = []
+        self.lookups = []
+        self.fail_commits = 0
+
+    def collection(self, name):
+        return types.SimpleNamespace(document=lambda doc_id: FakeRef(name, doc_id))
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, refs, field_paths=None):
+        self.lookups.append([ref.id for ref in refs])
+        return [FakeSnapshot(ref.id, (ref.collection, ref.id) in self.docs) for ref in refs]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDb()
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=fake))
+    monkeypatch.delitem(sys.modules, "services.share_log", raising=False)
+    yield fake
+
+
+@pytest.fixture
+def share_log(db, monkeypatch):
+    module = importlib.import_module("services.share_log")
+    # Keep the module-level buffer's atexit flush away from the fake
+    monkeypatch.setattr(module.share_log, "_closed", True)
+    return module
+
+
+def test_flush_batches_shares_and_collapses_counts(db, share_log, monkeypatch):
+    monkeypatch.setattr(share_log, "FIRESTORE_BATCH_LIMIT", 100)
+    buffer = share_log.ShareLogBuffer(flush_seconds=60, max_buffer=10000)
+    for i in range(250):
+        buffer.add(f"SM{i}", {'artisan_id': f"artisan{i % 2}", 'status': 'queued'})
+
+    assert buffer.flush() == 252  # 250 shares + one counter per artisan
+    assert [len(batch) for batch in db.commits] == [100, 100, 52]
+    counter_writes = [w for batch in db.commits for w in batch if w[1] == 'users']
+    assert sorted(w[2] for w in counter_writes) == ["artisan0", "artisan1"]
+    assert buffer.pending() == 0
+
+
+def test_failed_flush_requeues_writes(db, share_log):
+    buffer = share_log.ShareLogBuffer(flush_seconds=60, max_buffer=10000)
+    buffer.add("SM1", {'artisan_id': "artisan0", 'status': 'queued'})
+    db.fail_commits = 1
+
+    assert buffer.flush() == 0
+    assert buffer.pending() == 1
+    assert buffer.flush() == 2
+    assert ('whatsapp_shares', 'SM1') in db.docs
+
+
+def test_status_collapses_into_buffered_share(db, share_log):
+    buffer = share_log.ShareLogBuffer(flush_seconds=60, max_buffer=10000)
+    buffer.add("SM1", {'artisan_id': "artisan0", 'status': 'queued'})
+    buffer.update_status("SM1", 'delivered')
+    buffer.update_status("SM1", 'sent')  # out of order; delivered wins
+
+    buffer.flush()
+
+    assert db.docs[('whatsapp_shares', 'SM1')]['status'] == 'delivered'
+    assert 'sent_at' in db.docs[('whatsapp_shares', 'SM1')]
+    assert db.lookups == []
+
+
+def test_status_updates_existing_share_and_drops_unknown_sids(db, share_log):
+    db.docs[('whatsapp_shares', 'SM1')] = {'status': 'queued'}
+    buffer = share_log.ShareLogBuffer(flush_seconds=60, max_buffer=10000)
+    buffer.update_status("SM1", 'read')
+    buffer.update_status("SMunknown", 'delivered')
+
+    buffer.flush()
+
+    assert db.docs[('whatsapp_shares', 'SM1')]['status'] == 'read'
+    assert ('whatsapp_shares', 'SMunknown') not in db.docs
+    ops = [w[0] for batch in db.commits for w in batch]
+    assert ops == ['update']
+    assert buffer.pending() == 0
+
+
+def test_late_status_does_not_regress_written_one(db, share_log):
+    buffer = share_log.ShareLogBuffer(flush_seconds=60, max_buffer=10000)
+    buffer.add("SM1", {'artisan_id': "artisan0", 'status': 'queued'})
+    buffer.update_status("SM1", 'read')
+    buffer.flush()
+
+    buffer.update_status("SM1", 'delivered')
+    buffer.flush()
+
+    share = db.docs[('whatsapp_shares', 'SM1')]
+    assert share['status'] == 'read'
+    assert 'delivered_at' in share
+    assert db.lookups == []  # written by this process, so known to exist
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+import pytest
+
+from services import tts_cache
+from services.tts_cache import TTSCache
+
+
+def part_files(root):
+    return [name for _, _, files in os.walk(root) for name in files if name.endswith(".part")]
+
+
+def test_synthesizes_once_then_hits(tmp_path):
+    calls = []
+
+    def synthesize(text, lang_code):
+        calls.append(text)
+        return b"mp3-bytes"
+
+    cache = TTSCache(synthesize, cache_dir=str(tmp_path))
+    path, hit = cache.get_or_synthesize("namaste", "hi")
+    assert not hit
+    assert open(path, "rb").read() == b"mp3-bytes"
+    assert cache.get_or_synthesize("namaste", "hi") == (path, True)
+    assert calls == ["namaste"]
+    assert cache._key_locks == {}
+
+
+@pytest.mark.parametrize("failure", [RuntimeError("backend down"), b""])
+def test_failed_synthesis_releases_key_lock(tmp_path, failure):
+    def synthesize(text, lang_code):
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    cache = TTSCache(synthesize, cache_dir=str(tmp_path))
+    with pytest.raises(Exception):
+        cache.get_or_synthesize("namaste", "hi")
+    assert cache._key_locks == {}
+    assert cache.stats()["files"] == 0
+
+
+def test_concurrent_requests_share_one_synthesis(tmp_path):
+    calls = []
+    started = threading.Event()
+
+    def synthesize(text, lang_code):
+        calls.append(text)
+        started.wait(1)
+        return b"audio"
+
+    cache = TTSCache(synthesize, cache_dir=str(tmp_path))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_synthesize("hello", "en")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
+
+
+def test_late_request_after_a_failure_waits_for_the_retry(tmp_path):
+    gates = [threading.Event(), threading.Event()]
+    entered = [threading.Event(), threading.Event(), threading.Event()]
+    active, overlaps = [], []
+
+    def synthesize(text, lang_code):
+        call = sum(event.is_set() for event in entered)
+        entered[call].set()
+        active.append(1)
+        overlaps.append(len(active))
+        if call < len(gates):
+            gates[call].wait(2)
+        active.pop()
+        if call == 0:
+            raise RuntimeError("backend down")
+        return b"audio"
+
+    cache = TTSCache(synthesize, cache_dir=str(tmp_path))
+    results, errors = [], []
+
+    def request():
+        try:
+            results.append(cache.get_or_synthesize("hello", "en"))
+        except RuntimeError as e:
+            errors.append(e)
+
+    first, waiter, late = (threading.Thread(target=request) for _ in range(3))
+    first.start()
+    entered[0].wait(2)
+    waiter.start()
+    time.sleep(0.05)  # queued on the phrase lock
+    gates[0].set()  # first synthesis fails, the waiter retries
+    entered[1].wait(2)
+    late.start()  # arrives while the retry is still running
+    time.sleep(0.05)
+    gates[1].set()
+    for thread in (first, waiter, late):
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert len(errors) == 1
+    assert sorted(hit for _, hit in results) == [False, True]
+    assert cache._key_locks == {}
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = TTSCache(lambda text, lang_code: b"audio", cache_dir=str(tmp_path))
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tts_cache.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        cache.get_or_synthesize("namaste", "hi")
+    assert part_files(tmp_path) == []
+    assert cache.stats()["files"] == 0
+
+
+def test_stale_temp_files_are_removed_on_startup(tmp_path):
+    (tmp_path / "ab").mkdir()
+    stale, fresh = tmp_path / "ab" / "old.part", tmp_path / "ab" / "new.part"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    old = time.time() - tts_cache.STALE_PART_SECONDS - 1
+    os.utime(stale, (old, old))
+
+    TTSCache(lambda text, lang_code: b"audio", cache_dir=str(tmp_path))
+
+    assert part_files(tmp_path) == ["new.part"]
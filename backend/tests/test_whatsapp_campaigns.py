@@ -0,0 +1,132 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+pytest.importorskip("twilio")
+
+
+@pytest.fixture
+def campaigns(monkeypatch):
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=None))
+    monkeypatch.delitem(sys.modules, "services.whatsapp_campaigns", raising=False)
+    module = importlib.import_module("services.whatsapp_campaigns")
+    monkeypatch.setattr(module, "CAMPAIGN_CHECKPOINT_EVERY", 2)
+    return module
+
+
+@pytest.fixture
+def store(campaigns, tmp_path):
+    return campaigns.LocalCampaignStore(str(tmp_path))
+
+
+def make_campaign(store, phones, campaign_id="c1", **fields):
+    campaign = {
+        'id': campaign_id, 'artisan_id': "artisan0", 'catalog_url': "https://x/c.pdf", 'body': "hi",
+        'status': 'running', 'total': len(phones), 'cursor': 0, 'sent': 0, 'failed': 0,
+        'unconfirmed': 0, 'lease_owner': None, 'lease_expires': 0, **fields,
+    }
+    store.create(campaign, phones)
+    return campaign
+
+
+class FakeWhatsApp:
+    def __init__(self, on_send=None):
+        self.sent = []
+        self.on_send = on_send
+
+    async def send_bulk_stream(self, artisan_id, phones, catalog_url, body, cancel_event=None):
+        for phone in phones:
+            self.sent.append(phone)
+            if self.on_send:
+                self.on_send(phone)
+            yield {'phone': phone, 'success': True, 'message_sid': f"SM{phone}"}
+
+    async def find_sent_message(self, phone, since):
+        return None
+
+
+def test_lease_is_exclusive_until_expired(store):
+    make_campaign(store, ["+911"])
+    assert store.acquire_lease("c1", "w1", 60)
+    assert not store.acquire_lease("c1", "w2", 60)
+    assert store.acquire_lease("c1", "w1", 60)  # owner re-acquires
+
+    store.write("c1", {'lease_expires': 0})
+    assert store.acquire_lease("c1", "w2", 60)
+    assert store.get("c1")['lease_owner'] == "w2"
+
+
+def test_renew_and_release_only_for_owner(store):
+    make_campaign(store, ["+911"])
+    store.acquire_lease("c1", "w1", 60)
+
+    assert not store.renew_lease("c1", "w2", 60, {'cursor': 1}, {'k': {'status': 'sent'}})
+    assert store.get("c1")['cursor'] == 0
+    assert store.get_sends("c1", ['k']) == {}
+    assert not store.release_lease("c1", "w2")
+    assert store.get("c1")['lease_owner'] == "w1"
+
+    assert store.renew_lease("c1", "w1", 60, {'cursor': 1}, {'k': {'status': 'sent'}})
+    assert store.get("c1")['cursor'] == 1
+    assert store.get_sends("c1", ['k']) == {'k': {'status': 'sent'}}
+    assert store.release_lease("c1", "w1")
+    assert store.get("c1")['lease_owner'] is None
+
+
+def test_run_sends_every_recipient_once(campaigns, store):
+    make_campaign(store, ["+911", "+912", "+913"])
+    whatsapp = FakeWhatsApp()
+    manager = campaigns.CampaignManager(whatsapp, store)
+
+    asyncio.run(manager._run("c1", asyncio.Event()))
+
+    campaign = store.get("c1")
+    assert whatsapp.sent == ["+911", "+912", "+913"]
+    assert (campaign['status'], campaign['cursor'], campaign['sent']) == ('completed', 3, 3)
+    assert campaign['lease_owner'] is None
+
+
+def test_run_stops_when_lease_is_lost(campaigns, store):
+    make_campaign(store, ["+911", "+912", "+913", "+914"])
+    manager = campaigns.CampaignManager(None, store)
+
+    def take_over(phone):
+        # Another worker takes the expired lease while this one is sending
+        store.write("c1", {'lease_expires': 0})
+        store.acquire_lease("c1", "other-worker", 60)
+
+    manager.whatsapp = FakeWhatsApp(on_send=take_over)
+    asyncio.run(manager._run("c1", asyncio.Event()))
+
+    campaign = store.get("c1")
+    assert manager.whatsapp.sent == ["+911", "+912"]  # no second window
+    assert campaign['cursor'] == 0 and campaign['sent'] == 0  # checkpoint not written
+    assert campaign['lease_owner'] == "other-worker"  # not released by the loser
+    sends = store.get_sends("c1", [campaigns.idempotency_key("c1", p) for p in ("+911", "+912")])
+    assert {record['status'] for record in sends.values()} == {'sending'}
+
+
+def test_pause_just_before_completion_is_not_overwritten(campaigns, store, monkeypatch):
+    make_campaign(store, ["+911", "+912"])
+    manager = campaigns.CampaignManager(FakeWhatsApp(), store)
+    read = store.get
+
+    def get_then_pause(campaign_id):
+        campaign = read(campaign_id)
+        if campaign['cursor'] >= campaign['total']:
+            store.write(campaign_id, {'status': 'paused'})  # lands after the re-read
+        return campaign
+
+    monkeypatch.setattr(store, "get", get_then_pause)
+    asyncio.run(manager._run("c1", asyncio.Event()))
+
+    campaign = read("c1")
+    assert (campaign['status'], campaign['cursor']) == ('paused', 2)
+    assert 'completed_at' not in campaign
+    store.write("c1", {'lease_owner': "w1"})
+    assert not store.renew_lease("c1", "w1", 60, {'status': 'completed'}, expect_status='running')
+    assert read("c1")['status'] == 'paused'
@@ -3,6 +3,7 @@
 import React, { useState } from "react"
 import { Mic, Square } from "lucide-react"
 import BACKEND_URL from "../config"
+import { auth } from "../firebase"
 
 const styles = {
   container: {
@@ -119,30 +120,86 @@ export default function CaptionGenerator() {
     }
   }
 
+  function openTranslationStream() {
+    // ✅ Stream audio chunks over WebSocket so partial translations show up while speaking
+    return new Promise((resolve) => {
+      try {
+        const wsUrl = `${BACKEND_URL.replace(/^http/, "ws")}/translator/stream?lang_code=${encodeURIComponent(recordingLanguage)}`
+        const ws = new WebSocket(wsUrl)
+        ws.onopen = () => resolve(ws)
+        ws.onerror = () => resolve(null)
+      } catch (err) {
+        console.warn("Streaming translation unavailable:", err)
+        resolve(null)
+      }
+    })
+  }
+
   async function startRecording() {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true })
       const recorder = new MediaRecorder(stream)
       const audioChunks = []
+      const ws = await openTranslationStream()
+      let streamFinished = false
 
       // ✅ Added reminder alert (no logic changed)
       alert("🎙️ Speak clearly & loudly.\n⏱️ Record at least 3 seconds for best results!")
 
+      if (ws) {
+        setError("")
+        ws.onmessage = (event) => {
+          const data = JSON.parse(event.data)
+          if (data.type === "partial") {
+            if (data.full_translation) setPrompt(data.full_translation)
+            console.log("📥 Partial translation:", data.translation)
+          } else if (data.type === "final") {
+            streamFinished = true
+            setTranslating(false)
+            if (data.translation) {
+              setPrompt(data.translation)
+              console.log("✅ Streaming translation complete:", data.translation)
+            } else {
+              setError("Could not understand audio. Please speak clearly.")
+            }
+          } else if (data.type === "error") {
+            console.error("❌ Streaming error:", data.message)
+          }
+        }
+        ws.onclose = async () => {
+          // Fall back to the upload endpoint if the stream died before finishing
+          if (!streamFinished && recorder.state === "inactive" && audioChunks.length) {
+            streamFinished = true
+            await translateAudio(new Blob(audioChunks, { type: "audio/webm" }))
+          }
+        }
+      }
+
       recorder.ondataavailable = (event) => {
         audioChunks.push(event.data)
+        if (ws && ws.readyState === WebSocket.OPEN && event.data.size > 0) {
+          ws.send(event.data)
+        }
       }
 
       recorder.onstop = async () => {
         const audioBlob = new Blob(audioChunks, { type: "audio/webm" })
         console.log("🎤 Recording stopped, blob size:", audioBlob.size)
-        await translateAudio(audioBlob)
         stream.getTracks().forEach((track) => track.stop())
+        if (ws && ws.readyState === WebSocket.OPEN) {
+          setTranslating(true)
+          ws.send("stop")
+        } else if (!streamFinished) {
+          streamFinished = true
+          await translateAudio(audioBlob)
+        }
       }
 
-      recorder.start()
+      // 1s timeslices feed the stream; without a socket the chunks are just buffered
+      recorder.start(ws ? 1000 : undefined)
       setMediaRecorder(recorder)
       setIsRecording(true)
-      console.log("🎤 Recording started...")
+      console.log("🎤 Recording started...", ws ? "(streaming)" : "")
     } catch (err) {
       console.error("Microphone error:", err)
       setError("Could not access microphone. Please check permissions.")
@@ -213,6 +270,8 @@ export default function CaptionGenerator() {
       const formData = new FormData()
       formData.append("file", imageFile, imageFile.name)
       formData.append("prompt", prompt)
+      // Lets the backend reuse this artisan's captions for a near-identical photo
+      if (auth.currentUser) formData.append("artisan_id", auth.currentUser.uid)
 
       const res = await fetch(`${BACKEND_URL}/instagram/caption`, {
         method: "POST",
@@ -1,49 +1,50 @@
 "use client"
 
 import React from "react"
+import BACKEND_URL from "../config"
 const _AppStore = window.AppStore
 
-function enhanceImageOnCanvas(imgEl, canvas) {
-  const ctx = canvas.getContext("2d")
-  const w = imgEl.naturalWidth
-  const h = imgEl.naturalHeight
-  canvas.width = w
-  canvas.height = h
-  ctx.drawImage(imgEl, 0, 0)
-
-  const imageData = ctx.getImageData(0, 0, w, h)
-  const data = imageData.data
-  const brightness = 12
-  const contrast = 1.08
-  for (let i = 0; i < data.length; i += 4) {
-    for (let c = 0; c < 3; c++) {
-      let v = data[i + c]
-      v = v + brightness
-      v = (v - 128) * contrast + 128
-      data[i + c] = Math.max(0, Math.min(255, v))
-    }
+async function enhanceOnServer(file, { whiteBackground = false } = {}) {
+  const form = new FormData()
+  form.append("file", file)
+  form.append("white_background", whiteBackground ? "true" : "false")
+  const response = await fetch(`${BACKEND_URL}/api/images/enhance`, { method: "POST", body: form })
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.detail || "Enhancement failed")
   }
-  ctx.putImageData(imageData, 0, 0)
+  return URL.createObjectURL(await response.blob())
 }
 
 function ImageEnhancement() {
   const [src, setSrc] = React.useState("")
-  const imgRef = React.useRef(null)
-  const canvasRef = React.useRef(null)
+  const [file, setFile] = React.useState(null)
+  const [enhanced, setEnhanced] = React.useState("")
+  const [whiteBackground, setWhiteBackground] = React.useState(false)
+  const [busy, setBusy] = React.useState(false)
+  const [error, setError] = React.useState("")
 
   function onUpload(e) {
     const f = e.target.files?.[0]
     if (!f) return
+    setFile(f)
+    setEnhanced("")
     const r = new FileReader()
     r.onload = () => setSrc(r.result)
     r.readAsDataURL(f)
   }
 
-  function onEnhance() {
-    const img = imgRef.current
-    const canvas = canvasRef.current
-    if (!img || !canvas) return
-    enhanceImageOnCanvas(img, canvas)
+  async function onEnhance() {
+    if (!file) return
+    setBusy(true)
+    setError("")
+    try {
+      setEnhanced(await enhanceOnServer(file, { whiteBackground }))
+    } catch (err) {
+      setError(err.message)
+    } finally {
+      setBusy(false)
+    }
   }
 
   return (
@@ -53,17 +54,25 @@ function ImageEnhancement() {
       <div className="row mt-3">
         <div>
           {src ? (
-            <img ref={imgRef} src={src} alt="Original" style={{ width: "100%", borderRadius: 10 }} />
+            <img src={src} alt="Original" style={{ width: "100%", borderRadius: 10 }} />
           ) : (
             <div className="small text-muted">No image uploaded yet.</div>
           )}
         </div>
         <div>
-          <canvas ref={canvasRef} style={{ width: "100%", borderRadius: 10, background: "#f8fafc" }}></canvas>
+          {enhanced ? (
+            <img src={enhanced} alt="Enhanced" style={{ width: "100%", borderRadius: 10, background: "#f8fafc" }} />
+          ) : (
+            <div className="small text-muted">{error || "Enhanced image will appear here."}</div>
+          )}
         </div>
       </div>
-      <button className="btn btn-primary mt-3" onClick={onEnhance}>
-        Enhance with AI (demo)
+      <label className="small mt-3" style={{ display: "block" }}>
+        <input type="checkbox" checked={whiteBackground} onChange={(e) => setWhiteBackground(e.target.checked)} />{" "}
+        Clean up white background
+      </label>
+      <button className="btn btn-primary mt-3" onClick={onEnhance} disabled={!file || busy}>
+        {busy ? "Enhancing..." : "Enhance with AI"}
       </button>
     </main>
   )